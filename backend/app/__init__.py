@@ -188,11 +188,15 @@ def get_local_build_timestamp():
         return None
 
 
-def create_app():
+def create_app(with_frontend: bool = True):
     """
     Creates and configures the Flask app.
+
+    Args:
+        with_frontend (bool): Whether to fetch the frontend build; the API alone does not need it.
     """
-    fetch_frontend()
+    if with_frontend:
+        fetch_frontend()
 
     app = Flask(__name__,
                 static_folder="../../frontend/build/static",
@@ -200,6 +204,9 @@ def create_app():
     CORS(app, resources={r"/*": {"origins": "*"}})
     app.config.from_object(Config)
 
+    from .utils.json_provider import get_json_provider_class
+    app.json = get_json_provider_class()(app)
+
     db.init_app(app)
 
     with app.app_context():
@@ -210,6 +217,9 @@ def create_app():
     Migrate(app, db)
     setup_logging(app)
 
+    from .middleware.compression import init_compression
+    init_compression(app)
+
     from .routes.auth_routes import auth_bp
     from .routes.user_routes import user_bp
     from .routes.product_routes import product_bp
@@ -221,6 +231,15 @@ def create_app():
     app.register_blueprint(product_bp)
     app.register_blueprint(health_bp)
     app.register_blueprint(config_bp)
+
+    from .services.product_service import sync_catalog_version
+    app.before_request(sync_catalog_version)
+
+    from .services.user_service import UPLOAD_FOLDER, USE_S3_STORAGE, ensure_default_avatar_variants
+    from .utils.avatar_index import avatar_index
+    if not USE_S3_STORAGE:
+        avatar_index.load(UPLOAD_FOLDER)
+    ensure_default_avatar_variants(app)
  
     def inject_backend_url():
         """Get the backend URL based on the current request, works dynamically in all environments."""
@@ -1,5 +1,5 @@
 from flask import jsonify
-from ..services.health_service import perform_health_check
+from ..services.health_service import perform_health_check, get_cache_stats
 
 
 def health_check():
@@ -12,3 +12,13 @@ def health_check():
     result = perform_health_check()
     status_code = 200 if result["status"] == "OK" else 500
     return jsonify(result), status_code
+
+
+def cache_stats():
+    """
+    Cache statistics endpoint exposing the catalog cache counters.
+
+    Returns:
+        JSON response with the cache statistics.
+    """
+    return jsonify(get_cache_stats()), 200
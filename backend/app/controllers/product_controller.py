@@ -1,28 +1,242 @@
 from flask import jsonify, request
 from ..services.product_service import get_all_products, get_product_by_id, add_review_to_product, \
-    remove_review_from_product, update_product_review
+    remove_review_from_product, update_product_review, get_products_page, search_products, autocomplete_products, \
+    filter_products, get_product_reviews, get_products_by_ids, iter_all_products, get_top_rated_products, \
+    get_most_reviewed_products, LEADERBOARD_SIZE, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, AUTOCOMPLETE_LIMIT, REVIEW_ORDERS
+from ..models.product_model import PRODUCT_FIELDS
+from ..utils.search_index import decode_cursor
+from ..utils.streaming import stream_json_array
+from ..utils.catalog_cache import catalog_cache
+from ..middleware.compression import precompressed
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import DataError
 from flask import current_app
 from ..services.user_service import get_user_info
+from ..services.recommendation_service import get_related_products, RELATED_TOP_K
 
 
 def fetch_all_products():
     """
     Fetches all products from the database and returns them in JSON format.
 
+    When any of the `limit`, `after` or `fields` query parameters is given, a single
+    page of products is returned instead, along with the cursor for the next page.
+    With `stream=true` the full list is streamed as it is read from the database.
+
     Returns:
-        JSON: A JSON response containing a list of all products.
+        JSON: A JSON response containing a list of all products, or a page of products.
     """
+    if any(param in request.args for param in ("limit", "after", "fields")):
+        return fetch_products_page()
+
+    if request.args.get("stream") == "true":
+        current_app.logger.info("Streaming all products.")
+        return stream_json_array(iter_all_products()), 200
+
     try:
-        products = get_all_products()
+        version = catalog_cache.version
+        body = catalog_cache.get_artifact("all_products")
+        if body is None:
+            products = get_all_products()
+            body = jsonify(products).get_data()
+            if products:
+                catalog_cache.set_artifact("all_products", body, version)
         current_app.logger.info("Fetched all products.")
-        return jsonify(products), 200
+        precompressed("all_products", version)
+        return current_app.response_class(body, mimetype=current_app.json.mimetype), 200
     except Exception as e:
         current_app.logger.error(f"Error fetching all products: {str(e)}")
         return jsonify({"error": "Unable to fetch products"}), 500
 
 
+def parse_fields():
+    """
+    Parses the comma-separated `fields` query parameter.
+
+    Returns:
+        tuple: The requested product fields (None when not given) and an error message, if any.
+    """
+    if not request.args.get("fields"):
+        return None, None
+
+    fields = [field.strip() for field in request.args["fields"].split(",") if field.strip()]
+    unknown_fields = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown_fields:
+        current_app.logger.warning(f"Unknown product fields requested: {unknown_fields}")
+        return None, f"Unknown fields: {', '.join(unknown_fields)}"
+    return fields, None
+
+
+def parse_limit(default: int) -> int:
+    """
+    Reads the `limit` query parameter, capped at MAX_PAGE_SIZE.
+
+    Raises:
+        ValueError: If it is not a positive integer.
+    """
+    limit = int(request.args.get("limit", default))
+    if limit < 1:
+        raise ValueError(f"limit must be positive, got {limit}")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def fetch_products_page():
+    """
+    Fetches a page of products using keyset pagination on the product ID.
+
+    Query parameters:
+        limit (int): The page size.
+        after (int): The `next_cursor` returned with the previous page.
+        fields (str): Comma-separated list of product fields to include.
+
+    Returns:
+        JSON: A JSON response containing the products and the next cursor.
+    """
+    try:
+        limit = parse_limit(DEFAULT_PAGE_SIZE)
+        after = request.args.get("after")
+        after = int(after) if after else None
+    except ValueError:
+        current_app.logger.warning(f"Invalid pagination parameters: {request.args}")
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    fields, error = parse_fields()
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        page = get_products_page(limit, after, fields)
+        current_app.logger.info(f"Fetched {len(page['products'])} products after ID {after}.")
+        return jsonify(page), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching products page: {str(e)}")
+        return jsonify({"error": "Unable to fetch products"}), 500
+
+
+def search_catalog():
+    """
+    Searches products by name, category and description.
+
+    Query parameters:
+        q (str): The search text.
+        mode (str): `autocomplete` to get name suggestions for a partially typed query.
+        limit (int): The page size.
+        after (str): The `next_cursor` returned with the previous page.
+        fields (str): Comma-separated list of product fields to include.
+
+    Returns:
+        JSON: A JSON response containing the ranked products and the next cursor,
+              or the suggestions in autocomplete mode.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Search query is required"}), 400
+
+    autocomplete = request.args.get("mode") == "autocomplete"
+    try:
+        limit = parse_limit(AUTOCOMPLETE_LIMIT if autocomplete else DEFAULT_PAGE_SIZE)
+        after = request.args.get("after")
+        after = decode_cursor(after) if after else None
+    except ValueError:
+        current_app.logger.warning(f"Invalid search parameters: {request.args}")
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    fields, error = parse_fields()
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        if autocomplete:
+            return jsonify(autocomplete_products(query, limit)), 200
+        results = search_products(query, limit, after, fields)
+        current_app.logger.info(f"Search for '{query}' returned {len(results['products'])} products.")
+        return jsonify(results), 200
+    except Exception as e:
+        current_app.logger.error(f"Error searching products for '{query}': {str(e)}")
+        return jsonify({"error": "Unable to search products"}), 500
+
+
+def filter_catalog():
+    """
+    Filters products by category, price range and alcohol flag, with facet counts.
+
+    Query parameters:
+        category (str): A category to include; may be repeated.
+        min_price (float): Inclusive lower price bound.
+        max_price (float): Inclusive upper price bound.
+        is_alcohol (str): `true` or `false`.
+        limit (int): The page size.
+        after (int): The `next_cursor` returned with the previous page.
+        fields (str): Comma-separated list of product fields to include.
+
+    Returns:
+        JSON: A JSON response containing the products, the next cursor and the facet counts.
+    """
+    try:
+        min_price = request.args.get("min_price")
+        min_price = float(min_price) if min_price else None
+        max_price = request.args.get("max_price")
+        max_price = float(max_price) if max_price else None
+        limit = parse_limit(DEFAULT_PAGE_SIZE)
+        after = request.args.get("after")
+        after = int(after) if after else None
+    except ValueError:
+        current_app.logger.warning(f"Invalid filter parameters: {request.args}")
+        return jsonify({"error": "Invalid filter parameters"}), 400
+
+    is_alcohol = request.args.get("is_alcohol")
+    if is_alcohol is not None:
+        if is_alcohol.lower() not in ("true", "false"):
+            return jsonify({"error": "is_alcohol must be 'true' or 'false'"}), 400
+        is_alcohol = is_alcohol.lower() == "true"
+
+    fields, error = parse_fields()
+    if error:
+        return jsonify({"error": error}), 400
+
+    categories = request.args.getlist("category")
+    try:
+        results = filter_products(categories, min_price, max_price, is_alcohol, limit, after, fields)
+        current_app.logger.info(f"Filter returned {results['facets']['total']} matching products.")
+        return jsonify(results), 200
+    except Exception as e:
+        current_app.logger.error(f"Error filtering products: {str(e)}")
+        return jsonify({"error": "Unable to filter products"}), 500
+
+
+def fetch_products_batch():
+    """
+    Fetches several products at once, in the requested order.
+
+    Query parameters:
+        ids (str): Comma-separated list of product IDs.
+        fields (str): Comma-separated list of product fields to include.
+
+    Returns:
+        JSON: A JSON response containing the products found and the IDs that do not exist.
+    """
+    try:
+        product_ids = [int(product_id) for product_id in request.args.get("ids", "").split(",") if product_id.strip()]
+    except ValueError:
+        current_app.logger.warning(f"Invalid product IDs in batch request: {request.args.get('ids')}")
+        return jsonify({"error": "Invalid product ID"}), 400
+
+    if not product_ids:
+        return jsonify({"error": "At least one product ID is required"}), 400
+
+    fields, error = parse_fields()
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        products, missing = get_products_by_ids(product_ids, fields)
+        current_app.logger.info(f"Fetched {len(products)} products in batch, {len(missing)} missing.")
+        return jsonify({"products": products, "missing": missing}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching products batch: {str(e)}")
+        return jsonify({"error": "Unable to fetch products"}), 500
+
+
 def get_single_product(product_id):
     """
     Fetches a single product by its ID and returns it in JSON format.
@@ -30,6 +244,9 @@ def get_single_product(product_id):
     Args:
         product_id (str): The ID of the product to fetch.
 
+    Query parameters:
+        reviews (str): `none` to leave out the reviews, or N to embed only the first N of them.
+
     Returns:
         JSON: A JSON response containing the product if found,
               otherwise an error message with a 404 status code.
@@ -41,8 +258,16 @@ def get_single_product(product_id):
         current_app.logger.warning(f"Invalid product ID format: {product_id}")
         return jsonify({"error": "Invalid product ID"}), 400
 
+    review_limit = request.args.get("reviews")
+    if review_limit is not None:
+        try:
+            review_limit = 0 if review_limit == "none" else max(int(review_limit), 0)
+        except ValueError:
+            current_app.logger.warning(f"Invalid reviews parameter: {review_limit}")
+            return jsonify({"error": "reviews must be 'none' or a number"}), 400
+
     try:
-        product = get_product_by_id(product_id)
+        product = get_product_by_id(product_id, review_limit)
         if product:
             current_app.logger.info(f"Product with ID {product_id} found.")
             return jsonify(product), 200
@@ -53,6 +278,128 @@ def get_single_product(product_id):
         return jsonify({"error": "Invalid product ID format"}), 400
 
 
+def list_reviews(product_id):
+    """
+    Fetches a page of a product's reviews.
+
+    Args:
+        product_id (str): The ID of the product.
+
+    Query parameters:
+        order (str): `id` (default) for oldest first, `rating` for highest rated first.
+        limit (int): The page size.
+        after (str): The `next_cursor` returned with the previous page.
+
+    Returns:
+        JSON: A JSON response containing the reviews and the next cursor,
+              otherwise an error message with a 404 status code.
+    """
+    order = request.args.get("order", "id")
+    if order not in REVIEW_ORDERS:
+        return jsonify({"error": f"order must be one of: {', '.join(REVIEW_ORDERS)}"}), 400
+
+    try:
+        product_id = int(product_id)
+        limit = parse_limit(DEFAULT_PAGE_SIZE)
+        after = request.args.get("after")
+        if after:
+            after = decode_cursor(after) if order == "rating" else (int(after),)
+        else:
+            after = None
+    except ValueError:
+        current_app.logger.warning(f"Invalid review pagination parameters for product {product_id}: {request.args}")
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    try:
+        page = get_product_reviews(product_id, limit, after, order)
+        if not page:
+            return jsonify({'error': 'Product not found'}), 404
+        current_app.logger.info(f"Fetched {len(page['reviews'])} reviews for product {product_id}.")
+        return jsonify(page), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching reviews for product {product_id}: {str(e)}")
+        return jsonify({"error": "Unable to fetch reviews"}), 500
+
+
+def top_rated_leaderboard():
+    """
+    Fetches the best rated products, ranked by Bayesian average rating.
+
+    Query parameters:
+        category (str): Only rank products in this category.
+        limit (int): The maximum number of products.
+
+    Returns:
+        JSON: A JSON response containing the ranked products.
+    """
+    try:
+        limit = parse_limit(LEADERBOARD_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+
+    category = request.args.get("category")
+    try:
+        products = get_top_rated_products(limit, category)
+        current_app.logger.info(f"Fetched top rated leaderboard for category {category}.")
+        return jsonify({"products": products}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching top rated leaderboard: {str(e)}")
+        return jsonify({"error": "Unable to fetch leaderboard"}), 500
+
+
+def most_reviewed_leaderboard():
+    """
+    Fetches the products with the most reviews.
+
+    Query parameters:
+        limit (int): The maximum number of products.
+
+    Returns:
+        JSON: A JSON response containing the ranked products.
+    """
+    try:
+        limit = parse_limit(LEADERBOARD_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+
+    try:
+        products = get_most_reviewed_products(limit)
+        current_app.logger.info("Fetched most reviewed leaderboard.")
+        return jsonify({"products": products}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching most reviewed leaderboard: {str(e)}")
+        return jsonify({"error": "Unable to fetch leaderboard"}), 500
+
+
+def list_related_products(product_id):
+    """
+    Fetches the products most frequently bought together with a product.
+
+    Args:
+        product_id (str): The ID of the product.
+
+    Query parameters:
+        limit (int): The maximum number of related products.
+
+    Returns:
+        JSON: A JSON response containing the related products, most co-purchased first.
+    """
+    try:
+        product_id = int(product_id)
+        limit = parse_limit(RELATED_TOP_K)
+    except ValueError:
+        current_app.logger.warning(f"Invalid related products request for product {product_id}: {request.args}")
+        return jsonify({"error": "Invalid product ID or limit"}), 400
+
+    try:
+        products = get_related_products(product_id, limit)
+        current_app.logger.info(f"Fetched {len(products)} related products for product {product_id}.")
+        return jsonify({"products": products}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching related products for product {product_id}: {str(e)}")
+        return jsonify({"error": "Unable to fetch related products"}), 500
+
+
 @jwt_required()
 def add_review(product_id):
     """
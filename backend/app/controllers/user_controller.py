@@ -1,14 +1,18 @@
+import hashlib
 import os
-from io import BytesIO
-from flask import jsonify, request, current_app, send_from_directory, send_file
+from flask import jsonify, request, current_app, send_from_directory, send_file, redirect
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from ..services.user_service import (
     add_to_favorites, get_user_favorites, remove_from_favorites,
     sync_basket_service, get_user_basket, remove_from_basket_service,
-    add_product_to_purchased, get_user_purchased_products, get_user_info,
-    clear_user_basket, save_avatar, UPLOAD_FOLDER, get_all_users, get_avatar_url,
-    USE_S3_STORAGE, s3_client, S3_BUCKET, DEFAULT_AVATAR, DEFAULT_AVATAR_LOCAL_PATH
+    checkout, get_user_orders, get_user_purchased_products, get_user_info, save_avatar, UPLOAD_FOLDER, get_all_users, get_avatar_url,
+    USE_S3_STORAGE, s3_client, S3_BUCKET, DEFAULT_AVATAR, DEFAULT_AVATAR_LOCAL_PATH, iter_all_users,
+    get_user_basket_summary, get_session_bootstrap, open_s3_avatar, avatar_max_age,
+    redirects_avatars, get_presigned_avatar_url, avatar_candidates, avatar_mimetype, get_avatar_upload_status,
+    queue_missing_variants, may_be_stored_in_s3, ORDERS_PAGE_SIZE
 )
+from ..utils.circuit_breaker import CircuitOpenError
+from ..utils.streaming import stream_json_array
 
 
 @jwt_required()
@@ -16,10 +20,14 @@ def get_all_users_info():
     """
     Retrieves information of all users.
 
+    With `stream=true` the list is streamed as it is read from the database.
+
     Returns:
         JSON: A JSON response containing the list of all users and their information.
     """
     current_app.logger.info("Fetching information for all users.")
+    if request.args.get("stream") == "true":
+        return stream_json_array(iter_all_users()), 200
     users_info = get_all_users()
     return jsonify(users_info), 200
 
@@ -44,6 +52,33 @@ def get_current_user_info():
     return jsonify({"error": "User not found"}), 404
 
 
+@jwt_required()
+def get_bootstrap():
+    """
+    Retrieves the user's info, basket, favorites, purchased products and the app
+    configuration in a single response.
+
+    The response carries an ETag of its content, so a client revalidating with
+    If-None-Match gets an empty 304 when nothing changed.
+
+    Returns:
+        JSON: A JSON response containing the combined session data.
+    """
+    user_id = get_jwt_identity()
+    current_app.logger.info(f"Bootstrapping session for user {user_id}.")
+
+    bootstrap = get_session_bootstrap(user_id)
+    if not bootstrap:
+        current_app.logger.warning(f"User with ID {user_id} not found.")
+        return jsonify({"error": "User not found"}), 404
+
+    response = jsonify(bootstrap)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest())
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @jwt_required()
 def add_favorite():
     """
@@ -130,13 +165,18 @@ def get_basket():
     """
     Retrieves the user's current basket.
 
+    With `summary=true` the items are returned together with the basket's item count and total.
+
     Returns:
         JSON: A JSON response containing the user's basket.
     """
     user_id = get_jwt_identity()
     current_app.logger.info(f"Fetching basket for user {user_id}.")
 
-    basket = get_user_basket(user_id)
+    if request.args.get("summary") == "true":
+        basket = get_user_basket_summary(user_id)
+    else:
+        basket = get_user_basket(user_id)
     current_app.logger.info(f"Basket for user {user_id} retrieved successfully.")
 
     return jsonify(basket), 200
@@ -167,7 +207,7 @@ def remove_from_basket():
 @jwt_required()
 def purchase_product():
     """
-    Handles the purchase of a product by adding it to the user's purchased products and clearing the basket.
+    Handles the purchase of products by placing an order for them and clearing the basket.
 
     Returns:
         JSON: A JSON response indicating success or failure.
@@ -180,15 +220,41 @@ def purchase_product():
         current_app.logger.warning(f"Invalid data format for purchased products from user {user_id}.")
         return jsonify({"error": "Invalid data format"}), 400
 
-    # Add products to purchased
-    add_product_to_purchased(user_id, product_ids)
-    current_app.logger.info(f"Products {product_ids} purchased successfully by user {user_id}.")
+    result = checkout(user_id, product_ids)
+    if "error" in result:
+        current_app.logger.warning(f"Purchase failed for user {user_id}: {result['error']}")
+        return jsonify(result), 400
+
+    current_app.logger.info(f"Products {product_ids} purchased successfully by user {user_id}, basket cleared.")
+    return jsonify({
+        "message": "Product purchased successfully and basket cleared",
+        "order_id": result["order_id"]
+    }), 200
+
+
+@jwt_required()
+def get_orders():
+    """
+    Retrieves the user's purchase history, newest order first.
+
+    Query parameters:
+        limit (int): The page size.
+        before (int): The `next_cursor` returned with the previous page.
 
-    # Clear the basket after purchase
-    clear_user_basket(user_id)
-    current_app.logger.info(f"Basket cleared for user {user_id} after purchase.")
+    Returns:
+        JSON: A JSON response containing the orders and the next cursor.
+    """
+    user_id = get_jwt_identity()
+    try:
+        limit = int(request.args.get("limit", ORDERS_PAGE_SIZE))
+        before = request.args.get("before")
+        before = int(before) if before else None
+    except ValueError:
+        current_app.logger.warning(f"Invalid order history parameters from user {user_id}: {request.args}")
+        return jsonify({"error": "Invalid pagination parameters"}), 400
 
-    return jsonify({"message": "Product purchased successfully and basket cleared"}), 200
+    orders = get_user_orders(user_id, limit, before)
+    return jsonify(orders), 200
 
 
 @jwt_required()
@@ -212,6 +278,9 @@ def upload_avatar():
     """
     Handle avatar upload for the current logged-in user.
 
+    With S3 storage the upload finishes in the background and the response is a 202 with
+    the upload ID to poll.
+
     Returns:
         JSON: A JSON response indicating success or failure.
     """
@@ -230,63 +299,100 @@ def upload_avatar():
 
     if 'error' in result:
         return jsonify(result), 400
+    elif result.get("status") == "pending":
+        return jsonify(result), 202
     else:
         return jsonify(result), 200
 
 
+@jwt_required()
+def avatar_upload_status(upload_id):
+    """
+    Reports whether a background avatar upload of the current user finished.
+
+    Returns:
+        JSON: A JSON response with the upload status, and the new avatar URL once complete.
+    """
+    user_id = get_jwt_identity()
+    result = get_avatar_upload_status(user_id, upload_id)
+    if 'error' in result:
+        return jsonify(result), 404
+    return jsonify(result), 200
+
+
 def serve_avatar(filename):
     """
     Serve avatar images through backend, either from S3 or local storage.
     Always fallback to default avatar if there's any issue.
+
+    With `size`, the smallest resized variant covering that many pixels is served, or the
+    original while the variants are not generated yet, and the missing variants are queued.
+    Files served in place of the one asked for get a short max-age, so clients pick up the
+    real file once it exists.
+
+    S3 avatars are served from a local disk cache and every avatar is streamed from disk
+    with an ETag, Last-Modified and a long-lived Cache-Control header, so revalidating
+    clients get a 304. In redirect mode the client is sent to a presigned S3 URL instead,
+    so no avatar bytes pass through the app.
+
+    Names no upload can have are not looked up in S3, and missing S3 keys are remembered
+    for a while. When S3 fails, or its circuit breaker is open, the local avatar is served
+    without trying the remaining S3 keys.
     """
-    if USE_S3_STORAGE and s3_client:
+    if redirects_avatars():
         try:
-            if filename == DEFAULT_AVATAR:
-                response = s3_client.get_object(
-                    Bucket=S3_BUCKET,
-                    Key=f"avatars/{DEFAULT_AVATAR}"
-                )
-                return send_file(
-                    BytesIO(response['Body'].read()),
-                    mimetype=response.get('ContentType', 'image/jpeg')
-                )
-
-            # Try to get requested avatar
-            response = s3_client.get_object(
-                Bucket=S3_BUCKET,
-                Key=f"avatars/{filename}"
-            )
-            return send_file(
-                BytesIO(response['Body'].read()),
-                mimetype=response.get('ContentType', 'image/jpeg')
-            )
+            url, valid_for = get_presigned_avatar_url(filename)
+            response = redirect(url, 302)
+            response.cache_control.private = True
+            response.cache_control.max_age = valid_for
+            return response
         except Exception as e:
-            current_app.logger.error(f"Error getting avatar from S3: {str(e)}")
+            current_app.logger.error(f"Error presigning avatar {filename}: {str(e)}")
+
+    size = request.args.get("size", type=int)
+    candidates = avatar_candidates(filename, size)
+    if USE_S3_STORAGE and s3_client and may_be_stored_in_s3(filename):
+        # S3 is asked for the requested variant, then the original; the default avatar is
+        # served from its local copy.
+        for key in avatar_candidates(filename, size, include_default=False):
             try:
-                response = s3_client.get_object(
-                    Bucket=S3_BUCKET,
-                    Key=f"avatars/{DEFAULT_AVATAR}"
-                )
-                return send_file(
-                    BytesIO(response['Body'].read()),
-                    mimetype=response.get('ContentType', 'image/jpeg')
-                )
+                opened = open_s3_avatar(key)
+            except CircuitOpenError:
+                current_app.logger.warning(f"S3 unavailable, serving local default avatar for {filename}.")
+                break
             except Exception as e:
-                current_app.logger.error(f"Error getting default avatar from S3: {str(e)}")
-                if os.path.exists(DEFAULT_AVATAR_LOCAL_PATH):
-                    return send_from_directory(UPLOAD_FOLDER, DEFAULT_AVATAR)
-
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    current_app.logger.info(f"Checking local avatar: {file_path}, exists: {os.path.exists(file_path)}")
-    if os.path.exists(file_path):
-        current_app.logger.info(f"Serving user avatar: {file_path}")
-        return send_from_directory(UPLOAD_FOLDER, filename)
-
-    default_path = DEFAULT_AVATAR_LOCAL_PATH
-    current_app.logger.info(f"Checking default avatar: {default_path}, exists: {os.path.exists(default_path)}")
-    if os.path.exists(default_path):
-        current_app.logger.info(f"Serving default avatar: {default_path}")
-        return send_from_directory(UPLOAD_FOLDER, DEFAULT_AVATAR)
-
-    current_app.logger.warning(f"No avatar found for {filename}, default also missing at {default_path}")
-    return jsonify({"error": "Avatar not found"}), 404
\ No newline at end of file
+                # Only a missing key moves on to the next candidate; a failing S3 would fail
+                # for every one of them.
+                current_app.logger.error(f"Error getting avatar {key} from S3, serving local avatar: {str(e)}")
+                break
+            if opened is None:
+                current_app.logger.warning(f"Avatar {key} not found in S3.")
+                continue
+            # The cached file is sent through the handle opened for it, so an eviction meanwhile
+            # cannot make it disappear.
+            avatar, avatar_file = opened
+            response = send_file(
+                avatar_file,
+                mimetype=avatar.content_type,
+                etag=avatar.etag,
+                last_modified=avatar.last_modified,
+                max_age=avatar_max_age(key, requested=candidates[0]),
+                conditional=True
+            )
+            if response.status_code == 200:
+                response.content_length = avatar.size
+            if size is not None and key == filename:
+                queue_missing_variants(key, in_s3=True)
+            return response
+
+    for name in candidates:
+        file_path = os.path.join(UPLOAD_FOLDER, name)
+        if os.path.exists(file_path):
+            current_app.logger.info(f"Serving avatar: {file_path}")
+            if size is not None and name in (filename, DEFAULT_AVATAR):
+                queue_missing_variants(name, in_s3=False)
+            return send_from_directory(UPLOAD_FOLDER, name, mimetype=avatar_mimetype(name),
+                                       max_age=avatar_max_age(name, requested=candidates[0]))
+
+    current_app.logger.warning(f"No avatar found for {filename}, default also missing at {DEFAULT_AVATAR_LOCAL_PATH}")
+    return jsonify({"error": "Avatar not found"}), 404
@@ -1,5 +1,5 @@
 from bson import ObjectId
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 
 def to_dict(model: Any) -> Dict:
@@ -20,6 +20,23 @@ def to_dict(model: Any) -> Dict:
     raise ValueError("Provided object does not have a dict() method.")
 
 
+def parse_id_list(value: Any) -> List[int]:
+    """
+    Normalizes a stored list of IDs, which may be a native array or a comma-separated string.
+
+    Args:
+        value (Any): The stored value, e.g. [1, 2], "1,2", "" or None.
+
+    Returns:
+        List[int]: The IDs as integers.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [int(item) for item in value.split(',') if item.strip()]
+    return [int(item) for item in value]
+
+
 def format_validation_error(validation_error):
     """
     Format Pydantic validation errors into user-friendly messages.
@@ -0,0 +1,92 @@
+import gzip
+import os
+from typing import Optional
+
+from flask import g, request
+
+from ..utils.catalog_cache import catalog_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/javascript", "text/html", "text/css", "text/plain", "image/svg+xml"
+}
+
+
+def supported_encodings() -> list:
+    """Lists the content encodings this server can produce, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def precompressed(name: str, version: int) -> None:
+    """
+    Marks the current response as a cacheable document, so its compressed bytes are
+    produced once per catalog version and reused by later requests.
+
+    Args:
+        name (str): Identifies the document among the catalog cache artifacts.
+        version (int): The catalog version the response body was built from.
+    """
+    g.precompressed = (name, version)
+
+
+def negotiate_encoding() -> Optional[str]:
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    return encoding if encoding in supported_encodings() else None
+
+
+def compress_response(response):
+    """
+    Compresses eligible responses with the best encoding the client accepts.
+
+    Streamed and file responses, responses that are already encoded and bodies below
+    COMPRESSION_MIN_SIZE are sent as they are.
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers):
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    cache_entry = g.get("precompressed")
+    compressed = None
+    if cache_entry is not None:
+        name, version = cache_entry
+        compressed = catalog_cache.get_artifact((name, encoding))
+        if compressed is None:
+            compressed = compress(data, encoding)
+            catalog_cache.set_artifact((name, encoding), compressed, version)
+    else:
+        compressed = compress(data, encoding)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app):
+    """Registers response compression on the app."""
+    app.after_request(compress_response)
@@ -1,8 +1,19 @@
+import math
 from .. import db
+from sqlalchemy.dialects.postgresql import ARRAY, INTEGER
 from sqlalchemy.orm import relationship
 
+PRODUCT_FIELDS = ('id', 'name', 'description', 'price', 'category', 'image_url', 'is_alcohol', 'rating', 'reviews')
+STAR_VALUES = (1, 2, 3, 4, 5)
+
+
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_category_price', 'category', 'price'),
+        db.Index('ix_products_price', 'price'),
+        db.Index('ix_products_is_alcohol_price', 'is_alcohol', 'price'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -11,23 +22,28 @@ class Product(db.Model):
     category = db.Column(db.String(50))
     image_url = db.Column(db.String(255))
     is_alcohol = db.Column(db.Boolean, default=False)
-    reviews = relationship('Review', backref='product', lazy=True)
+    reviews = relationship('Review', backref='product', lazy=True, order_by='Review.id')
+    rating = relationship('ProductRating', uselist=False, lazy='joined')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'price': self.price,
-            'category': self.category,
-            'image_url': self.image_url,
-            'is_alcohol': self.is_alcohol,
-            'reviews': [review.to_dict() for review in self.reviews]
-        }
+    def to_dict(self, fields=None):
+        data = {}
+        for field in fields or PRODUCT_FIELDS:
+            if field == 'reviews':
+                data['reviews'] = [review.to_dict() for review in self.reviews]
+            elif field == 'rating':
+                data['rating'] = (self.rating or ProductRating(product_id=self.id)).to_dict()
+            else:
+                data[field] = getattr(self, field)
+        return data
 
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_product_id_id', 'product_id', 'id'),
+        db.Index('ix_reviews_product_id_rating_id', 'product_id', 'rating', 'id'),
+        db.Index('uq_reviews_product_id_author', 'product_id', 'author', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -43,3 +59,52 @@ class Review(db.Model):
             'rating': self.rating,
             'comment': self.comment,
         }
+
+
+def star_bucket(rating):
+    """Maps a rating to the 1-5 histogram bucket it is counted in."""
+    return min(max(int(math.floor(rating + 0.5)), 1), 5)
+
+
+class ProductRating(db.Model):
+    __tablename__ = 'product_ratings'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Float, nullable=False, default=0)
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def mean(self):
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 2)
+
+    def to_dict(self):
+        return {
+            'count': self.review_count or 0,
+            'sum': self.rating_sum or 0,
+            'mean': self.mean,
+            'histogram': {str(star): getattr(self, f'stars_{star}') or 0 for star in STAR_VALUES}
+        }
+
+
+class RelatedProducts(db.Model):
+    __tablename__ = 'related_products'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    related_ids = db.Column(ARRAY(INTEGER), nullable=False, default=[])
+    co_purchases = db.Column(ARRAY(INTEGER), nullable=False, default=[])
+
+
+class CatalogVersion(db.Model):
+    """The single row of catalog versions shared by all app instances, moved on every catalog write."""
+    __tablename__ = 'catalog_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    product_version = db.Column(db.BigInteger, nullable=False, default=0)
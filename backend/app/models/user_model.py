@@ -5,6 +5,9 @@ from sqlalchemy.dialects.postgresql import ARRAY, TEXT, INTEGER
 
 class BasketItem(db.Model):
     __tablename__ = 'basket_items'
+    __table_args__ = (
+        db.Index('uq_basket_items_user_id_product_id', 'user_id', 'product_id', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, nullable=False)
@@ -29,6 +32,8 @@ class User(db.Model):
     basket_items = db.relationship('BasketItem', backref='user', lazy=True, cascade="all, delete-orphan")
     purchased_products = db.Column(ARRAY(INTEGER), default=[])
     avatar = db.Column(db.String(255), nullable=True)
+    # The avatar upload still being transferred to S3; only that upload may replace `avatar`.
+    pending_avatar = db.Column(db.String(255), nullable=True)
 '''
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), nullable=False)
@@ -1,6 +1,7 @@
 from flask import Blueprint
-from ..controllers.health_controller import health_check
+from ..controllers.health_controller import health_check, cache_stats
 
 health_bp = Blueprint('health', __name__)
 
 health_bp.route('/health', methods=['GET'])(health_check)
+health_bp.route('/health/cache', methods=['GET'])(cache_stats)
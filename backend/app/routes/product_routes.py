@@ -1,11 +1,20 @@
 from flask import Blueprint
-from ..controllers.product_controller import fetch_all_products, get_single_product, add_review, delete_review, update_review
+from ..controllers.product_controller import fetch_all_products, get_single_product, add_review, delete_review, update_review, \
+    search_catalog, filter_catalog, list_reviews, fetch_products_batch, list_related_products, \
+    top_rated_leaderboard, most_reviewed_leaderboard
 
 product_bp = Blueprint('product', __name__, url_prefix='/api/products')
 
 product_bp.route('/all_products', methods=['GET'])(fetch_all_products)
+product_bp.route('/search', methods=['GET'])(search_catalog)
+product_bp.route('/filter', methods=['GET'])(filter_catalog)
+product_bp.route('/batch', methods=['GET'])(fetch_products_batch)
+product_bp.route('/leaderboards/top-rated', methods=['GET'])(top_rated_leaderboard)
+product_bp.route('/leaderboards/most-reviewed', methods=['GET'])(most_reviewed_leaderboard)
 product_bp.route('/<product_id>', methods=['GET'])(get_single_product)
 
+product_bp.route('/<product_id>/reviews', methods=['GET'])(list_reviews)
+product_bp.route('/<product_id>/related', methods=['GET'])(list_related_products)
 product_bp.route('/<product_id>/add-review', methods=['POST'])(add_review)
 product_bp.route('/<product_id>/remove-review', methods=['DELETE'])(delete_review)
 product_bp.route('/<product_id>/update-review', methods=['PUT'])(update_review)
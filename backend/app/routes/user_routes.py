@@ -1,14 +1,16 @@
 from flask import Blueprint
 from ..controllers.user_controller import add_favorite, get_favorites, remove_favorite, sync_basket, get_basket, \
     remove_from_basket, purchase_product, get_purchased_products, get_current_user_info, upload_avatar, serve_avatar, \
-    get_all_users_info
+    get_all_users_info, get_orders, get_bootstrap, avatar_upload_status
 
 user_bp = Blueprint('favorite', __name__, url_prefix='/api/me')
 
 user_bp.route('/info', methods=['GET'])(get_current_user_info)
+user_bp.route('/bootstrap', methods=['GET'])(get_bootstrap)
 user_bp.route('/all-users', methods=['GET'])(get_all_users_info)
 user_bp.route('/avatar', methods=['POST'])(upload_avatar)
 user_bp.route('/avatar/<filename>', methods=['GET'])(serve_avatar)
+user_bp.route('/avatar/uploads/<upload_id>', methods=['GET'])(avatar_upload_status)
 
 user_bp.route('/favorites', methods=['POST'])(add_favorite)
 user_bp.route('/favorites/remove', methods=['POST'])(remove_favorite)
@@ -20,3 +22,4 @@ user_bp.route('/basket/remove', methods=['POST'])(remove_from_basket)
 
 user_bp.route('/purchase', methods=['POST'])(purchase_product)
 user_bp.route('/purchased-products', methods=['GET'])(get_purchased_products)
+user_bp.route('/orders', methods=['GET'])(get_orders)
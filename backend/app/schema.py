@@ -0,0 +1,66 @@
+from typing import Dict, Tuple
+
+from sqlalchemy import inspect, text
+
+from . import db
+from .services.product_service import rebuild_rating_aggregates
+
+# The key columns of the unique indexes added after the first migration; existing
+# databases may hold rows that duplicate them.
+UNIQUE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "reviews": ("product_id", "author"),
+    "basket_items": ("user_id", "product_id"),
+}
+
+
+def remove_duplicate_rows(connection, table: str) -> int:
+    """
+    Keeps only the oldest row per unique key of a table.
+
+    Args:
+        connection: The connection of the transaction to run in.
+        table (str): A table listed in UNIQUE_KEYS.
+
+    Returns:
+        int: The number of rows removed.
+    """
+    matching = " AND ".join(f"newer.{column} = older.{column}" for column in UNIQUE_KEYS[table])
+    result = connection.execute(text(
+        f"DELETE FROM {table} newer USING {table} older WHERE {matching} AND newer.id > older.id"
+    ))
+    return result.rowcount
+
+
+def create_missing_schema() -> Dict[str, int]:
+    """
+    Creates the tables, columns and indexes added to the models after the database was
+    first migrated. Added columns must be nullable, since existing rows get NULL.
+
+    Before a missing unique index is built, the rows duplicating its key are removed in the
+    same transaction, under a lock that keeps new duplicates from being written meanwhile.
+    The rating aggregates are rebuilt when reviews were removed.
+
+    Returns:
+        Dict[str, int]: The number of duplicate rows removed per table.
+    """
+    db.create_all()
+    removed = {}
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    column_type = column.type.compile(dialect=connection.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if index.unique and table.name in UNIQUE_KEYS:
+                    connection.execute(text(f"LOCK TABLE {table.name} IN SHARE ROW EXCLUSIVE MODE"))
+                    removed[table.name] = remove_duplicate_rows(connection, table.name)
+                index.create(bind=connection)
+    if removed.get("reviews"):
+        rebuild_rating_aggregates()
+    return removed
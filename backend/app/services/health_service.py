@@ -1,6 +1,12 @@
 from sqlalchemy import text
 from .. import db
 from flask import current_app
+from ..utils.catalog_cache import catalog_cache
+from ..utils.avatar_cache import avatar_disk_cache
+from ..utils.avatar_index import avatar_index
+from ..utils.avatar_uploads import avatar_uploads
+from ..utils.circuit_breaker import s3_breaker
+from ..utils.presigned_urls import presigned_urls
 
 def perform_health_check() -> dict:
     """
@@ -17,3 +23,17 @@ def perform_health_check() -> dict:
     except Exception as e:
         current_app.logger.error(f"Health check failed: {e}")
         return {"status": "ERROR", "message": "Database unreachable."}
+
+
+def get_cache_stats() -> dict:
+    """
+    Reports the hit/miss counters and size of the in-process catalog cache, and the size
+    of the avatar index, the S3 avatar disk cache and the presigned URL cache, and the
+    state of the S3 circuit breaker and the background avatar uploads.
+
+    Returns:
+        dict: A dictionary containing the catalog cache statistics.
+    """
+    return {"catalog": catalog_cache.stats(), "avatars": avatar_index.stats(),
+            "avatar_disk_cache": avatar_disk_cache.stats(), "presigned_urls": presigned_urls.stats(),
+            "s3_breaker": s3_breaker.stats(), "avatar_uploads": avatar_uploads.stats()}
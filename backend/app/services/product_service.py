@@ -1,48 +1,501 @@
 from .. import db
 from flask import current_app
-from typing import List, Dict
-from ..models.product_model import Review, Product
+from typing import List, Dict, Iterator, Optional, Sequence, Tuple
+from itertools import chain
+from sqlalchemy import delete, event, literal, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, load_only, selectinload
+from ..models.product_model import Review, Product, ProductRating, PRODUCT_FIELDS, STAR_VALUES, star_bucket
+from ..utils.catalog_cache import catalog_cache
+from ..utils.search_index import search_index
+from ..utils.facet_index import facet_index
+from ..utils.leaderboard import leaderboards
+from ..utils.streaming import STREAM_BATCH_SIZE
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+LISTING_FIELDS = tuple(field for field in PRODUCT_FIELDS if field != 'reviews')
+AUTOCOMPLETE_LIMIT = 10
+REVIEW_ORDERS = ('id', 'rating')
+LEADERBOARD_SIZE = 20
+
+
+CATALOG_VERSIONS_SQL = text("SELECT version, product_version FROM catalog_versions WHERE id = 1")
+PUBLISH_CATALOG_CHANGE_SQL = text(
+    "INSERT INTO catalog_versions (id, version, product_version) VALUES (1, 1, :products) "
+    "ON CONFLICT (id) DO UPDATE SET version = catalog_versions.version + 1, "
+    "product_version = catalog_versions.product_version + :products "
+    "RETURNING version, product_version"
+)
+
+
+def publish_catalog_change(products: bool = False) -> None:
+    """
+    Moves the shared catalog version, and with `products` the product version, after a
+    catalog write was committed. This instance drops its cached documents at once, the
+    others at their next version check.
+
+    Args:
+        products (bool): Whether product rows changed, not only reviews.
+    """
+    if products:
+        catalog_cache.bump_product_version()
+    else:
+        catalog_cache.bump_version()
+    try:
+        with db.engine.begin() as connection:
+            shared_versions = connection.execute(PUBLISH_CATALOG_CHANGE_SQL, {"products": int(products)}).first()
+        catalog_cache.sync(tuple(shared_versions))
+    except Exception as e:
+        current_app.logger.error(f"Error publishing catalog change: {str(e)}")
+
+
+def sync_catalog_version() -> None:
+    """
+    Picks up the catalog changes published by any instance, reading the shared versions at
+    most every CATALOG_VERSION_CHECK_SECONDS. Runs before every request.
+    """
+    if not catalog_cache.needs_sync():
+        return
+    try:
+        with db.engine.connect() as connection:
+            shared_versions = connection.execute(CATALOG_VERSIONS_SQL).first()
+        catalog_cache.sync(tuple(shared_versions) if shared_versions else (0, 0))
+    except Exception as e:
+        current_app.logger.error(f"Error reading the catalog version: {str(e)}")
+        catalog_cache.sync(None)
+
+
+@event.listens_for(Session, "after_flush")
+def note_product_changes(session, flush_context) -> None:
+    """Flags sessions that wrote product rows, so their commit moves the product version."""
+    if any(isinstance(obj, Product) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["products_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def publish_product_changes(session) -> None:
+    if session.info.pop("products_changed", False):
+        publish_catalog_change(products=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_product_changes(session) -> None:
+    session.info.pop("products_changed", None)
 
 
 def get_all_products() -> List[Dict]:
     """
-    Retrieves all products from the database.
+    Retrieves all products, from the catalog cache when possible, otherwise from the database.
 
     Returns:
         List[Dict]: A list of dictionaries, each representing a product.
     """
+    cached_products = catalog_cache.get_catalog()
+    if cached_products is not None:
+        return cached_products
+
     try:
-        products_collection = Product.query.all()
+        version = catalog_cache.version
+        products_collection = Product.query.options(selectinload(Product.reviews)).order_by(Product.id).all()
         current_app.logger.debug(f"Products fetched: {products_collection}")
         if not products_collection:
             current_app.logger.error("No products fetched from the database.")
-        return [product.to_dict() for product in products_collection]
+            return []
+        products = [product.to_dict() for product in products_collection]
+        catalog_cache.set_catalog(products, version)
+        return products
     except Exception as e:
         current_app.logger.error(f"Error fetching products: {str(e)}")
         return []
 
-def get_product_by_id(product_id: int) -> Dict:
+
+def iter_all_products(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict]:
+    """
+    Yields every product in the same order and shape as `get_all_products`, reading the
+    database through a server-side cursor so only one batch is held in memory at a time.
+
+    Args:
+        batch_size (int): The number of products fetched per round trip.
+
+    Yields:
+        Dict: A dictionary representing a product.
+    """
+    cached_products = catalog_cache.get_catalog()
+    if cached_products is not None:
+        yield from cached_products
+        return
+
+    # A 2.0-style select, since the legacy Query uniquifies rows and cannot be combined with yield_per.
+    query = select(Product).options(selectinload(Product.reviews)).order_by(Product.id) \
+        .execution_options(yield_per=batch_size)
+    for product in db.session.scalars(query):
+        yield product.to_dict()
+
+
+def product_load_options(fields: Sequence[str]) -> list:
+    """
+    Builds the loader options that fetch only the columns and relationships needed for `fields`.
+    """
+    columns = [getattr(Product, field) for field in fields if field not in ('reviews', 'rating')]
+    options = [load_only(Product.id, *columns)]
+    if 'reviews' in fields:
+        options.append(selectinload(Product.reviews))
+    return options
+
+
+def get_products_page(limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                      fields: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Retrieves one page of products ordered by ID, using the last seen ID as cursor.
+
+    Args:
+        limit (int): The maximum number of products to return.
+        after (int, optional): Only products with an ID greater than this are returned.
+        fields (Sequence[str], optional): The product fields to include, defaults to all of them.
+
+    Returns:
+        Dict: The page of products and the cursor to pass as `after` for the next page,
+              which is None when there are no more products.
+    """
+    fields = list(fields or PRODUCT_FIELDS)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query = Product.query.options(*product_load_options(fields)).order_by(Product.id)
+    if after is not None:
+        query = query.filter(Product.id > after)
+
+    # Fetch one extra row to know whether another page exists.
+    products = query.limit(limit + 1).all()
+    has_more = len(products) > limit
+    products = products[:limit]
+
+    current_app.logger.debug(f"Fetched {len(products)} products after ID {after}.")
+    return {
+        "products": [product.to_dict(fields) for product in products],
+        "next_cursor": products[-1].id if has_more else None
+    }
+
+
+def ensure_search_index() -> None:
+    """
+    Builds the in-memory product search index if it was never built, and rebuilds it in
+    the background once the products changed or it expired.
+    """
+    app = current_app._get_current_object()
+
+    def load_products():
+        with app.app_context():
+            rows = db.session.query(Product.id, Product.name, Product.description, Product.category).all()
+        app.logger.info(f"Building product search index over {len(rows)} products.")
+        return rows
+
+    search_index.refresh(catalog_cache.product_version, load_products)
+
+
+def search_products(query: str, limit: int = DEFAULT_PAGE_SIZE, after: Optional[tuple] = None,
+                    fields: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Searches products by name, category and description, most relevant first.
+
+    Args:
+        query (str): The search text; every term must match.
+        limit (int): The maximum number of products to return.
+        after (tuple, optional): The decoded `next_cursor` of the previous page.
+        fields (Sequence[str], optional): The product fields to include, defaults to all but reviews.
+
+    Returns:
+        Dict: The matching products and the cursor of the next page, which is None on the last page.
+    """
+    ensure_search_index()
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    fields = list(fields or LISTING_FIELDS)
+    results, next_cursor = search_index.search(query, limit, after)
+
+    products, _ = get_products_by_ids([product_id for product_id, _ in results], fields)
+    return {
+        "products": products,
+        "next_cursor": next_cursor
+    }
+
+
+def autocomplete_products(prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[Dict]:
+    """
+    Suggests products whose terms start with the typed text, served from the search index alone.
+
+    Args:
+        prefix (str): The text typed so far; its last term is matched as a prefix.
+        limit (int): The maximum number of suggestions.
+
+    Returns:
+        List[Dict]: The suggested products' IDs and names.
+    """
+    ensure_search_index()
+    results, _ = search_index.search(prefix, max(1, min(limit, MAX_PAGE_SIZE)), prefix=True)
+    return [{"id": product_id, "name": search_index.name(product_id)} for product_id, _ in results]
+
+
+def ensure_facet_index() -> None:
+    """
+    Rebuilds the facet index when the products changed since it was last built.
+    """
+    version = catalog_cache.product_version
+    if facet_index.is_stale(version):
+        rows = db.session.query(Product.category, Product.price, Product.is_alcohol).all()
+        facet_index.build(rows, version)
+        current_app.logger.info(f"Built product facet index over {len(rows)} products.")
+
+
+def filter_products(categories: Optional[Sequence[str]] = None, min_price: Optional[float] = None,
+                    max_price: Optional[float] = None, is_alcohol: Optional[bool] = None,
+                    limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None,
+                    fields: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Retrieves a page of products matching the filters, with facet counts for the whole result set.
+
+    Args:
+        categories (Sequence[str], optional): Only include products in these categories.
+        min_price (float, optional): Inclusive lower price bound.
+        max_price (float, optional): Inclusive upper price bound.
+        is_alcohol (bool, optional): Only include alcoholic or non-alcoholic products.
+        limit (int): The maximum number of products to return.
+        after (int, optional): Only products with an ID greater than this are returned.
+        fields (Sequence[str], optional): The product fields to include, defaults to all but reviews.
+
+    Returns:
+        Dict: The page of products, the cursor of the next page and the facet counts.
+    """
+    ensure_facet_index()
+    fields = list(fields or LISTING_FIELDS)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query = Product.query.options(*product_load_options(fields)).order_by(Product.id)
+    if categories:
+        query = query.filter(Product.category.in_(categories))
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if is_alcohol is not None:
+        query = query.filter(Product.is_alcohol.is_(is_alcohol))
+    if after is not None:
+        query = query.filter(Product.id > after)
+
+    products = query.limit(limit + 1).all()
+    has_more = len(products) > limit
+    products = products[:limit]
+
+    return {
+        "products": [product.to_dict(fields) for product in products],
+        "next_cursor": products[-1].id if has_more else None,
+        "facets": facet_index.counts(categories, min_price, max_price, is_alcohol)
+    }
+
+
+def ensure_leaderboards() -> None:
+    """
+    Rebuilds the leaderboards from the rating aggregates when the catalog version changed.
+    """
+    version = catalog_cache.version
+    if leaderboards.is_stale(version):
+        rows = db.session.query(
+            ProductRating.product_id, Product.category, ProductRating.review_count, ProductRating.rating_sum
+        ).join(Product, Product.id == ProductRating.product_id).all()
+        leaderboards.build(rows, version)
+        current_app.logger.info(f"Built leaderboards over {len(rows)} rated products.")
+
+
+def get_top_rated_products(limit: int = LEADERBOARD_SIZE, category: Optional[str] = None) -> List[Dict]:
+    """
+    Retrieves the best rated products by Bayesian average, overall or within a category.
+
+    Args:
+        limit (int): The maximum number of products to return.
+        category (str, optional): Only rank products in this category.
+
+    Returns:
+        List[Dict]: The products, best first, each with its ranking `score`.
+    """
+    ensure_leaderboards()
+    return _ranked_products(leaderboards.top_rated(max(1, min(limit, MAX_PAGE_SIZE)), category))
+
+
+def get_most_reviewed_products(limit: int = LEADERBOARD_SIZE) -> List[Dict]:
     """
-    Retrieves a product by its ID.
+    Retrieves the products with the most reviews.
+
+    Args:
+        limit (int): The maximum number of products to return.
+
+    Returns:
+        List[Dict]: The products, most reviewed first, each with its review count as `score`.
+    """
+    ensure_leaderboards()
+    return _ranked_products(leaderboards.most_reviewed(max(1, min(limit, MAX_PAGE_SIZE))))
+
+
+def _ranked_products(ranking: List[Tuple[int, float]]) -> List[Dict]:
+    products, _ = get_products_by_ids([product_id for product_id, _ in ranking], LISTING_FIELDS)
+    scores = dict(ranking)
+    return [{**product, "score": round(scores[product["id"]], 4)} for product in products]
+
+
+def get_product_by_id(product_id: int, review_limit: Optional[int] = None) -> Dict:
+    """
+    Retrieves a product by its ID, from the catalog cache when possible.
 
     Args:
         product_id (str): The ID of the product to retrieve.
+        review_limit (int, optional): Embed only the first N reviews, or none when 0.
+                                      All reviews are embedded when not given.
 
     Returns:
         Dict: A dictionary representing the product if found, otherwise an empty dictionary.
     """
-    product = Product.query.get(product_id)
+    if review_limit is not None:
+        return get_product_with_review_limit(product_id, review_limit)
+
+    cached_product = catalog_cache.get_product(product_id)
+    if cached_product is not None:
+        return cached_product
+
+    version = catalog_cache.version
+    product = Product.query.options(selectinload(Product.reviews)).get(product_id)
     if product:
         current_app.logger.info(f"Product with ID {product_id} found.")
-        return product.to_dict()
+        product_dict = product.to_dict()
+        catalog_cache.set_product(product_id, product_dict, version)
+        return product_dict
     current_app.logger.warning(f"Product with ID {product_id} not found.")
     return {}
 
 
+def get_products_by_ids(product_ids: Sequence[int],
+                        fields: Optional[Sequence[str]] = None) -> Tuple[List[Dict], List[int]]:
+    """
+    Retrieves several products with a single query, in the order their IDs were given.
+
+    Full product documents are served from the catalog cache when possible and only the
+    missing ones are queried; projected documents are always read from the database.
+
+    Args:
+        product_ids (Sequence[int]): The IDs of the products to retrieve.
+        fields (Sequence[str], optional): The product fields to include, defaults to all of them.
+
+    Returns:
+        Tuple[List[Dict], List[int]]: The products found, and the IDs that do not exist.
+    """
+    found: Dict[int, Dict] = {}
+    if fields is None:
+        for product_id in product_ids:
+            cached_product = catalog_cache.get_product(product_id)
+            if cached_product is not None:
+                found[product_id] = cached_product
+
+    to_fetch = list(dict.fromkeys(product_id for product_id in product_ids if product_id not in found))
+    if to_fetch:
+        version = catalog_cache.version
+        query_fields = list(fields or PRODUCT_FIELDS)
+        products = Product.query.options(*product_load_options(query_fields)) \
+            .filter(Product.id.in_(to_fetch)).all()
+        for product in products:
+            found[product.id] = product.to_dict(query_fields)
+            if fields is None:
+                catalog_cache.set_product(product.id, found[product.id], version)
+
+    missing = [product_id for product_id in dict.fromkeys(product_ids) if product_id not in found]
+    current_app.logger.debug(f"Fetched {len(found)} products by ID, {len(missing)} missing.")
+    return [found[product_id] for product_id in product_ids if product_id in found], missing
+
+
+def get_product_with_review_limit(product_id: int, review_limit: int) -> Dict:
+    """
+    Retrieves a product with at most `review_limit` of its reviews, lowest IDs first.
+
+    Args:
+        product_id (int): The ID of the product to retrieve.
+        review_limit (int): The maximum number of reviews to embed; 0 leaves them out.
+
+    Returns:
+        Dict: A dictionary representing the product if found, otherwise an empty dictionary.
+    """
+    cached_product = catalog_cache.get_product(product_id)
+    if cached_product is not None:
+        product_dict = {field: value for field, value in cached_product.items() if field != 'reviews'}
+        if review_limit:
+            product_dict['reviews'] = cached_product['reviews'][:review_limit]
+        return product_dict
+
+    product = Product.query.options(*product_load_options(LISTING_FIELDS)).get(product_id)
+    if not product:
+        current_app.logger.warning(f"Product with ID {product_id} not found.")
+        return {}
+
+    product_dict = product.to_dict(LISTING_FIELDS)
+    if review_limit:
+        product_dict['reviews'] = get_product_reviews(product_id, review_limit).get('reviews', [])
+    return product_dict
+
+
+def product_exists(product_id: int) -> bool:
+    return db.session.query(Product.id).filter_by(id=int(product_id)).first() is not None
+
+
+def get_product_reviews(product_id: int, limit: int = DEFAULT_PAGE_SIZE, after: Optional[tuple] = None,
+                        order: str = 'id') -> Dict:
+    """
+    Retrieves one page of a product's reviews using keyset pagination.
+
+    Args:
+        product_id (int): The ID of the product.
+        limit (int): The maximum number of reviews to return.
+        after (tuple, optional): The decoded `next_cursor` of the previous page: (id,) when
+                                 ordering by ID, (rating, id) when ordering by rating.
+        order (str): `id` for oldest first, `rating` for highest rated first.
+
+    Returns:
+        Dict: The page of reviews and the cursor of the next page, which is None on the last page,
+              or an empty dictionary if the product does not exist.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = Review.query.filter(Review.product_id == product_id)
+
+    if order == 'rating':
+        query = query.order_by(Review.rating.desc(), Review.id.desc())
+        if after is not None:
+            query = query.filter(tuple_(Review.rating, Review.id) < tuple_(*after))
+    else:
+        query = query.order_by(Review.id)
+        if after is not None:
+            query = query.filter(Review.id > after[0])
+
+    reviews = query.limit(limit + 1).all()
+    # Reviews reference their product, so only an empty page leaves its existence open.
+    if not reviews and not product_exists(product_id):
+        current_app.logger.warning(f"Product with ID {product_id} not found.")
+        return {}
+    has_more = len(reviews) > limit
+    reviews = reviews[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = reviews[-1]
+        next_cursor = f"{last.rating!r}:{last.id}" if order == 'rating' else str(last.id)
+
+    return {
+        "reviews": [review.to_dict() for review in reviews],
+        "next_cursor": next_cursor
+    }
+
+
 def add_review_to_product(product_id: int, review_data: Dict) -> Dict:
     """
     Adds a review to the specified product.
 
+    The review is inserted with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING, so a
+    missing product or an existing review by the same author results in no row, and two
+    concurrent submissions cannot both succeed.
+
     Args:
         product_id (str): The ID of the product.
         review_data (Dict): The review data as a dictionary.
@@ -50,56 +503,123 @@ def add_review_to_product(product_id: int, review_data: Dict) -> Dict:
     Returns:
         Dict: A dictionary containing the result of the review submission.
     """
-    product = Product.query.get(product_id)
     current_app.logger.debug(f"Review data received: {review_data}")
+    product_id = int(product_id)
+    author = review_data["author"]
+    rating = float(review_data["rating"])
 
-    if not product:
-        current_app.logger.error(f"Product with ID {product_id} not found.")
-        return {"error": "Product not found"}
-
-    existing_review = Review.query.filter_by(product_id=product_id, author=review_data["author"]).first()
+    review_values = select(
+        Product.id, literal(author), literal(rating), literal(review_data.get("comment", ""))
+    ).where(Product.id == product_id)
+    statement = insert(Review).from_select(
+        [Review.product_id, Review.author, Review.rating, Review.comment], review_values
+    ).on_conflict_do_nothing(index_elements=[Review.product_id, Review.author]).returning(Review.id)
 
-    if existing_review:
-        current_app.logger.warning(f"User {review_data['author']} has already reviewed product {product_id}.")
+    if db.session.execute(statement).first() is None:
+        db.session.rollback()
+        if not db.session.query(Product.id).filter_by(id=product_id).first():
+            current_app.logger.error(f"Product with ID {product_id} not found.")
+            return {"error": "Product not found"}
+        current_app.logger.warning(f"User {author} has already reviewed product {product_id}.")
         return {"error": "User has already reviewed this product"}
 
-    # Manually creating the review based on the dictionary data
-    new_review = Review(
-        product_id=product_id,
-        author=review_data["author"],
-        rating=review_data["rating"],
-        comment=review_data.get("comment", "")
-    )
-
-    db.session.add(new_review)
+    apply_rating_delta(product_id, added=rating)
     db.session.commit()
+    publish_catalog_change()
 
-    current_app.logger.info(f"New review added for product {product_id} by {review_data['author']}.")
+    current_app.logger.info(f"New review added for product {product_id} by {author}.")
     return {"message": "Review added successfully"}
 
 
 def remove_review_from_product(product_id: int, author_name: str) -> Dict:
-    review = Review.query.filter_by(product_id=product_id, author=author_name).first()
+    statement = delete(Review).where(Review.product_id == product_id, Review.author == author_name) \
+        .returning(Review.rating).execution_options(synchronize_session=False)
+    deleted = db.session.execute(statement).first()
 
-    if review:
-        db.session.delete(review)
+    if deleted:
+        apply_rating_delta(product_id, removed=deleted.rating)
         db.session.commit()
+        publish_catalog_change()
         current_app.logger.info(f"Review by {author_name} for product {product_id} deleted successfully.")
         return {"message": "Review deleted successfully"}
 
+    db.session.rollback()
     current_app.logger.warning(f"Review by {author_name} for product {product_id} not found.")
     return {"error": "Review not found"}
 
 
 def update_product_review(product_id: int, author_name: str, updated_data: Dict) -> Dict:
-    review = Review.query.filter_by(product_id=product_id, author=author_name).first()
+    # Lock and read the previous rating in the same statement, for the aggregates.
+    previous = select(Review.id, Review.rating) \
+        .where(Review.product_id == product_id, Review.author == author_name) \
+        .with_for_update().subquery()
+    statement = update(Review).where(Review.id == previous.c.id) \
+        .values(rating=updated_data["rating"], comment=updated_data["comment"]) \
+        .returning(previous.c.rating).execution_options(synchronize_session=False)
+    updated = db.session.execute(statement).first()
 
-    if review:
-        review.rating = updated_data["rating"]
-        review.comment = updated_data["comment"]
+    if updated:
+        apply_rating_delta(product_id, added=float(updated_data["rating"]), removed=updated.rating)
         db.session.commit()
-        current_app.logger.info(f"Updated review added for product {product_id} by {review.author}.")
+        publish_catalog_change()
+        current_app.logger.info(f"Updated review added for product {product_id} by {author_name}.")
         return {"message": "Review updated successfully"}
 
+    db.session.rollback()
     current_app.logger.warning(f"Review by {author_name} for product {product_id} not found.")
     return {"error": "Review not found"}
+
+
+def apply_rating_delta(product_id: int, added: Optional[float] = None, removed: Optional[float] = None) -> None:
+    """
+    Updates the stored rating aggregates of a product within the current transaction.
+
+    Args:
+        product_id (int): The ID of the product.
+        added (float, optional): The rating of a review that was added.
+        removed (float, optional): The rating of a review that was removed.
+    """
+    deltas = {'review_count': 0, 'rating_sum': 0.0}
+    deltas.update({f'stars_{star}': 0 for star in STAR_VALUES})
+    if added is not None:
+        deltas['review_count'] += 1
+        deltas['rating_sum'] += added
+        deltas[f'stars_{star_bucket(added)}'] += 1
+    if removed is not None:
+        deltas['review_count'] -= 1
+        deltas['rating_sum'] -= removed
+        deltas[f'stars_{star_bucket(removed)}'] -= 1
+
+    statement = insert(ProductRating).values(product_id=int(product_id), **deltas)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ProductRating.product_id],
+        set_={column: getattr(ProductRating, column) + getattr(statement.excluded, column) for column in deltas}
+    )
+    db.session.execute(statement)
+
+
+def rebuild_rating_aggregates() -> int:
+    """
+    Recomputes the rating aggregates of every product from the reviews table.
+
+    Returns:
+        int: The number of products that have at least one review.
+    """
+    star_counts = ", ".join(
+        f"COUNT(*) FILTER (WHERE LEAST(GREATEST(FLOOR(rating + 0.5), 1), 5) = {star})" for star in STAR_VALUES
+    )
+    star_columns = ", ".join(f"stars_{star}" for star in STAR_VALUES)
+    try:
+        db.session.execute(text("DELETE FROM product_ratings"))
+        result = db.session.execute(text(
+            f"INSERT INTO product_ratings (product_id, review_count, rating_sum, {star_columns}) "
+            f"SELECT product_id, COUNT(*), SUM(rating), {star_counts} FROM reviews GROUP BY product_id"
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error rebuilding rating aggregates: {str(e)}")
+        raise
+    publish_catalog_change()
+    current_app.logger.info(f"Rebuilt rating aggregates for {result.rowcount} products.")
+    return result.rowcount
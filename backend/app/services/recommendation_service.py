@@ -0,0 +1,151 @@
+import os
+from array import array
+from collections import defaultdict
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from flask import current_app
+from scipy import sparse
+from sqlalchemy import delete, insert
+
+from .. import db
+from ..helpers import parse_id_list
+from ..models.product_model import RelatedProducts
+from ..models.user_model import User
+from ..models.order_model import Order, OrderItem
+from .product_service import get_products_by_ids, LISTING_FIELDS
+
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "10"))
+RELATED_BUILD_BATCH_SIZE = 10000
+
+
+def build_cooccurrence_index(purchase_histories: Iterable[Sequence[int]],
+                             top_k: int = RELATED_TOP_K) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Finds, for every product, the products most often bought by the same users.
+
+    The histories are turned into a sparse binary user x product matrix X; X^T X then
+    holds, for each pair of products, the number of users who bought both.
+
+    Args:
+        purchase_histories (Iterable[Sequence[int]]): The purchased product IDs of each user.
+        top_k (int): The maximum number of neighbours kept per product.
+
+    Returns:
+        Dict[int, List[Tuple[int, int]]]: For each product, its (product_id, co_purchases)
+                                          neighbours, most co-purchased first.
+    """
+    user_indices = array('q')
+    product_ids = array('q')
+    user_count = 0
+    for user_index, history in enumerate(purchase_histories):
+        product_ids.extend(history)
+        user_indices.extend(repeat(user_index, len(history)))
+        user_count = user_index + 1
+
+    if not product_ids:
+        return {}
+    user_indices = np.frombuffer(user_indices, dtype=np.int64)
+    product_ids = np.frombuffer(product_ids, dtype=np.int64)
+
+    # Map product IDs to dense column numbers.
+    columns_to_ids, columns = np.unique(product_ids, return_inverse=True)
+    purchases = sparse.csr_matrix(
+        (np.ones(len(columns), dtype=np.int32), (user_indices, columns)),
+        shape=(user_count, len(columns_to_ids))
+    )
+    # Repeated purchases of a product by the same user count once.
+    purchases.data[:] = 1
+    cooccurrences = (purchases.T @ purchases).tocsr()
+    cooccurrences.setdiag(0)
+    cooccurrences.eliminate_zeros()
+
+    index = {}
+    for column, product_id in enumerate(columns_to_ids):
+        start, end = cooccurrences.indptr[column], cooccurrences.indptr[column + 1]
+        if start == end:
+            continue
+        neighbour_ids = columns_to_ids[cooccurrences.indices[start:end]]
+        counts = cooccurrences.data[start:end]
+        # Most co-purchased first, lowest product ID first among ties.
+        order = np.lexsort((neighbour_ids, -counts))[:top_k]
+        index[int(product_id)] = [(int(neighbour_ids[i]), int(counts[i])) for i in order]
+    return index
+
+
+def load_purchase_histories() -> Iterable[Sequence[int]]:
+    """
+    Collects the products each user has purchased, from their orders and from the purchases
+    recorded on the user before orders existed.
+
+    Returns:
+        Iterable[Sequence[int]]: The purchased product IDs of each user who bought anything.
+    """
+    histories = defaultdict(set)
+    legacy_purchases = db.session.query(User.id, User.purchased_products) \
+        .execution_options(yield_per=RELATED_BUILD_BATCH_SIZE)
+    for user_id, purchased_products in legacy_purchases:
+        product_ids = parse_id_list(purchased_products)
+        if product_ids:
+            histories[user_id].update(product_ids)
+
+    ordered_products = db.session.query(Order.user_id, OrderItem.product_id) \
+        .join(Order, Order.id == OrderItem.order_id) \
+        .execution_options(yield_per=RELATED_BUILD_BATCH_SIZE)
+    for user_id, product_id in ordered_products:
+        histories[user_id].add(product_id)
+    return [list(product_ids) for product_ids in histories.values()]
+
+
+def rebuild_related_products(top_k: int = RELATED_TOP_K) -> int:
+    """
+    Recomputes the related products of every product from the users' purchase histories
+    and replaces the stored index.
+
+    Args:
+        top_k (int): The maximum number of related products kept per product.
+
+    Returns:
+        int: The number of products that have related products.
+    """
+    index = build_cooccurrence_index(load_purchase_histories(), top_k)
+
+    try:
+        db.session.execute(delete(RelatedProducts))
+        if index:
+            db.session.execute(insert(RelatedProducts), [
+                {
+                    "product_id": product_id,
+                    "related_ids": [related_id for related_id, _ in neighbours],
+                    "co_purchases": [count for _, count in neighbours],
+                }
+                for product_id, neighbours in index.items()
+            ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error storing related products: {str(e)}")
+        raise
+
+    current_app.logger.info(f"Rebuilt related products for {len(index)} products.")
+    return len(index)
+
+
+def get_related_products(product_id: int, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Retrieves the products most often bought together with a product, from the precomputed index.
+
+    Args:
+        product_id (int): The ID of the product.
+        limit (int, optional): The maximum number of related products to return.
+
+    Returns:
+        List[Dict]: The related products, most co-purchased first.
+    """
+    related = db.session.get(RelatedProducts, product_id)
+    if not related:
+        return []
+    related_ids = related.related_ids[:limit] if limit else related.related_ids
+    products, _ = get_products_by_ids(related_ids, LISTING_FIELDS)
+    return products
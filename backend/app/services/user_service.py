@@ -1,14 +1,34 @@
 import os
+import shutil
+import tempfile
 import time
-from typing import List, Dict
+from typing import BinaryIO, List, Dict, Iterator, Optional, Tuple
 import boto3
 import requests
-from botocore.exceptions import NoCredentialsError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from flask import current_app
+from sqlalchemy import any_, delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
 from werkzeug.utils import secure_filename
 from .. import db
 from ..models.user_model import User, BasketItem
 from ..models.product_model import Product
+from ..models.order_model import Order, OrderItem
+from ..helpers import parse_id_list
+from .config_service import fetch_config
+from ..utils.avatar_cache import avatar_disk_cache, CachedAvatar, MISSING_KEY_ERRORS
+from ..utils.avatar_index import avatar_index
+from ..utils.avatar_uploads import avatar_uploads, submit as submit_avatar_upload, UPLOAD_COMPLETE, UPLOAD_PENDING
+from ..utils.avatar_variants import (
+    AVATAR_VARIANT_SIZES, AVATAR_VARIANT_FORMAT, VARIANT_EXTENSIONS, pick_variant_size, render_variants,
+    variant_filename, variant_mimetype, submit as submit_avatar_task
+)
+from ..utils.circuit_breaker import s3_breaker
+from ..utils.presigned_urls import presigned_urls
+from ..utils.streaming import STREAM_BATCH_SIZE
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -22,6 +42,53 @@ USE_S3_STORAGE = os.getenv("USE_S3_STORAGE", "false").lower() == "true"
 DEFAULT_AVATAR = 'user_default.png'
 DEFAULT_AVATAR_S3_URL = f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/avatars/{DEFAULT_AVATAR}"
 DEFAULT_AVATAR_LOCAL_PATH = os.path.join(UPLOAD_FOLDER, DEFAULT_AVATAR)
+S3_CLIENT_CONFIG = Config(
+    connect_timeout=float(os.getenv("S3_CONNECT_TIMEOUT", "2")),
+    read_timeout=float(os.getenv("S3_READ_TIMEOUT", "5")),
+    retries={"max_attempts": int(os.getenv("S3_MAX_ATTEMPTS", "2"))}
+)
+AVATAR_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=int(os.getenv("AVATAR_TRANSFER_CONCURRENCY", "4")),
+    use_threads=True
+)
+# Uploaded avatars get a new timestamped name on every change, so they never change in place.
+AVATAR_MAX_AGE = int(os.getenv("AVATAR_MAX_AGE", str(365 * 24 * 3600)))
+DEFAULT_AVATAR_MAX_AGE = int(os.getenv("DEFAULT_AVATAR_MAX_AGE", str(24 * 3600)))
+# Served in place of a missing file, e.g. the original while its variants are generated.
+AVATAR_FALLBACK_MAX_AGE = int(os.getenv("AVATAR_FALLBACK_MAX_AGE", "60"))
+# "proxy" streams S3 avatars through the app, "redirect" sends clients to presigned S3 URLs.
+AVATAR_DELIVERY = os.getenv("AVATAR_DELIVERY", "proxy").lower()
+# The variant size avatar URLs ask for; the header and profile icons are at most this big.
+AVATAR_URL_SIZE = int(os.getenv("AVATAR_URL_SIZE", "128"))
+ORDERS_PAGE_SIZE = 20
+MAX_ORDERS_PAGE_SIZE = 100
+
+ADD_FAVORITE_SQL = text(
+    "UPDATE users SET fav_products = array_append(COALESCE(fav_products, '{}'), :product_id) "
+    "WHERE id = :user_id AND NOT COALESCE(fav_products, '{}') @> ARRAY[:product_id] "
+    "RETURNING id"
+)
+REMOVE_FAVORITE_SQL = text(
+    "UPDATE users SET fav_products = array_remove(fav_products, :product_id) "
+    "WHERE id = :user_id AND fav_products @> ARRAY[:product_id] "
+    "RETURNING id"
+)
+# Only the latest avatar upload may set the avatar, so one finishing out of order is dropped.
+SET_UPLOADED_AVATAR_SQL = text(
+    "UPDATE users SET avatar = :avatar, pending_avatar = NULL "
+    "WHERE id = :user_id AND pending_avatar = :filename "
+    "RETURNING id"
+)
+CHECKOUT_SQL = text(
+    "WITH new_order AS (INSERT INTO orders (user_id) VALUES (:user_id) RETURNING id) "
+    "INSERT INTO order_items (order_id, product_id, quantity, unit_price) "
+    "SELECT new_order.id, products.id, COALESCE(basket_items.quantity, 1), products.price "
+    "FROM new_order JOIN products ON products.id = ANY(:product_ids) "
+    "LEFT JOIN basket_items ON basket_items.product_id = products.id AND basket_items.user_id = :user_id "
+    "RETURNING order_id"
+)
 
 
 def is_ec2_instance():
@@ -40,10 +107,11 @@ def get_s3_client():
     if USE_S3_STORAGE:
         if is_ec2_instance():
             session = boto3.Session()
-            return session.client('s3', region_name=S3_REGION)
+            return session.client('s3', region_name=S3_REGION, config=S3_CLIENT_CONFIG)
         return boto3.client(
                 's3',
                 region_name=S3_REGION,
+                config=S3_CLIENT_CONFIG,
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
                 aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
                 aws_session_token=os.getenv('AWS_SESSION_TOKEN')
@@ -57,41 +125,285 @@ s3_client = get_s3_client()
 def get_avatar_url(user):
     """
     Returns the avatar URL based on storage option and user's current avatar status.
-    Now returns API URLs for both S3 and local storage.
+    Now returns API URLs for both S3 and local storage, asking for the AVATAR_URL_SIZE
+    variant, or presigned S3 URLs of the original when avatars are delivered by redirect.
+
+    The avatar file is cached per user and local avatar files are looked up in the avatar
+    index, which also remembers missing files for a while, so resolving an avatar does no
+    filesystem I/O. A stored avatar that resolved to the default is not cached per user,
+    so it is picked up once its file appears.
     """
+    filename = avatar_index.get_resolved(user.id, user.avatar)
+    if filename is None:
+        filename = resolve_avatar_filename(user.avatar)
+        if filename != DEFAULT_AVATAR or not user.avatar:
+            avatar_index.set_resolved(user.id, user.avatar, filename)
+
+    if redirects_avatars():
+        try:
+            url, _ = get_presigned_avatar_url(filename)
+            return url
+        except Exception as e:
+            current_app.logger.error(f"Error presigning avatar {filename}: {str(e)}")
+    return f"/api/me/avatar/{filename}?size={AVATAR_URL_SIZE}"
+
+
+def resolve_avatar_filename(avatar):
     if USE_S3_STORAGE:
-        if user.avatar and user.avatar.startswith(f"https://{S3_BUCKET}.s3"):
-            filename = user.avatar.split('/')[-1]
-            return f"/api/me/avatar/{filename}"
-        return f"/api/me/avatar/{DEFAULT_AVATAR}"
+        if avatar and avatar.startswith(f"https://{S3_BUCKET}.s3"):
+            return avatar.split('/')[-1]
+        return DEFAULT_AVATAR
     else:
-        if user.avatar:
-            local_avatar_path = os.path.join(UPLOAD_FOLDER, user.avatar)
-            if os.path.exists(local_avatar_path):
-                return f"/api/me/avatar/{user.avatar}"
-        return f"/api/me/avatar/{DEFAULT_AVATAR}"
+        if avatar:
+            avatar_index.ensure_loaded(UPLOAD_FOLDER)
+            if avatar_index.exists(avatar):
+                return avatar
+        return DEFAULT_AVATAR
 
 
-def get_all_users() -> list:
+def redirects_avatars() -> bool:
+    return AVATAR_DELIVERY == "redirect" and USE_S3_STORAGE and s3_client is not None
+
+
+def get_presigned_avatar_url(filename: str):
     """
-    Retrieves all users from the database.
+    Returns a presigned S3 GET URL for an avatar, reused until shortly before it expires.
+
+    Args:
+        filename (str): The avatar file name.
 
     Returns:
-        list: A list of dictionaries containing each user's information.
+        Tuple[str, int]: The URL, and the number of seconds it may still be handed out for.
+    """
+    return presigned_urls.get(s3_client, S3_BUCKET, f"avatars/{filename}")
+
+
+def open_s3_avatar(filename: str) -> Optional[Tuple[CachedAvatar, BinaryIO]]:
+    """
+    Opens a local copy of an avatar stored in S3, downloading it into the avatar disk
+    cache if needed. S3 calls go through the S3 circuit breaker.
+
+    Args:
+        filename (str): The avatar file name.
+
+    Returns:
+        Optional[Tuple[CachedAvatar, BinaryIO]]: The cached avatar and its open file, or None
+                                                 if it does not exist.
+
+    Raises:
+        CircuitOpenError: If S3 is considered down and the avatar is not cached.
+    """
+    return avatar_disk_cache.open(s3_client, S3_BUCKET, f"avatars/{filename}", s3_breaker)
+
+
+def avatar_max_age(filename: str, requested: Optional[str] = None) -> int:
+    """
+    Returns how long clients may cache an avatar file. A file served in place of the
+    `requested` one is cached only briefly, so the client soon asks for the real one again.
+    """
+    if requested is not None and filename != requested:
+        return AVATAR_FALLBACK_MAX_AGE
+    if filename == DEFAULT_AVATAR or filename in default_avatar_variants():
+        return DEFAULT_AVATAR_MAX_AGE
+    return AVATAR_MAX_AGE
+
+
+def default_avatar_variants() -> List[str]:
+    return [variant_filename(DEFAULT_AVATAR, size) for size in AVATAR_VARIANT_SIZES]
+
+
+def is_avatar_variant(filename: str) -> bool:
+    """Tells whether a file name is that of a resized avatar variant."""
+    stem, _, extension = filename.rpartition('.')
+    return (extension == VARIANT_EXTENSIONS[AVATAR_VARIANT_FORMAT]
+            and any(stem.endswith(f"_{size}") for size in AVATAR_VARIANT_SIZES))
+
+
+def may_be_stored_in_s3(filename: str) -> bool:
+    """
+    Tells whether an avatar file name can exist in S3: uploads and their variants only
+    have an allowed extension or the variant one, so other names are not looked up there.
+    """
+    return allowed_file(filename) or is_avatar_variant(filename)
+
+
+def avatar_candidates(filename: str, size: Optional[int] = None, include_default: bool = True) -> List[str]:
+    """
+    Lists the files that can answer a request for an avatar, best first: the smallest
+    variant covering `size` when one is asked for, then the original, then the same for
+    the default avatar. A variant asked for by name has no variants of its own.
+
+    Args:
+        filename (str): The requested avatar file name.
+        size (int, optional): The requested width and height in pixels.
+        include_default (bool): Whether the default avatar files are listed.
+
+    Returns:
+        List[str]: The candidate file names.
     """
-    users = User.query.all()
-    user_list = []
+    candidates = []
+    for name in (filename, DEFAULT_AVATAR) if include_default else (filename,):
+        if size is not None and not is_avatar_variant(name):
+            candidates.append(variant_filename(name, pick_variant_size(size)))
+        candidates.append(name)
+    return list(dict.fromkeys(candidates))
+
+
+def avatar_mimetype(filename: str) -> Optional[str]:
+    """Returns the mimetype of avatar variants, which mimetypes may not know about."""
+    if filename.endswith(f".{VARIANT_EXTENSIONS[AVATAR_VARIANT_FORMAT]}"):
+        return variant_mimetype()
+    return None
 
-    for user in users:
-        user_list.append({
+
+def generate_local_variants(app, filename: str) -> None:
+    """
+    Renders the resized variants of a locally stored avatar next to it. Runs on the avatar
+    processing pool.
+    """
+    try:
+        paths = render_variants(os.path.join(UPLOAD_FOLDER, filename), filename, UPLOAD_FOLDER)
+        for path in paths.values():
+            avatar_index.add(os.path.basename(path))
+        app.logger.info(f"Generated {len(paths)} variants of avatar {filename}.")
+    except Exception as e:
+        app.logger.error(f"Error generating variants of avatar {filename}: {e}")
+
+
+def generate_s3_variants(app, source_path: str, filename: str) -> None:
+    """
+    Renders the resized variants of an avatar from its spooled upload and stores them in
+    S3, then deletes the spooled file. Runs on the avatar processing pool.
+    """
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            paths = render_variants(source_path, filename, output_dir)
+            for path in paths.values():
+                key = f"avatars/{os.path.basename(path)}"
+                s3_client.upload_file(path, S3_BUCKET, key, ExtraArgs={'ContentType': variant_mimetype()})
+                avatar_disk_cache.forget_missing(key)
+        app.logger.info(f"Uploaded {len(paths)} variants of avatar {filename} to S3.")
+    except Exception as e:
+        app.logger.error(f"Error generating variants of avatar {filename}: {e}")
+    finally:
+        os.remove(source_path)
+
+
+def generate_missing_s3_variants(app, filename: str) -> None:
+    """
+    Renders and stores in S3 the variants of an avatar stored before variants existed,
+    unless they are there already. They are rendered from the S3 original, or for the
+    default avatar from its local copy. Runs on the avatar processing pool, or from the
+    avatar-variants management command.
+    """
+    largest_variant = f"avatars/{variant_filename(filename, AVATAR_VARIANT_SIZES[-1])}"
+    try:
+        s3_client.head_object(Bucket=S3_BUCKET, Key=largest_variant)
+        return
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in MISSING_KEY_ERRORS:
+            app.logger.error(f"Error checking variants of avatar {filename}: {e}")
+            return
+
+    fd, spool_path = tempfile.mkstemp(suffix=f"_{filename}")
+    os.close(fd)
+    try:
+        if filename == DEFAULT_AVATAR and os.path.exists(DEFAULT_AVATAR_LOCAL_PATH):
+            shutil.copyfile(DEFAULT_AVATAR_LOCAL_PATH, spool_path)
+        else:
+            s3_client.download_file(S3_BUCKET, f"avatars/{filename}", spool_path)
+    except Exception as e:
+        os.remove(spool_path)
+        app.logger.error(f"Error fetching avatar {filename} to generate its variants: {e}")
+        return
+    generate_s3_variants(app, spool_path, filename)
+
+
+def queue_missing_variants(filename: str, in_s3: bool) -> None:
+    """
+    Queues the variants of an avatar that was served in place of one, once per avatar at a
+    time, for avatars stored before variants existed or whose generation was dropped.
+
+    Args:
+        filename (str): The avatar file name.
+        in_s3 (bool): Whether the avatar was served from S3 rather than the upload folder.
+    """
+    app = current_app._get_current_object()
+    if in_s3:
+        submit_avatar_task(generate_missing_s3_variants, app, filename, key=f"s3:{filename}")
+    else:
+        submit_avatar_task(generate_local_variants, app, filename, key=f"local:{filename}")
+
+
+def ensure_default_avatar_variants(app) -> None:
+    """
+    Queues variant generation for the local default avatar if its variants are missing,
+    and with S3 storage, for the default avatar's variants in S3.
+    """
+    avatar_index.ensure_loaded(UPLOAD_FOLDER)
+    if avatar_index.exists(DEFAULT_AVATAR) and not all(
+            avatar_index.exists(name) for name in default_avatar_variants()):
+        submit_avatar_task(generate_local_variants, app, DEFAULT_AVATAR, key=f"local:{DEFAULT_AVATAR}")
+    if USE_S3_STORAGE and s3_client is not None:
+        submit_avatar_task(generate_missing_s3_variants, app, DEFAULT_AVATAR, key=f"s3:{DEFAULT_AVATAR}")
+
+
+def backfill_avatar_variants() -> int:
+    """
+    Generates the missing variants of the default avatar and of every user's avatar, for
+    avatars stored before variants existed. Runs synchronously, from the avatar-variants
+    management command.
+
+    Returns:
+        int: The number of avatars checked.
+    """
+    app = current_app._get_current_object()
+    filenames = {DEFAULT_AVATAR}
+    avatars = db.session.scalars(
+        select(User.avatar).where(User.avatar.isnot(None)).execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    filenames.update(resolve_avatar_filename(avatar) for avatar in avatars)
+
+    for filename in sorted(filenames):
+        if USE_S3_STORAGE and s3_client is not None:
+            generate_missing_s3_variants(app, filename)
+        elif not all(avatar_index.exists(variant_filename(filename, size)) for size in AVATAR_VARIANT_SIZES):
+            generate_local_variants(app, filename)
+    return len(filenames)
+
+
+def iter_all_users(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Yields every user's public information, reading the database through a server-side
+    cursor so only one batch of users is held in memory at a time.
+
+    Args:
+        batch_size (int): The number of users fetched per round trip.
+
+    Yields:
+        dict: A dictionary containing a user's information.
+    """
+    count = 0
+    query = select(User).order_by(User.id).execution_options(yield_per=batch_size)
+    for user in db.session.scalars(query):
+        count += 1
+        yield {
             "id": user.id,
             "username": user.username,
             "email": user.email,
             "avatar": get_avatar_url(user),
-        })
+        }
+    current_app.logger.info(f"Retrieved {count} users.")
+
 
-    current_app.logger.info(f"Retrieved {len(users)} users.")
-    return user_list
+def get_all_users() -> list:
+    """
+    Retrieves all users from the database.
+
+    Returns:
+        list: A list of dictionaries containing each user's information.
+    """
+    return list(iter_all_users())
 
 
 def get_user_info(user_id: int) -> dict:
@@ -107,51 +419,83 @@ def get_user_info(user_id: int) -> dict:
     user = User.query.get(user_id)
     if user:
         current_app.logger.info(f"Retrieved info for user {user.username} (ID: {user_id})")
-        return {
-            "username": user.username,
-            "email": user.email,
-            "fav_products": user.fav_products,
-            "basket": [item.to_dict() for item in user.basket_items],
-            "purchased_products": user.purchased_products,
-            "avatar": get_avatar_url(user)
-        }
+        return serialize_user_info(user, user.basket_items, purchased_product_ids(user.id, user.purchased_products))
     current_app.logger.warning(f"User with ID {user_id} not found.")
     return {}
 
 
-def add_to_favorites(user_id: int, product_id: int) -> dict:
+def serialize_user_info(user: User, basket_items: List[BasketItem], purchased_products: List[int]) -> dict:
+    return {
+        "username": user.username,
+        "email": user.email,
+        "fav_products": user.fav_products,
+        "basket": [item.to_dict() for item in basket_items],
+        "purchased_products": purchased_products,
+        "avatar": get_avatar_url(user)
+    }
+
+
+def get_session_bootstrap(user_id: int) -> dict:
     """
-    Adds a product to the user's list of favorite products in the database.
+    Retrieves everything the frontend loads after login in one go: the user's info, basket,
+    favorites, purchased products and the app configuration.
+
+    The user row, the basket (with product details) and the purchased products are each
+    read once and shared by the sections that need them.
 
     Args:
-        user_id (int): The ID of the user.
-        product_id (int): The ID of the product to add.
+        user_id (str): The ID of the user.
 
     Returns:
-        dict: The raw result of the update operation.
+        dict: The combined payload, or an empty dictionary if the user does not exist.
     """
     user = User.query.get(user_id)
     if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
-        return {"error": "User not found"}
+        current_app.logger.warning(f"User with ID {user_id} not found.")
+        return {}
 
-    fav_products = [int(p) for p in user.fav_products.split(',')] if user.fav_products else []
+    basket_rows = query_basket(user.id)
+    purchased_products = purchased_product_ids(user.id, user.purchased_products)
+    current_app.logger.info(f"Built session bootstrap for user {user.username} (ID: {user_id})")
+    return {
+        "info": serialize_user_info(user, [row.BasketItem for row in basket_rows], purchased_products),
+        "basket": basket_with_details(basket_rows),
+        "favorites": get_user_favorites(user.id),
+        "purchased_products": purchased_products,
+        "config": fetch_config(),
+    }
 
-    if product_id not in fav_products:
-        fav_products.append(product_id)
-        user.fav_products = ','.join(map(str, fav_products))
-        current_app.logger.info(f"Adding product {product_id} to user {user_id}'s favorites.")
 
-        try:
-            db.session.commit()
-            current_app.logger.info(f"Product {product_id} added to favorites for user {user_id}.")
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"Error adding product {product_id} to favorites for user {user_id}: {e}")
-            return {"error": "Failed to save changes"}
+def add_to_favorites(user_id: int, product_id: int) -> dict:
+    """
+    Adds a product to the user's list of favorite products in the database.
+
+    The product is appended in a single UPDATE guarded by a containment check, so
+    concurrent requests cannot lose each other's changes or add a product twice.
+
+    Args:
+        user_id (int): The ID of the user.
+        product_id (int): The ID of the product to add.
+
+    Returns:
+        dict: The raw result of the update operation.
+    """
+    current_app.logger.info(f"Adding product {product_id} to user {user_id}'s favorites.")
+    try:
+        updated = db.session.execute(ADD_FAVORITE_SQL, {"user_id": int(user_id), "product_id": int(product_id)}).first()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error adding product {product_id} to favorites for user {user_id}: {e}")
+        return {"error": "Failed to save changes"}
 
+    if updated:
+        current_app.logger.info(f"Product {product_id} added to favorites for user {user_id}.")
         return {"message": "Product added to favorites"}
 
+    if not user_exists(user_id):
+        current_app.logger.error(f"User with ID {user_id} not found.")
+        return {"error": "User not found"}
     return {"message": "Product already in favorites"}
 
 
@@ -159,6 +503,8 @@ def remove_from_favorites(user_id: int, product_id: int) -> dict:
     """
     Removes a product from the user's list of favorite products in the database.
 
+    The product is removed in a single UPDATE, so concurrent changes are never lost.
+
     Args:
         user_id (int): The ID of the user.
         product_id (int): The ID of the product to remove.
@@ -166,34 +512,29 @@ def remove_from_favorites(user_id: int, product_id: int) -> dict:
     Returns:
         dict: The raw result of the update operation.
     """
-    user = User.query.get(user_id)
-    if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
-        return {"error": "User not found"}
-
-    fav_products = [int(p) for p in user.fav_products.split(',')] if user.fav_products else []
-
-    if product_id in fav_products:
-        fav_products.remove(product_id)
-        user.fav_products = ','.join(map(str, fav_products))
-        current_app.logger.info(f"Removing product {product_id} from user {user_id}'s favorites.")
+    current_app.logger.info(f"Removing product {product_id} from user {user_id}'s favorites.")
+    try:
+        updated = db.session.execute(REMOVE_FAVORITE_SQL, {"user_id": int(user_id), "product_id": int(product_id)}).first()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error removing product {product_id} from favorites for user {user_id}: {e}")
+        return {"error": "Failed to save changes"}
 
-        try:
-            db.session.commit()
-            current_app.logger.info(f"Product {product_id} removed from favorites for user {user_id}.")
-            return {"message": "Product removed from favorites"}
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"Error removing product {product_id} from favorites for user {user_id}: {e}")
-            return {"error": "Failed to save changes"}
+    if updated:
+        current_app.logger.info(f"Product {product_id} removed from favorites for user {user_id}.")
+        return {"message": "Product removed from favorites"}
 
+    if not user_exists(user_id):
+        current_app.logger.error(f"User with ID {user_id} not found.")
+        return {"error": "User not found"}
     current_app.logger.warning(f"Product {product_id} not found in user {user_id}'s favorites.")
     return {"error": "Product not found in favorites"}
 
 
 def get_user_favorites(user_id: int) -> list:
     """
-    Retrieves the user's list of favorite products from the database.
+    Retrieves the user's list of favorite products from the database, in the order they were added.
 
     Args:
         user_id (str): The ID of the user.
@@ -201,20 +542,27 @@ def get_user_favorites(user_id: int) -> list:
     Returns:
         list: A list of dictionaries, each representing a favorite product.
     """
-    user = User.query.get(user_id)
-    if user:
-        fav_products = [int(p) for p in user.fav_products.split(',')] if user.fav_products else []
-        favorite_products = Product.query.filter(Product.id.in_(fav_products)).all()
-        current_app.logger.info(f"Fetched {len(favorite_products)} favorite products for user {user_id}.")
-        return [product.to_dict() for product in favorite_products]
-    current_app.logger.warning(f"No favorites found for user {user_id}.")
-    return []
+    favorite_products = Product.query.options(selectinload(Product.reviews)) \
+        .join(User, Product.id == any_(User.fav_products)) \
+        .filter(User.id == int(user_id)) \
+        .order_by(func.array_position(User.fav_products, Product.id)) \
+        .all()
+    current_app.logger.info(f"Fetched {len(favorite_products)} favorite products for user {user_id}.")
+    return [product.to_dict() for product in favorite_products]
+
+
+def user_exists(user_id: int) -> bool:
+    return db.session.query(User.id).filter_by(id=int(user_id)).first() is not None
 
 
 def sync_basket_service(user_id: int, basket: List[Dict]) -> dict:
     """
     Synchronizes the user's basket with the provided basket data in the database.
 
+    Items missing from the provided basket are removed with one DELETE, and all provided
+    items are written with one multi-row INSERT ... ON CONFLICT DO UPDATE. Rows are written
+    in product order, so concurrent syncs lock them in the same order and cannot deadlock.
+
     Args:
         user_id (str): The ID of the user.
         basket (List[Dict]): The basket data to synchronize.
@@ -222,40 +570,35 @@ def sync_basket_service(user_id: int, basket: List[Dict]) -> dict:
     Returns:
         dict: A message indicating the result of the synchronization.
     """
-    user = User.query.get(user_id)
-    if not user:
+    if not user_exists(user_id):
         current_app.logger.error(f"User with ID {user_id} not found.")
         return {"error": "User not found"}
 
-    existing_items = BasketItem.query.filter_by(user_id=user_id).all()
-    existing_product_ids = {item.product_id for item in existing_items}
-    incoming_product_ids = {item['product_id'] for item in basket}
-
-    items_to_delete = existing_product_ids - incoming_product_ids
-    current_app.logger.info(f"Syncing basket for user {user_id}. Items to delete: {items_to_delete}")
-
-    for product_id in items_to_delete:
-        item_to_delete = BasketItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-        if item_to_delete:
-            db.session.delete(item_to_delete)
-            current_app.logger.info(f"Deleted item with product_id {product_id} for user {user_id}")
-
-    for item in basket:
-        product_id = item['product_id']
-        existing_item = BasketItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-
-        if existing_item:
-            existing_item.quantity = item['quantity']
-            current_app.logger.info(f"Updated item {product_id} to quantity {item['quantity']} for user {user_id}")
-        else:
-            new_item = BasketItem(user_id=user_id, product_id=product_id, quantity=item['quantity'])
-            db.session.add(new_item)
-            current_app.logger.info(f"Added new item {product_id} with quantity {item['quantity']} for user {user_id}")
+    user_id = int(user_id)
+    quantities = {int(item['product_id']): int(item['quantity']) for item in basket}
+    current_app.logger.info(f"Syncing basket for user {user_id} with products {list(quantities)}")
 
     try:
+        removed_items = delete(BasketItem).where(BasketItem.user_id == user_id)
+        if quantities:
+            removed_items = removed_items.where(BasketItem.product_id.notin_(list(quantities)))
+        db.session.execute(removed_items.execution_options(synchronize_session=False))
+
+        if quantities:
+            upsert = insert(BasketItem).values([
+                {"user_id": user_id, "product_id": product_id, "quantity": quantity}
+                for product_id, quantity in sorted(quantities.items())
+            ])
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[BasketItem.user_id, BasketItem.product_id],
+                set_={"quantity": upsert.excluded.quantity}
+            )
+            db.session.execute(upsert)
+
         db.session.commit()
         current_app.logger.info(f"Basket successfully synced for user {user_id}")
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Error syncing basket for user {user_id}: {e}")
         return {"error": "Failed to update basket"}
 
@@ -264,7 +607,8 @@ def sync_basket_service(user_id: int, basket: List[Dict]) -> dict:
 
 def get_user_basket(user_id: int) -> List[Dict]:
     """
-    Retrieves the user's current basket from the database.
+    Retrieves the user's current basket from the database, with the product details
+    joined in the same query.
 
     Args:
         user_id (str): The ID of the user.
@@ -272,21 +616,52 @@ def get_user_basket(user_id: int) -> List[Dict]:
     Returns:
         List[Dict]: The user's basket.
     """
-    basket_items = BasketItem.query.filter_by(user_id=user_id).all()
-
-    basket_with_details = []
-    for item in basket_items:
-        product = Product.query.get(item.product_id)
-        if product:
-            basket_with_details.append({
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "name": product.name,
-                "price": product.price,
-                "image_url": product.image_url,
-            })
+    basket = basket_with_details(query_basket(user_id))
     current_app.logger.info(f"Fetched basket details for user {user_id}.")
-    return basket_with_details
+    return basket
+
+
+def query_basket(user_id: int) -> list:
+    """
+    Fetches the user's basket items together with the name, price and image of their
+    products in one query; the product columns are None for products that no longer exist.
+    """
+    return db.session.query(BasketItem, Product.name, Product.price, Product.image_url) \
+        .outerjoin(Product, Product.id == BasketItem.product_id) \
+        .filter(BasketItem.user_id == int(user_id)) \
+        .order_by(BasketItem.id) \
+        .all()
+
+
+def basket_with_details(rows: list) -> List[Dict]:
+    return [
+        {
+            "product_id": row.BasketItem.product_id,
+            "quantity": row.BasketItem.quantity,
+            "name": row.name,
+            "price": row.price,
+            "image_url": row.image_url,
+        }
+        for row in rows if row.name is not None
+    ]
+
+
+def get_user_basket_summary(user_id: int) -> Dict:
+    """
+    Retrieves the user's current basket along with its item count and total price.
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        Dict: The basket items, the number of units in the basket and the basket total.
+    """
+    items = get_user_basket(user_id)
+    return {
+        "items": items,
+        "item_count": sum(item["quantity"] for item in items),
+        "total": round(sum(item["price"] * item["quantity"] for item in items), 2),
+    }
 
 
 def remove_from_basket_service(user_id: int, product_id: int) -> dict:
@@ -311,75 +686,106 @@ def remove_from_basket_service(user_id: int, product_id: int) -> dict:
     return {"error": "Product not found in basket"}
 
 
-def add_product_to_purchased(user_id: int, product_ids: List[int]) -> dict:
+def checkout(user_id: int, product_ids: List[int]) -> dict:
     """
-    Adds a product to the user's set of purchased products.
+    Places an order for the given products and clears the user's basket, in one transaction.
+
+    The order and all of its items are inserted by a single statement, taking quantities
+    from the basket (1 for products not in it) and prices from the catalog; the basket is
+    then emptied with a single DELETE.
+
     Args:
-        user_id (str): The ID of the user.
-        product_ids (str): The ID of the product to add.
+        user_id (int): The ID of the user.
+        product_ids (List[int]): The IDs of the products being purchased.
+
     Returns:
-        dict: The raw result of the update operation.
+        dict: The ID of the new order, or an error message.
     """
-    user = User.query.get(user_id)
-    if not user:
-        current_app.logger.error(f"User with ID {user_id} not found.")
-        return {"error": "User not found"}
+    product_ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+    if not product_ids:
+        return {"error": "No products to purchase"}
+
+    params = {"user_id": int(user_id), "product_ids": product_ids}
+    try:
+        order_rows = db.session.execute(CHECKOUT_SQL, params).all()
+        if not order_rows:
+            db.session.rollback()
+            current_app.logger.warning(f"None of the products {product_ids} exist, no order placed for user {user_id}.")
+            return {"error": "Products not found"}
 
-    purchased_products = [int(p) for p in user.purchased_products.split(',')] if user.purchased_products else []
-    purchased_products.extend(product_ids)
-    purchased_products = list(set(purchased_products))
+        db.session.execute(delete(BasketItem).where(BasketItem.user_id == params["user_id"])
+                           .execution_options(synchronize_session=False))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error placing order for user {user_id}: {e}")
+        return {"error": "Failed to place order"}
 
-    user.purchased_products = ','.join(map(str, purchased_products))
-    db.session.commit()
-    current_app.logger.info(f"Added products {product_ids} to user {user_id}'s purchased products.")
-    return {"message": "Products purchased successfully"}
+    order_id = order_rows[0].order_id
+    current_app.logger.info(f"Order {order_id} placed by user {user_id} for products {product_ids}.")
+    return {"message": "Products purchased successfully", "order_id": order_id}
 
 
-def get_user_purchased_products(user_id: int) -> List[Dict]:
+def get_user_orders(user_id: int, limit: int = ORDERS_PAGE_SIZE, before: Optional[int] = None) -> Dict:
     """
-    Retrieves the user's list of purchased products from the database.
+    Retrieves one page of the user's orders, newest first, using the last seen order ID as cursor.
+
     Args:
-        user_id (str): The ID of the user.
+        user_id (int): The ID of the user.
+        limit (int): The maximum number of orders to return.
+        before (int, optional): Only orders with an ID lower than this are returned.
+
     Returns:
-        List[Dict]: A list of dictionaries representing purchased products.
+        Dict: The page of orders and the cursor to pass as `before` for the next page,
+              which is None when there are no more orders.
     """
-    user = User.query.get(user_id)
-    if user:
-        purchased_products = [int(p) for p in user.purchased_products.split(',')] if user.purchased_products else []
-        current_app.logger.info(f"Fetched purchased products for user {user_id}.")
-        return purchased_products
-    current_app.logger.warning(f"No purchased products found for user {user_id}.")
-    return []
+    limit = max(1, min(limit, MAX_ORDERS_PAGE_SIZE))
+    query = Order.query.options(selectinload(Order.items)) \
+        .filter(Order.user_id == int(user_id)) \
+        .order_by(Order.id.desc())
+    if before is not None:
+        query = query.filter(Order.id < before)
 
+    orders = query.limit(limit + 1).all()
+    has_more = len(orders) > limit
+    orders = orders[:limit]
 
-def clear_user_basket(user_id: int):
-    """
-    Clears the user's basket after a successful purchase.
+    current_app.logger.info(f"Fetched {len(orders)} orders for user {user_id}.")
+    return {
+        "orders": [order.to_dict() for order in orders],
+        "next_cursor": orders[-1].id if has_more else None
+    }
 
-    Args:
-        user_id (int): The ID of the user.
+
+def get_user_purchased_products(user_id: int) -> List[int]:
     """
-    current_app.logger.info(f"Attempting to clear basket for user {user_id}.")
+    Retrieves the IDs of every product the user has purchased, from their orders and from
+    the purchases recorded before orders existed.
 
-    basket_items = BasketItem.query.filter_by(user_id=user_id).all()
+    Args:
+        user_id (str): The ID of the user.
 
-    if not basket_items:
-        current_app.logger.info(f"No items found in the basket for user {user_id}.")
-        return {"message": "Basket is already empty"}
+    Returns:
+        List[int]: The purchased product IDs.
+    """
+    user = db.session.query(User.purchased_products).filter_by(id=int(user_id)).first()
+    if not user:
+        current_app.logger.warning(f"No purchased products found for user {user_id}.")
+        return []
 
-    try:
-        for item in basket_items:
-            current_app.logger.info(f"Removing item {item.product_id} from basket for user {user_id}.")
-            db.session.delete(item)
+    current_app.logger.info(f"Fetched purchased products for user {user_id}.")
+    return purchased_product_ids(user_id, user.purchased_products)
 
-        db.session.commit()
-        current_app.logger.info(f"Successfully cleared basket for user {user_id}.")
-        return {"message": "Basket cleared successfully"}
 
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error clearing basket for user {user_id}: {e}")
-        return {"error": "Failed to clear basket"}
+def purchased_product_ids(user_id: int, legacy_purchases) -> List[int]:
+    """Merges the products from the user's orders with the legacy purchased_products value."""
+    ordered_products = db.session.query(OrderItem.product_id) \
+        .join(Order, Order.id == OrderItem.order_id) \
+        .filter(Order.user_id == int(user_id)) \
+        .distinct()
+    purchased_products = set(parse_id_list(legacy_purchases))
+    purchased_products.update(product_id for (product_id,) in ordered_products)
+    return sorted(purchased_products)
 
 
 def allowed_file(filename):
@@ -395,6 +801,11 @@ def save_avatar(user_id, file):
     and only after a successful upload, delete the old avatar if it exists and is not 'user_default.png'.
     Uses a timestamp to ensure unique filenames.
 
+    With S3 storage the file is spooled to disk and uploaded in the background; the result
+    then only says the upload is pending, and get_avatar_upload_status reports its outcome.
+    The upload is recorded as the user's pending avatar, and only the latest one pending
+    becomes the avatar when it finishes.
+
     Args:
         user_id (int): The ID of the user.
         file (FileStorage): The uploaded file.
@@ -413,21 +824,36 @@ def save_avatar(user_id, file):
     # Add timestamp to ensure unique filename
     timestamp = int(time.time())
     filename = secure_filename(f"user_{user_id}_{timestamp}_{file.filename}")
+    app = current_app._get_current_object()
     if USE_S3_STORAGE:
+        # The upload is spooled to disk and transferred to S3 after the request.
+        fd, spool_path = tempfile.mkstemp(suffix=f"_{filename}")
+        os.close(fd)
         try:
-            s3_client.upload_fileobj(
-                file,
-                S3_BUCKET,
-                f"avatars/{filename}",
-                ExtraArgs={'ContentType': file.content_type}
-            )
-            user.avatar = f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/avatars/{filename}"
+            file.save(spool_path)
+        except Exception as e:
+            os.remove(spool_path)
+            current_app.logger.error(f"Error spooling avatar for user {user_id}: {e}")
+            return {"error": "Failed to upload avatar"}
+
+        try:
+            user.pending_avatar = filename
             db.session.commit()
-            current_app.logger.info(f"Avatar for user {user_id} uploaded to S3 as {filename}.")
-            return {"message": "Avatar uploaded successfully", "avatar_url": get_avatar_url(user)}
-        except NoCredentialsError:
-            current_app.logger.error("AWS credentials not available.")
-            return {"error": "Failed to upload avatar to S3"}
+        except Exception as e:
+            db.session.rollback()
+            os.remove(spool_path)
+            current_app.logger.error(f"Error recording avatar upload for user {user_id}: {e}")
+            return {"error": "Failed to upload avatar"}
+
+        avatar_uploads.begin(filename, user.id)
+        submit_avatar_upload(upload_avatar_to_s3, app, user.id, spool_path, filename, file.content_type)
+        current_app.logger.info(f"Avatar upload {filename} for user {user_id} queued.")
+        return {
+            "message": "Avatar upload started",
+            "status": "pending",
+            "upload_id": filename,
+            "status_url": f"/api/me/avatar/uploads/{filename}"
+        }
     else:
         filepath = os.path.join(UPLOAD_FOLDER, filename)
         old_avatar = user.avatar
@@ -435,16 +861,107 @@ def save_avatar(user_id, file):
         try:
             os.makedirs(UPLOAD_FOLDER, exist_ok=True)
             file.save(filepath)
+            avatar_index.ensure_loaded(UPLOAD_FOLDER)
+            avatar_index.add(filename)
             user.avatar = filename
             db.session.commit()
             current_app.logger.info(f"Avatar for user {user_id} saved locally as {filename}")
+            if submit_avatar_task(generate_local_variants, app, filename) is None:
+                current_app.logger.warning(f"Avatar processing queue full, variants of {filename} deferred.")
 
             if old_avatar and old_avatar != DEFAULT_AVATAR:
-                old_avatar_path = os.path.join(UPLOAD_FOLDER, old_avatar)
-                if os.path.exists(old_avatar_path):
-                    os.remove(old_avatar_path)
-                    current_app.logger.info(f"Deleted old avatar {old_avatar} for user {user_id}.")
+                old_files = [old_avatar] + [variant_filename(old_avatar, size) for size in AVATAR_VARIANT_SIZES]
+                for old_file in old_files:
+                    old_avatar_path = os.path.join(UPLOAD_FOLDER, old_file)
+                    if os.path.exists(old_avatar_path):
+                        os.remove(old_avatar_path)
+                        avatar_index.discard(old_file)
+                current_app.logger.info(f"Deleted old avatar {old_avatar} for user {user_id}.")
             return {"message": "Avatar uploaded successfully", "avatar_url": get_avatar_url(user)}
         except Exception as e:
             current_app.logger.error(f"Error saving avatar locally for user {user_id}: {e}")
-            return {"error": "Failed to upload avatar"}
\ No newline at end of file
+            return {"error": "Failed to upload avatar"}
+
+
+def upload_avatar_to_s3(app, user_id: int, spool_path: str, filename: str, content_type: str) -> None:
+    """
+    Transfers a spooled avatar to S3 and, once it is stored, points the user at it and
+    queues its variants. Runs on the avatar transfer pool.
+
+    The user is only pointed at the avatar if it is still their pending upload; an upload
+    overtaken by a newer one is reported as failed.
+
+    Args:
+        app (Flask): The application, for the database session and logging.
+        user_id (int): The ID of the user.
+        spool_path (str): The spooled upload, deleted once no longer needed.
+        filename (str): The avatar file name, which is also the upload ID.
+        content_type (str): The mimetype of the upload.
+    """
+    key = f"avatars/{filename}"
+    try:
+        s3_client.upload_file(
+            spool_path,
+            S3_BUCKET,
+            key,
+            ExtraArgs={'ContentType': content_type},
+            Config=AVATAR_TRANSFER_CONFIG
+        )
+        avatar_disk_cache.forget_missing(key)
+        with app.app_context():
+            updated = db.session.execute(SET_UPLOADED_AVATAR_SQL, {
+                "avatar": f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/{key}",
+                "user_id": user_id,
+                "filename": filename,
+            }).first()
+            db.session.commit()
+            if updated is None:
+                app.logger.warning(f"Avatar {filename} for user {user_id} was superseded by a newer upload.")
+                avatar_uploads.fail(filename, "Superseded by a newer avatar upload")
+                os.remove(spool_path)
+                return
+            avatar_url = get_avatar_url(db.session.get(User, user_id))
+    except Exception as e:
+        app.logger.error(f"Error uploading avatar {filename} for user {user_id} to S3: {e}")
+        avatar_uploads.fail(filename, "Failed to upload avatar to S3")
+        os.remove(spool_path)
+        return
+
+    avatar_uploads.complete(filename, avatar_url)
+    app.logger.info(f"Avatar for user {user_id} uploaded to S3 as {filename}.")
+    if submit_avatar_task(generate_s3_variants, app, spool_path, filename) is None:
+        app.logger.warning(f"Avatar processing queue full, variants of {filename} deferred.")
+        os.remove(spool_path)
+
+
+def get_avatar_upload_status(user_id: int, upload_id: str) -> dict:
+    """
+    Reports the state of one of the user's avatar uploads.
+
+    Upload status is kept per process, by the process that accepted the upload. Uploads
+    this process does not track, because another worker accepted them or they were
+    forgotten, are reported complete if the user's avatar points at them, and pending
+    while they are still the user's pending avatar.
+
+    Args:
+        user_id (int): The ID of the user.
+        upload_id (str): The upload ID returned by save_avatar.
+
+    Returns:
+        dict: The upload status, or an error if the user has no such upload.
+    """
+    upload = avatar_uploads.get(upload_id)
+    if upload is not None and upload["user_id"] == int(user_id):
+        status = {"upload_id": upload_id, "status": upload["status"]}
+        if "avatar_url" in upload:
+            status["avatar_url"] = upload["avatar_url"]
+        if "error" in upload:
+            status["error"] = upload["error"]
+        return status
+
+    user = User.query.get(user_id)
+    if user and user.avatar and user.avatar.endswith(f"/avatars/{upload_id}"):
+        return {"upload_id": upload_id, "status": UPLOAD_COMPLETE, "avatar_url": get_avatar_url(user)}
+    if user and user.pending_avatar == upload_id:
+        return {"upload_id": upload_id, "status": UPLOAD_PENDING}
+    return {"error": "Upload not found"}
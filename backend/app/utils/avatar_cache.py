@@ -0,0 +1,284 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+
+AVATAR_CACHE_DIR = os.getenv("AVATAR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "avatar-cache"))
+AVATAR_CACHE_MAX_BYTES = int(os.getenv("AVATAR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+AVATAR_CACHE_REVALIDATE_SECONDS = int(os.getenv("AVATAR_CACHE_REVALIDATE_SECONDS", "300"))
+AVATAR_MISSING_TTL = int(os.getenv("AVATAR_MISSING_TTL", "60"))
+AVATAR_MISSING_MAX_KEYS = 10000
+AVATAR_CACHE_CHUNK_SIZE = 64 * 1024
+# Without s3:ListBucket on the bucket, S3 answers a GET of a missing key with 403
+# AccessDenied rather than 404; it counts as missing, not as a failing S3.
+MISSING_KEY_ERRORS = ("NoSuchKey", "404", "AccessDenied", "403")
+
+
+class CachedAvatar:
+    """An S3 object copied to the local disk, with the metadata needed to serve it."""
+
+    __slots__ = ("key", "path", "size", "etag", "content_type", "last_modified", "checked_at")
+
+    def __init__(self, key: str, path: str, size: int, etag: str, content_type: str,
+                 last_modified: Optional[datetime]):
+        self.key = key
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.content_type = content_type
+        self.last_modified = last_modified
+        self.checked_at = time.monotonic()
+
+
+class AvatarDiskCache:
+    """
+    Bounded local disk cache of S3 avatar objects.
+
+    Objects are downloaded in chunks straight to disk, never held whole in memory, and
+    stored under a name derived from their key and ETag. Once AVATAR_CACHE_MAX_BYTES is
+    exceeded the least recently served files are deleted. A cached object is trusted for
+    AVATAR_CACHE_REVALIDATE_SECONDS, after which S3 is asked with If-None-Match whether
+    it changed. Keys S3 reported missing are remembered for AVATAR_MISSING_TTL, so
+    repeated requests for them do not reach S3.
+
+    Files are handed out already open (see `open`), so evicting one while a response is
+    still being sent only unlinks it; the open handle keeps reading it.
+
+    Each process caches into its own subdirectory, removed when the process exits, so
+    workers sharing AVATAR_CACHE_DIR never delete each other's files.
+    """
+
+    def __init__(self, directory: str = AVATAR_CACHE_DIR, max_bytes: int = AVATAR_CACHE_MAX_BYTES,
+                 revalidate_after: int = AVATAR_CACHE_REVALIDATE_SECONDS,
+                 missing_ttl: int = AVATAR_MISSING_TTL):
+        self.base_directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.missing_ttl = missing_ttl
+        self.max_missing = AVATAR_MISSING_MAX_KEYS
+        self._missing: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedAvatar]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._directory_pid: Optional[int] = None
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(self.base_directory, str(os.getpid()))
+
+    def fetch(self, client, bucket: str, key: str,
+              breaker: Optional[CircuitBreaker] = None) -> Optional[CachedAvatar]:
+        """
+        Returns the cached copy of an S3 object, downloading it if it is missing or changed.
+
+        Args:
+            client: The S3 client.
+            bucket (str): The bucket holding the object.
+            key (str): The object key.
+            breaker (CircuitBreaker, optional): Guards the S3 calls. While it is open, a
+                                                stale cached copy is returned if there is one.
+
+        Returns:
+            Optional[CachedAvatar]: The cached object, or None if the key does not exist.
+
+        Raises:
+            CircuitOpenError: If the breaker is open and the object is not cached.
+            ClientError: If S3 cannot return the object.
+        """
+        entry = self._get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.revalidate_after:
+            self._record(hit=True)
+            return entry
+        if self._is_missing(key, now):
+            self._record(hit=True)
+            return None
+
+        if breaker is not None and not breaker.allow():
+            if entry is not None:
+                return entry
+            raise CircuitOpenError(f"{breaker.name} circuit breaker is open")
+
+        try:
+            result = self._download(client, bucket, key, entry)
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    def open(self, client, bucket: str, key: str,
+             breaker: Optional[CircuitBreaker] = None) -> Optional[Tuple[CachedAvatar, BinaryIO]]:
+        """
+        Fetches an S3 object like `fetch` and opens its cached copy for reading.
+
+        The file is opened under the cache lock, so it cannot be evicted between being
+        fetched and being opened; a copy evicted before that is downloaded again.
+
+        Returns:
+            Optional[Tuple[CachedAvatar, BinaryIO]]: The cached object and its open file, which
+                                                     the caller must close, or None if the
+                                                     key does not exist.
+
+        Raises:
+            CircuitOpenError: If the breaker is open and the object is not cached.
+            ClientError: If S3 cannot return the object.
+        """
+        for _ in range(2):
+            entry = self.fetch(client, bucket, key, breaker)
+            if entry is None:
+                return None
+            file = self._open(entry)
+            if file is not None:
+                return entry, file
+        raise FileNotFoundError(f"Cached copy of {key} was evicted while being served")
+
+    def _open(self, entry: CachedAvatar) -> Optional[BinaryIO]:
+        with self._lock:
+            try:
+                return open(entry.path, "rb")
+            except FileNotFoundError:
+                if self._entries.get(entry.key) is entry:
+                    del self._entries[entry.key]
+                    self._size -= entry.size
+                return None
+
+    def _download(self, client, bucket: str, key: str,
+                  entry: Optional[CachedAvatar]) -> Optional[CachedAvatar]:
+        params = {"Bucket": bucket, "Key": key}
+        if entry is not None:
+            params["IfNoneMatch"] = entry.etag
+        try:
+            response = client.get_object(**params)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if entry is not None and code in ("304", "NotModified"):
+                entry.checked_at = time.monotonic()
+                self._record(hit=True)
+                return entry
+            if code in MISSING_KEY_ERRORS:
+                self._record(hit=False)
+                self._remember_missing(key)
+                return None
+            raise
+
+        self._record(hit=False)
+        return self._store(key, response)
+
+    def _is_missing(self, key: str, now: float) -> bool:
+        with self._lock:
+            expires_at = self._missing.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._missing[key]
+                return False
+            return True
+
+    def _remember_missing(self, key: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if len(self._missing) >= self.max_missing:
+                self._missing = {k: v for k, v in self._missing.items() if v > now}
+                if len(self._missing) >= self.max_missing:
+                    self._missing.clear()
+            self._missing[key] = now + self.missing_ttl
+
+    def forget_missing(self, key: str) -> None:
+        """Clears a remembered miss, for a key that was just written."""
+        with self._lock:
+            self._missing.pop(key, None)
+
+    def _get(self, key: str) -> Optional[CachedAvatar]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def _store(self, key: str, response: Dict) -> CachedAvatar:
+        etag = response.get("ETag", "").strip('"')
+        name = hashlib.sha256(f"{key}\0{etag}".encode()).hexdigest()
+        path = os.path.join(self.directory, name)
+        if self._directory_pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(shutil.rmtree, self.directory, True)
+            self._directory_pid = os.getpid()
+
+        body = response["Body"]
+        size = 0
+        fd, partial_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as partial:
+                for chunk in body.iter_chunks(AVATAR_CACHE_CHUNK_SIZE):
+                    partial.write(chunk)
+                    size += len(chunk)
+            os.replace(partial_path, path)
+        except Exception:
+            os.remove(partial_path)
+            raise
+        finally:
+            body.close()
+
+        entry = CachedAvatar(key, path, size, etag, response.get("ContentType", "image/jpeg"),
+                             response.get("LastModified"))
+        with self._lock:
+            self._missing.pop(key, None)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+                if previous.path != path:
+                    self._remove_file(previous.path)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self._evictions += 1
+                self._remove_file(evicted.path)
+        return entry
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        # A response still streaming the file keeps reading it after the unlink.
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "objects_cached": len(self._entries),
+                "bytes_cached": self._size,
+                "missing_keys": len(self._missing),
+                "max_bytes": self.max_bytes,
+            }
+
+
+avatar_disk_cache = AvatarDiskCache()
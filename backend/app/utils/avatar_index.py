@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+AVATAR_RESOLVED_MAX_USERS = int(os.getenv("AVATAR_RESOLVED_MAX_USERS", "10000"))
+AVATAR_INDEX_MISS_TTL = int(os.getenv("AVATAR_INDEX_MISS_TTL", "60"))
+AVATAR_INDEX_MAX_MISSES = 10000
+
+
+class AvatarIndex:
+    """
+    In-memory record of the avatar files present in the upload folder, so resolving a
+    user's avatar needs no filesystem stat.
+
+    The folder is scanned once, on first use; afterwards the index is kept current by
+    `add` and `discard`, which the code writing and deleting avatar files must call.
+    Files written by another process are not announced, so a name missing from the index
+    is checked on disk before being reported absent, and added when found. A name found
+    absent is remembered for AVATAR_INDEX_MISS_TTL seconds, so a stored avatar whose file
+    is gone does not cost a stat on every lookup.
+
+    The avatar file each user resolves to is cached per user and reused for as long as the
+    user's stored avatar value is unchanged. Resolutions are bounded and evicted in
+    least-recently-used order.
+    """
+
+    def __init__(self, max_resolved: int = AVATAR_RESOLVED_MAX_USERS, miss_ttl: int = AVATAR_INDEX_MISS_TTL):
+        self.max_resolved = max_resolved
+        self.miss_ttl = miss_ttl
+        self._missing: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._folder: Optional[str] = None
+        self._files: Set[str] = set()
+        self._resolved: "OrderedDict[int, Tuple[Optional[str], str]]" = OrderedDict()
+
+    def load(self, folder: str) -> None:
+        """
+        Scans the upload folder and replaces the indexed file names.
+
+        Args:
+            folder (str): The directory holding the avatar files.
+        """
+        try:
+            with os.scandir(folder) as entries:
+                files = {entry.name for entry in entries if entry.is_file()}
+        except FileNotFoundError:
+            files = set()
+        with self._lock:
+            self._folder = folder
+            self._files = files
+            self._missing.clear()
+            self._resolved.clear()
+
+    def ensure_loaded(self, folder: str) -> None:
+        if self._folder != folder:
+            self.load(folder)
+
+    def exists(self, filename: str) -> bool:
+        """
+        Returns whether the file is indexed, or, unless it was recently found absent, present
+        on disk, indexing it then.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if filename in self._files:
+                return True
+            if self._missing.get(filename, now) > now:
+                return False
+            folder = self._folder
+        if folder is None or os.path.basename(filename) != filename \
+                or not os.path.isfile(os.path.join(folder, filename)):
+            self._remember_missing(filename, now)
+            return False
+        self.add(filename)
+        return True
+
+    def _remember_missing(self, filename: str, now: float) -> None:
+        with self._lock:
+            if len(self._missing) >= AVATAR_INDEX_MAX_MISSES:
+                self._missing = {name: expires for name, expires in self._missing.items() if expires > now}
+                if len(self._missing) >= AVATAR_INDEX_MAX_MISSES:
+                    self._missing.clear()
+            self._missing[filename] = now + self.miss_ttl
+
+    def add(self, filename: str) -> None:
+        with self._lock:
+            self._files.add(filename)
+            self._missing.pop(filename, None)
+
+    def discard(self, filename: str) -> None:
+        """Removes a deleted file, and every cached resolution that pointed at it."""
+        with self._lock:
+            self._files.discard(filename)
+            for user_id in [user_id for user_id, entry in self._resolved.items() if entry[0] == filename]:
+                del self._resolved[user_id]
+
+    def get_resolved(self, user_id: int, avatar: Optional[str]) -> Optional[str]:
+        """Returns the cached avatar file of the user, if it was resolved for the same avatar value."""
+        with self._lock:
+            entry = self._resolved.get(user_id)
+            if entry is None or entry[0] != avatar:
+                return None
+            self._resolved.move_to_end(user_id)
+            return entry[1]
+
+    def set_resolved(self, user_id: int, avatar: Optional[str], filename: str) -> None:
+        with self._lock:
+            self._resolved[user_id] = (avatar, filename)
+            self._resolved.move_to_end(user_id)
+            while len(self._resolved) > self.max_resolved:
+                self._resolved.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files_indexed": len(self._files), "files_missing": len(self._missing),
+                    "users_resolved": len(self._resolved)}
+
+
+avatar_index = AvatarIndex()
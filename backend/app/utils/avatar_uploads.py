@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+AVATAR_UPLOAD_WORKERS = int(os.getenv("AVATAR_UPLOAD_WORKERS", "4"))
+AVATAR_UPLOAD_STATUS_TTL = int(os.getenv("AVATAR_UPLOAD_STATUS_TTL", "3600"))
+
+UPLOAD_PENDING = "pending"
+UPLOAD_COMPLETE = "complete"
+UPLOAD_FAILED = "failed"
+
+_executor = ThreadPoolExecutor(max_workers=AVATAR_UPLOAD_WORKERS, thread_name_prefix="avatar-upload")
+
+
+class UploadTracker:
+    """
+    Status of the avatar uploads handed to the background transfer pool.
+
+    Finished uploads are kept for AVATAR_UPLOAD_STATUS_TTL seconds so clients can poll
+    for the outcome, then forgotten. The status lives in this process only: with several
+    workers, a poll answered by another worker falls back to the user's stored avatar.
+    """
+
+    def __init__(self, ttl: int = AVATAR_UPLOAD_STATUS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._uploads: Dict[str, Dict] = {}
+
+    def begin(self, upload_id: str, user_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._uploads = {
+                key: upload for key, upload in self._uploads.items()
+                if upload["status"] == UPLOAD_PENDING or now - upload["updated_at"] < self.ttl
+            }
+            self._uploads[upload_id] = {"user_id": int(user_id), "status": UPLOAD_PENDING, "updated_at": now}
+
+    def complete(self, upload_id: str, avatar_url: str) -> None:
+        self._update(upload_id, status=UPLOAD_COMPLETE, avatar_url=avatar_url)
+
+    def fail(self, upload_id: str, error: str) -> None:
+        self._update(upload_id, status=UPLOAD_FAILED, error=error)
+
+    def _update(self, upload_id: str, **fields) -> None:
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is not None:
+                upload.update(fields, updated_at=time.monotonic())
+
+    def get(self, upload_id: str) -> Optional[Dict]:
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            return dict(upload) if upload is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = sum(1 for upload in self._uploads.values() if upload["status"] == UPLOAD_PENDING)
+            return {"uploads_tracked": len(self._uploads), "uploads_pending": pending}
+
+
+def submit(task, *args) -> Future:
+    """Runs an avatar transfer on the bounded background pool."""
+    return _executor.submit(task, *args)
+
+
+avatar_uploads = UploadTracker()
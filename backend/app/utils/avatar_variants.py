@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+AVATAR_VARIANT_SIZES = (64, 128, 256)
+AVATAR_VARIANT_FORMAT = os.getenv("AVATAR_VARIANT_FORMAT", "webp").lower()
+AVATAR_VARIANT_QUALITY = int(os.getenv("AVATAR_VARIANT_QUALITY", "80"))
+AVATAR_PROCESSING_WORKERS = int(os.getenv("AVATAR_PROCESSING_WORKERS", "2"))
+AVATAR_PROCESSING_QUEUE_SIZE = int(os.getenv("AVATAR_PROCESSING_QUEUE_SIZE", "100"))
+# A task submitted under a key is not submitted again under it for this long, finished or not.
+AVATAR_TASK_RETRY_SECONDS = int(os.getenv("AVATAR_TASK_RETRY_SECONDS", "300"))
+AVATAR_TASK_MAX_KEYS = 10000
+VARIANT_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+VARIANT_MIMETYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Resizing and encoding run in Pillow's C code with the GIL released, so a few threads
+# keep the work off the request path without a process pool.
+_executor = ThreadPoolExecutor(max_workers=AVATAR_PROCESSING_WORKERS, thread_name_prefix="avatar")
+# Running plus queued tasks; the executor's own queue is unbounded.
+_slots = threading.BoundedSemaphore(AVATAR_PROCESSING_WORKERS + AVATAR_PROCESSING_QUEUE_SIZE)
+_lock = threading.Lock()
+_submitted_at: Dict[str, float] = {}
+
+
+def variant_filename(filename: str, size: int) -> str:
+    """Returns the file name of the square `size` px variant of an avatar."""
+    stem = filename.rsplit('.', 1)[0]
+    return f"{stem}_{size}.{VARIANT_EXTENSIONS[AVATAR_VARIANT_FORMAT]}"
+
+
+def variant_mimetype() -> str:
+    return VARIANT_MIMETYPES[AVATAR_VARIANT_FORMAT]
+
+
+def pick_variant_size(requested: Optional[int]) -> int:
+    """
+    Returns the smallest variant size covering the requested size, or the largest variant
+    if none does.
+    """
+    if requested is None:
+        return AVATAR_VARIANT_SIZES[-1]
+    for size in AVATAR_VARIANT_SIZES:
+        if size >= requested:
+            return size
+    return AVATAR_VARIANT_SIZES[-1]
+
+
+def render_variants(source_path: str, filename: str, output_dir: str) -> Dict[int, str]:
+    """
+    Writes the square, center-cropped variants of an avatar image. Each variant is written
+    to a temporary file and renamed into place, so readers never see a partial file.
+
+    Args:
+        source_path (str): The path of the original image.
+        filename (str): The avatar file name the variant names are derived from.
+        output_dir (str): The directory the variants are written to.
+
+    Returns:
+        Dict[int, str]: The path of the variant written for each size.
+    """
+    largest = AVATAR_VARIANT_SIZES[-1]
+    with Image.open(source_path) as image:
+        # Lets JPEG decode at a reduced scale instead of decoding every pixel.
+        image.draft("RGB", (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        mode = "RGBA" if AVATAR_VARIANT_FORMAT == "webp" and image.mode in ("RGBA", "LA", "P") else "RGB"
+        image = image.convert(mode)
+
+        paths = {}
+        for size in AVATAR_VARIANT_SIZES:
+            variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            path = os.path.join(output_dir, variant_filename(filename, size))
+            fd, partial_path = tempfile.mkstemp(dir=output_dir, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as partial:
+                    variant.save(partial, format=AVATAR_VARIANT_FORMAT.upper(), quality=AVATAR_VARIANT_QUALITY)
+                os.replace(partial_path, path)
+            except Exception:
+                os.remove(partial_path)
+                raise
+            paths[size] = path
+    return paths
+
+
+def submit(task, *args, key: Optional[str] = None) -> Optional[Future]:
+    """
+    Runs an avatar processing task on the bounded background pool.
+
+    Args:
+        task: The function to run.
+        *args: Its arguments.
+        key (str, optional): Identifies the work, so it is not queued again while it is
+                             pending or was attempted within AVATAR_TASK_RETRY_SECONDS.
+
+    Returns:
+        Optional[Future]: The task's future, or None if it was not queued because the pool
+                          is full or the same key was submitted recently.
+    """
+    if key is not None and not _claim(key):
+        return None
+    if not _slots.acquire(blocking=False):
+        if key is not None:
+            with _lock:
+                _submitted_at.pop(key, None)
+        return None
+    future = _executor.submit(task, *args)
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _claim(key: str) -> bool:
+    now = time.monotonic()
+    with _lock:
+        if now - _submitted_at.get(key, float("-inf")) < AVATAR_TASK_RETRY_SECONDS:
+            return False
+        if len(_submitted_at) >= AVATAR_TASK_MAX_KEYS:
+            for stale in [k for k, at in _submitted_at.items() if now - at >= AVATAR_TASK_RETRY_SECONDS]:
+                del _submitted_at[stale]
+        _submitted_at[key] = now
+        return True
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+CATALOG_CACHE_MAX_PRODUCTS = int(os.getenv("CATALOG_CACHE_MAX_PRODUCTS", "1000"))
+CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "1"))
+CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", "300"))
+
+
+class CatalogCache:
+    """
+    Process-local cache of serialized product documents.
+
+    Entries are only valid for the catalog version they were stored under; bumping the
+    version (on every review write) invalidates everything at once, including derived
+    artifacts such as encoded response bodies. Single-product entries are bounded and
+    evicted in least-recently-used order.
+
+    The product version moves only when product rows change, for structures built from the
+    product columns alone, which review writes leave valid.
+
+    Writes are published to versions shared by every instance (see `sync`), checked at
+    most every CATALOG_VERSION_CHECK_SECONDS. Whatever happens to those checks, nothing is
+    served for longer than CATALOG_CACHE_MAX_AGE seconds after it was invalidated last.
+    """
+
+    def __init__(self, max_products: int = CATALOG_CACHE_MAX_PRODUCTS,
+                 check_interval: float = CATALOG_VERSION_CHECK_SECONDS, max_age: int = CATALOG_CACHE_MAX_AGE):
+        self.max_products = max_products
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = 0
+        self._product_version = 0
+        self._shared_versions: Tuple[Optional[int], Optional[int]] = (None, None)
+        self._checked_at = float("-inf")
+        self._invalidated_at = time.monotonic()
+        self._catalog: Optional[List[Dict]] = None
+        self._products: "OrderedDict[int, Dict]" = OrderedDict()
+        self._artifacts: Dict[Hashable, Any] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        """
+        Moves the cache to a new catalog version, dropping every cached document.
+
+        Returns:
+            int: The new catalog version.
+        """
+        with self._lock:
+            self._version += 1
+            self._invalidated_at = time.monotonic()
+            self._catalog = None
+            self._products.clear()
+            self._artifacts.clear()
+            return self._version
+
+    @property
+    def product_version(self) -> int:
+        return self._product_version
+
+    def bump_product_version(self) -> int:
+        """
+        Records a change to the product rows, which also moves the catalog version.
+
+        Returns:
+            int: The new product version.
+        """
+        with self._lock:
+            self._product_version += 1
+        self.bump_version()
+        return self._product_version
+
+    def needs_sync(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def sync(self, shared_versions: Optional[Tuple[int, int]]) -> None:
+        """
+        Adopts the catalog and product versions shared by all instances, dropping what was
+        cached if another instance published a change since the last sync, or if the cache
+        outlived its max age.
+
+        Args:
+            shared_versions (Tuple[int, int], optional): The shared catalog and product
+                                                        versions, or None if they could not
+                                                        be read; only the max age applies then.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._checked_at = now
+            previous = self._shared_versions
+            if shared_versions is not None:
+                self._shared_versions = tuple(shared_versions)
+            expired = now - self._invalidated_at >= self.max_age
+        if expired or (shared_versions is not None and previous[1] != shared_versions[1]):
+            self.bump_product_version()
+        elif shared_versions is not None and previous[0] != shared_versions[0]:
+            self.bump_version()
+
+    def get_catalog(self) -> Optional[List[Dict]]:
+        with self._lock:
+            if self._catalog is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return self._catalog
+
+    def set_catalog(self, products: List[Dict], version: int) -> None:
+        """
+        Stores the full catalog, unless the version moved on while it was being built.
+        """
+        with self._lock:
+            if version == self._version:
+                self._catalog = products
+
+    def get_product(self, product_id: int) -> Optional[Dict]:
+        with self._lock:
+            product = self._products.get(product_id)
+            if product is None:
+                self._misses += 1
+                return None
+            self._products.move_to_end(product_id)
+            self._hits += 1
+            return product
+
+    def set_product(self, product_id: int, product: Dict, version: int) -> None:
+        """
+        Stores a single product, evicting the least recently used ones past the size bound.
+        """
+        with self._lock:
+            if version != self._version:
+                return
+            self._products[product_id] = product
+            self._products.move_to_end(product_id)
+            while len(self._products) > self.max_products:
+                self._products.popitem(last=False)
+                self._evictions += 1
+
+    def get_artifact(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns a value derived from the current catalog version, such as an encoded or
+        compressed response body.
+        """
+        with self._lock:
+            return self._artifacts.get(key)
+
+    def set_artifact(self, key: Hashable, value: Any, version: int) -> None:
+        with self._lock:
+            if version == self._version:
+                self._artifacts[key] = value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self._version,
+                "product_version": self._product_version,
+                "shared_versions": list(self._shared_versions),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "catalog_cached": self._catalog is not None,
+                "products_cached": len(self._products),
+                "artifacts_cached": len(self._artifacts),
+                "max_products": self.max_products,
+            }
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from typing import Dict
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("S3_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = int(os.getenv("S3_BREAKER_RESET_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while, so requests fail fast instead of
+    each waiting for a timeout.
+
+    After `failure_threshold` consecutive failures the breaker opens and `allow` refuses
+    calls for `reset_seconds`. Then a single trial call is let through: its success closes
+    the breaker, its failure opens it for another period.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: int = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._rejected = 0
+
+    def allow(self) -> bool:
+        """Returns whether a call may be made now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial_running and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._trial_running = True
+                return True
+            self._rejected += 1
+            return False
+
+    def check(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If no call may be made now.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": "closed" if self._opened_at is None else "open",
+                "consecutive_failures": self._failures,
+                "rejected_calls": self._rejected,
+            }
+
+
+s3_breaker = CircuitBreaker("s3")
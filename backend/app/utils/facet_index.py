@@ -0,0 +1,106 @@
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+PRICE_BUCKETS = ((0, 1), (1, 2), (2, 5), (5, 10), (10, 20), (20, None))
+
+
+class FacetIndex:
+    """
+    Precomputed facet structure over the product catalog.
+
+    Products are grouped into cells by (category, is_alcohol), each holding its sorted
+    prices, so counts for any combination of filters and price range are a handful of
+    binary searches instead of a GROUP BY scan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells: Dict[Tuple[Optional[str], bool], List[float]] = {}
+        self._version: Optional[int] = None
+
+    def is_stale(self, version: int) -> bool:
+        return self._version != version
+
+    def build(self, rows: Iterable[Tuple[Optional[str], float, Optional[bool]]], version: int) -> None:
+        """
+        Replaces the index contents.
+
+        Args:
+            rows: (category, price, is_alcohol) tuples for every product.
+            version (int): The catalog version the rows were read at.
+        """
+        cells: Dict[Tuple[Optional[str], bool], List[float]] = {}
+        for category, price, is_alcohol in rows:
+            cells.setdefault((category, bool(is_alcohol)), []).append(price)
+        for prices in cells.values():
+            prices.sort()
+
+        with self._lock:
+            self._cells = cells
+            self._version = version
+
+    @staticmethod
+    def _count_range(prices: List[float], low: Optional[float], high: Optional[float],
+                     high_inclusive: bool) -> int:
+        start = bisect_left(prices, low) if low is not None else 0
+        if high is None:
+            end = len(prices)
+        else:
+            end = bisect_right(prices, high) if high_inclusive else bisect_left(prices, high)
+        return max(end - start, 0)
+
+    def counts(self, categories: Optional[Sequence[str]] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, is_alcohol: Optional[bool] = None) -> Dict:
+        """
+        Counts the products matching the filters, broken down by each facet.
+
+        Args:
+            categories (Sequence[str], optional): Only count products in these categories.
+            min_price (float, optional): Inclusive lower price bound.
+            max_price (float, optional): Inclusive upper price bound.
+            is_alcohol (bool, optional): Only count alcoholic or non-alcoholic products.
+
+        Returns:
+            Dict: The total and the per-category, per-price-bucket and alcohol/non-alcohol counts.
+        """
+        category_counts: Dict[str, int] = {}
+        alcohol_counts = {"true": 0, "false": 0}
+        bucket_counts = [0] * len(PRICE_BUCKETS)
+        total = 0
+
+        with self._lock:
+            cells = list(self._cells.items())
+
+        for (category, alcohol), prices in cells:
+            if categories and category not in categories:
+                continue
+            if is_alcohol is not None and alcohol != is_alcohol:
+                continue
+
+            count = self._count_range(prices, min_price, max_price, high_inclusive=True)
+            if not count:
+                continue
+            total += count
+            category_counts[category or ""] = category_counts.get(category or "", 0) + count
+            alcohol_counts["true" if alcohol else "false"] += count
+
+            for position, (bucket_low, bucket_high) in enumerate(PRICE_BUCKETS):
+                low = bucket_low if min_price is None else max(bucket_low, min_price)
+                if max_price is not None and (bucket_high is None or max_price < bucket_high):
+                    bucket_counts[position] += self._count_range(prices, low, max_price, high_inclusive=True)
+                else:
+                    bucket_counts[position] += self._count_range(prices, low, bucket_high, high_inclusive=False)
+
+        return {
+            "total": total,
+            "categories": category_counts,
+            "price_buckets": [
+                {"min": low, "max": high, "count": count}
+                for (low, high), count in zip(PRICE_BUCKETS, bucket_counts)
+            ],
+            "is_alcohol": alcohol_counts,
+        }
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,80 @@
+import os
+from typing import Any, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_SERIALIZER = os.getenv("JSON_SERIALIZER", "orjson")
+COMPACT_SEPARATORS = (",", ":")
+INDENTED_SEPARATORS = (",", ": ")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes and decodes with orjson.
+
+    Output follows the stdlib provider's compact and 2-space indented layouts, the ones
+    Flask responses use. Calls using options orjson has no equivalent for, such as other
+    separators and indents or encoder classes, go to the stdlib implementation.
+
+    So do documents orjson would write differently: those with non-string keys, and, while
+    `ensure_ascii` is on (the default), those containing non-ASCII text, which the stdlib
+    escapes as \\uXXXX.
+
+    Two divergences remain. NaN and infinite floats are written as null instead of the
+    stdlib's non-standard NaN/Infinity tokens. Floats below 1e-4 or from 1e16 on are
+    written in orjson's notation, e.g. 1e-7, 0.00001 and 1e16 where the stdlib writes
+    1e-07, 1e-05 and 1e+16. They parse to the same values, and finding them would take
+    a scan of the output that costs more than the encoding.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        indent = kwargs.pop("indent", None)
+        separators = kwargs.pop("separators", None)
+        sort_keys = kwargs.pop("sort_keys", self.sort_keys)
+        ensure_ascii = kwargs.pop("ensure_ascii", self.ensure_ascii)
+        default = kwargs.pop("default", self.default)
+
+        def stdlib_dumps():
+            return super(OrjsonProvider, self).dumps(
+                obj, indent=indent, separators=separators, sort_keys=sort_keys,
+                ensure_ascii=ensure_ascii, default=default, **kwargs
+            )
+
+        compact = indent is None and separators == COMPACT_SEPARATORS
+        indented = indent == 2 and separators in (None, INDENTED_SEPARATORS)
+        if kwargs or not (compact or indented):
+            return stdlib_dumps()
+
+        # Without OPT_NON_STR_KEYS, orjson rejects non-string keys and the stdlib handles them.
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            encoded = orjson.dumps(obj, default=default, option=option).decode()
+        except TypeError:
+            return stdlib_dumps()
+        if ensure_ascii and not encoded.isascii():
+            return stdlib_dumps()
+        return encoded
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def get_json_provider_class():
+    """
+    Picks the JSON provider configured by JSON_SERIALIZER, falling back to the stdlib
+    provider when orjson is not installed.
+    """
+    if JSON_SERIALIZER == "orjson" and orjson is not None:
+        return OrjsonProvider
+    return DefaultJSONProvider
@@ -0,0 +1,75 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BAYESIAN_PRIOR_WEIGHT = float(os.getenv("BAYESIAN_PRIOR_WEIGHT", "5"))
+
+
+class Leaderboards:
+    """
+    In-memory product rankings computed from the stored rating aggregates.
+
+    Top-rated rankings use a Bayesian average, (C * m + rating_sum) / (C + review_count),
+    where m is the mean rating over all reviews and C is BAYESIAN_PRIOR_WEIGHT, so that a
+    product with a couple of 5-star reviews does not outrank one with hundreds of 4.8s.
+    """
+
+    def __init__(self, prior_weight: float = BAYESIAN_PRIOR_WEIGHT):
+        self.prior_weight = prior_weight
+        self._lock = threading.Lock()
+        self._top_rated: List[Tuple[int, float]] = []
+        self._top_rated_by_category: Dict[str, List[Tuple[int, float]]] = {}
+        self._most_reviewed: List[Tuple[int, float]] = []
+        self._version: Optional[int] = None
+
+    def is_stale(self, version: int) -> bool:
+        return self._version != version
+
+    def build(self, rows: Iterable[Tuple[int, Optional[str], int, float]], version: int) -> None:
+        """
+        Replaces the rankings.
+
+        Args:
+            rows: (product_id, category, review_count, rating_sum) tuples for the rated products.
+            version (int): The catalog version the rows were read at.
+        """
+        rows = [row for row in rows if row[2] > 0]
+        total_reviews = sum(row[2] for row in rows)
+        global_mean = sum(row[3] for row in rows) / total_reviews if total_reviews else 0.0
+        prior = self.prior_weight * global_mean
+
+        top_rated = []
+        by_category: Dict[str, List[Tuple[int, float]]] = {}
+        for product_id, category, review_count, rating_sum in rows:
+            entry = (product_id, (prior + rating_sum) / (self.prior_weight + review_count))
+            top_rated.append(entry)
+            by_category.setdefault(category or "", []).append(entry)
+
+        def by_score(entry):
+            return -entry[1], entry[0]
+
+        top_rated.sort(key=by_score)
+        for entries in by_category.values():
+            entries.sort(key=by_score)
+        most_reviewed = sorted(((row[0], float(row[2])) for row in rows), key=by_score)
+
+        with self._lock:
+            self._top_rated = top_rated
+            self._top_rated_by_category = by_category
+            self._most_reviewed = most_reviewed
+            self._version = version
+
+    def top_rated(self, limit: int, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Returns (product_id, bayesian_average) pairs, best first."""
+        with self._lock:
+            if category is None:
+                return self._top_rated[:limit]
+            return self._top_rated_by_category.get(category, [])[:limit]
+
+    def most_reviewed(self, limit: int) -> List[Tuple[int, float]]:
+        """Returns (product_id, review_count) pairs, most reviewed first."""
+        with self._lock:
+            return self._most_reviewed[:limit]
+
+
+leaderboards = Leaderboards()
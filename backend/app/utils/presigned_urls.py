@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+PRESIGNED_URL_EXPIRES = int(os.getenv("PRESIGNED_URL_EXPIRES", "3600"))
+PRESIGNED_URL_REFRESH_MARGIN = int(os.getenv("PRESIGNED_URL_REFRESH_MARGIN", "300"))
+
+
+class PresignedUrlCache:
+    """
+    Per-key cache of presigned S3 GET URLs.
+
+    A URL is reused until PRESIGNED_URL_REFRESH_MARGIN seconds before it expires, so every
+    URL handed out stays valid for at least that long, and clients keep seeing the same URL
+    (and hitting their own cache) for most of its lifetime.
+    """
+
+    def __init__(self, expires_in: int = PRESIGNED_URL_EXPIRES,
+                 refresh_margin: int = PRESIGNED_URL_REFRESH_MARGIN):
+        self.expires_in = expires_in
+        self.refresh_margin = min(refresh_margin, expires_in // 2)
+        self._lock = threading.Lock()
+        self._urls: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._next_prune = time.time() + expires_in
+
+    def get(self, client, bucket: str, key: str) -> Tuple[str, int]:
+        """
+        Returns a presigned GET URL for an S3 object, signing a new one if needed.
+
+        Args:
+            client: The S3 client.
+            bucket (str): The bucket holding the object.
+            key (str): The object key.
+
+        Returns:
+            Tuple[str, int]: The URL, and the number of seconds it may still be handed out for.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._urls.get((bucket, key))
+        if entry is not None and entry[1] - self.refresh_margin > now:
+            return entry[0], int(entry[1] - self.refresh_margin - now)
+
+        url = client.generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=self.expires_in
+        )
+        expires_at = now + self.expires_in
+        with self._lock:
+            self._urls[(bucket, key)] = (url, expires_at)
+            if now >= self._next_prune:
+                # Drop the URLs of keys nobody asked for since they expired.
+                self._urls = {k: v for k, v in self._urls.items() if v[1] > now}
+                self._next_prune = now + self.expires_in
+        return url, self.expires_in - self.refresh_margin
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"urls_cached": len(self._urls)}
+
+
+presigned_urls = PresignedUrlCache()
@@ -0,0 +1,248 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SEARCH_INDEX_TTL = int(os.getenv("SEARCH_INDEX_TTL", "300"))
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+MAX_PREFIX_TERMS = 50
+# The best postings kept per term for single-term prefix queries, which need no more to
+# rank that many suggestions exactly.
+MAX_SUGGESTIONS = int(os.getenv("MAX_SUGGESTIONS", "200"))
+
+_rebuilder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+
+
+def normalize_term(term: str) -> str:
+    """Folds simple plurals so that e.g. 'oranges' and 'orange' index to the same term."""
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term[:-1]
+    return term
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Splits a text into lowercase alphanumeric terms."""
+    return [normalize_term(term) for term in TOKEN_PATTERN.findall((value or "").lower())]
+
+
+def encode_cursor(score: float, product_id: int) -> str:
+    return f"{score!r}:{product_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Parses a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    score, product_id = cursor.rsplit(":", 1)
+    return float(score), int(product_id)
+
+
+class IndexData(NamedTuple):
+    """One immutable build of the index, swapped in whole so queries read it without locking."""
+    postings: Dict[str, Dict[int, float]]
+    top_postings: Dict[str, List[Tuple[float, int]]]
+    terms: List[str]
+    names: Dict[int, str]
+
+
+EMPTY_INDEX = IndexData({}, {}, [], {})
+
+
+class ProductSearchIndex:
+    """
+    In-memory inverted index over product name, category and description.
+
+    Each term maps to the products containing it with a field-weighted term frequency;
+    queries are scored with those weights times the term's inverse document frequency.
+    The sorted term list backs prefix lookups for autocomplete, and each term's best
+    scoring postings are kept in order so a one-word prefix is ranked from those alone.
+
+    The index is rebuilt when the product version moves or after `ttl` seconds. The first
+    build runs on the calling thread; later ones run once, in the background, while the
+    previous build keeps answering queries.
+    """
+
+    def __init__(self, ttl: int = SEARCH_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._data = EMPTY_INDEX
+        self._version: Optional[int] = None
+        self._built_at: Optional[float] = None
+        self._rebuilding = False
+
+    def is_stale(self, version: Optional[int] = None) -> bool:
+        return self._built_at is None or self._version != version or time.monotonic() - self._built_at > self.ttl
+
+    def invalidate(self) -> None:
+        self._built_at = None
+
+    def refresh(self, version: int, load_products: Callable[[], Iterable[Tuple[int, str, Optional[str], Optional[str]]]]) -> None:
+        """
+        Brings the index up to date with a product version, if it is stale.
+
+        Args:
+            version (int): The current product version.
+            load_products (Callable): Returns the (id, name, description, category) tuples
+                                      of every product; called from the rebuild thread
+                                      once the index was built.
+        """
+        if not self.is_stale(version):
+            return
+        if self._built_at is None:
+            # Nothing to serve yet: concurrent callers wait for a single build.
+            with self._build_lock:
+                if self._built_at is None:
+                    self.build(load_products(), version)
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        _rebuilder.submit(self._rebuild, version, load_products)
+
+    def _rebuild(self, version: int, load_products: Callable) -> None:
+        try:
+            self.build(load_products(), version)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def build(self, products: Iterable[Tuple[int, str, Optional[str], Optional[str]]],
+              version: Optional[int] = None) -> None:
+        """
+        Replaces the index contents.
+
+        Args:
+            products: (id, name, description, category) tuples for every product.
+            version (int, optional): The product version the products were read at.
+        """
+        postings: Dict[str, Dict[int, float]] = {}
+        names: Dict[int, str] = {}
+        for product_id, name, description, category in products:
+            names[product_id] = name
+            for field, value in (("name", name), ("category", category), ("description", description)):
+                for term in tokenize(value):
+                    weights = postings.setdefault(term, {})
+                    weights[product_id] = weights.get(product_id, 0.0) + FIELD_WEIGHTS[field]
+
+        top_postings = {}
+        for term, weights in postings.items():
+            idf = math.log(1 + len(names) / len(weights))
+            top_postings[term] = heapq.nsmallest(
+                MAX_SUGGESTIONS + 1, ((-weight * idf, product_id) for product_id, weight in weights.items())
+            )
+
+        data = IndexData(postings, top_postings, sorted(postings), names)
+        with self._lock:
+            self._data = data
+            self._version = version
+            self._built_at = time.monotonic()
+
+    def name(self, product_id: int) -> Optional[str]:
+        return self._data.names.get(product_id)
+
+    @staticmethod
+    def _idf(data: IndexData, term: str) -> float:
+        return math.log(1 + len(data.names) / len(data.postings[term]))
+
+    @staticmethod
+    def _prefix_terms(data: IndexData, prefix: str) -> List[str]:
+        start = bisect_left(data.terms, prefix)
+        matches = []
+        for term in data.terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def _score(self, data: IndexData, terms: List[str], prefix: bool) -> Dict[int, float]:
+        """
+        Scores the products matching every term; with `prefix`, the last term may match
+        any indexed term it is a prefix of.
+        """
+        scores: Optional[Dict[int, float]] = None
+        for position, term in enumerate(terms):
+            if prefix and position == len(terms) - 1:
+                candidates = self._prefix_terms(data, term)
+            else:
+                candidates = [term] if term in data.postings else []
+
+            term_scores: Dict[int, float] = {}
+            for candidate in candidates:
+                idf = self._idf(data, candidate)
+                weights = data.postings[candidate]
+                if scores is not None and len(scores) < len(weights):
+                    # Only products matching the earlier terms can still match.
+                    matching = ((product_id, weights[product_id]) for product_id in scores if product_id in weights)
+                else:
+                    matching = weights.items()
+                for product_id, weight in matching:
+                    term_scores[product_id] = max(term_scores.get(product_id, 0.0), weight * idf)
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {product_id: score + term_scores[product_id]
+                          for product_id, score in scores.items() if product_id in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def _suggest(self, data: IndexData, prefix: str, limit: int) -> List[Tuple[float, int]]:
+        """
+        Ranks a one-word prefix from the best postings of the terms it matches. A product
+        scores its best matching term, so the top `limit` overall are among the top `limit`
+        of each term.
+        """
+        best: Dict[int, float] = {}
+        for term in self._prefix_terms(data, prefix):
+            for negated_score, product_id in data.top_postings[term][:limit]:
+                best[product_id] = min(best.get(product_id, 0.0), negated_score)
+        return heapq.nsmallest(limit, ((negated_score, product_id) for product_id, negated_score in best.items()))
+
+    def search(self, query: str, limit: int, after: Optional[Tuple[float, int]] = None,
+               prefix: bool = False) -> Tuple[List[Tuple[int, float]], Optional[str]]:
+        """
+        Ranks the products matching all query terms by relevance, then by ID.
+
+        Args:
+            query (str): The search text.
+            limit (int): The maximum number of results.
+            after (Tuple[float, int], optional): The decoded cursor of the previous page.
+            prefix (bool): Whether the last query term is matched as a prefix.
+
+        Returns:
+            Tuple: The (product_id, score) results and the cursor of the next page, if any.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return [], None
+
+        data = self._data
+        if prefix and len(terms) == 1 and after is None and limit <= MAX_SUGGESTIONS:
+            ranked = self._suggest(data, terms[0], limit + 1)
+        else:
+            scores = self._score(data, terms, prefix)
+            ranked = ((-score, product_id) for product_id, score in scores.items())
+            if after is not None:
+                boundary = (-after[0], after[1])
+                ranked = (entry for entry in ranked if entry > boundary)
+            # Only the page (and one more entry, to know if another page exists) is sorted.
+            ranked = heapq.nsmallest(limit + 1, ranked)
+
+        page = [(product_id, -negated_score) for negated_score, product_id in ranked[:limit]]
+        next_cursor = encode_cursor(*page[-1][::-1]) if len(ranked) > limit else None
+        return page, next_cursor
+
+
+search_index = ProductSearchIndex()
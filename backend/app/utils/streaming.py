@@ -0,0 +1,70 @@
+import os
+from typing import Any, Iterable, Iterator
+
+from flask import current_app, stream_with_context
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+
+def iter_json_array(items: Iterable[Any], batch_size: int = STREAM_BATCH_SIZE) -> Iterator[str]:
+    """
+    Encodes an iterable as a JSON array, one chunk per `batch_size` elements.
+
+    The output is byte-identical to `jsonify(list(items))` under the same JSON provider
+    (the orjson one writes some floats differently from the stdlib one): elements are
+    encoded with the app's provider, using the same compact or indented layout jsonify
+    would pick.
+
+    Args:
+        items (Iterable[Any]): The JSON-serializable array elements.
+        batch_size (int): The number of elements encoded per yielded chunk.
+
+    Yields:
+        str: Consecutive pieces of the JSON document.
+    """
+    json_provider = current_app.json
+    compact = getattr(json_provider, "compact", None)
+    pretty = (compact is None and current_app.debug) or compact is False
+
+    if pretty:
+        opening, separator, closing = "[\n  ", ",\n  ", "\n]\n"
+    else:
+        opening, separator, closing = "[", ",", "]\n"
+
+    chunks = []
+    started = False
+    for item in items:
+        if pretty:
+            encoded = json_provider.dumps(item, indent=2).replace("\n", "\n  ")
+        else:
+            encoded = json_provider.dumps(item, separators=(",", ":"))
+        chunks.append(separator if started else opening)
+        chunks.append(encoded)
+        started = True
+        if len(chunks) >= 2 * batch_size:
+            yield "".join(chunks)
+            chunks = []
+
+    if not started:
+        yield "[]\n"
+        return
+    chunks.append(closing)
+    yield "".join(chunks)
+
+
+def stream_json_array(items: Iterable[Any], batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Builds a streamed JSON response from an iterable, without materializing the whole array.
+
+    Args:
+        items (Iterable[Any]): The JSON-serializable array elements, typically read from a
+                               server-side cursor.
+        batch_size (int): The number of elements encoded per yielded chunk.
+
+    Returns:
+        Response: A streamed response with the JSON mimetype.
+    """
+    return current_app.response_class(
+        stream_with_context(iter_json_array(items, batch_size)),
+        mimetype=current_app.json.mimetype
+    )
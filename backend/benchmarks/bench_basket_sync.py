@@ -0,0 +1,74 @@
+"""
+Latency of syncing a basket to the database, by basket size.
+
+Runs against the database given by POSTGRES_URI; the user and products it creates are
+deleted afterwards.
+
+Usage (from backend/):
+    POSTGRES_URI=postgresql+psycopg2://... python -m benchmarks.bench_basket_sync [--sizes 1,10,50,200] [--rounds 200]
+"""
+import argparse
+import time
+
+from app import create_app, db
+from app.models.product_model import Product
+from app.models.user_model import BasketItem, User
+from app.services.user_service import sync_basket_service
+
+from .bench_search import percentiles
+
+
+def make_baskets(product_ids: list, size: int, rounds: int) -> list:
+    """
+    Alternates between the first `size` products and a window shifted by half of it, with
+    changing quantities, so each sync updates, adds and removes items.
+    """
+    shift = max(1, size // 2)
+    baskets = []
+    for round_number in range(rounds):
+        start = shift if round_number % 2 else 0
+        baskets.append([{"product_id": product_id, "quantity": 1 + round_number % 5}
+                        for product_id in product_ids[start:start + size]])
+    return baskets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,10,50,200",
+                        type=lambda value: [int(size) for size in value.split(",")])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app(with_frontend=False)
+    with app.app_context():
+        db.create_all()
+        products = [Product(name=f"Benchmark product {i}", description="", price=1.0, category="Benchmark",
+                            image_url="") for i in range(max(args.sizes) * 2)]
+        user = User(username="basket-benchmark", email="basket-benchmark@example.com", password="x")
+        db.session.add_all(products + [user])
+        db.session.commit()
+        product_ids = [product.id for product in products]
+        user_id = user.id
+
+        try:
+            print(f"{'items':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+            for size in args.sizes:
+                samples = []
+                for basket in make_baskets(product_ids, size, args.rounds):
+                    start = time.perf_counter()
+                    result = sync_basket_service(user_id, basket)
+                    samples.append(time.perf_counter() - start)
+                    if "error" in result:
+                        raise RuntimeError(result["error"])
+                result = percentiles(samples)
+                print(f"{size:>6} {result[50]:>9.2f} {result[95]:>9.2f} {result[99]:>9.2f}")
+        finally:
+            db.session.rollback()
+            BasketItem.query.filter_by(user_id=user_id).delete()
+            User.query.filter_by(id=user_id).delete()
+            Product.query.filter(Product.id.in_(product_ids)).delete(synchronize_session=False)
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
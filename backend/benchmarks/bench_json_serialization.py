@@ -0,0 +1,80 @@
+"""
+Serialization throughput of `get_all_products` output with the stdlib and orjson JSON providers.
+
+Usage (from backend/):
+    python -m benchmarks.bench_json_serialization [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.models.product_model import PRODUCT_FIELDS
+from app.utils.json_provider import COMPACT_SEPARATORS, OrjsonProvider
+
+CATEGORIES = ("Fruit", "Vegetables", "Bakery", "Dairy", "Drinks", "Snacks")
+
+
+def make_products(count: int, reviews_per_product: int = 3, seed: int = 0) -> list:
+    """Builds product dictionaries shaped like `Product.to_dict()`."""
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        ratings = [rng.randint(1, 5) for _ in range(reviews_per_product)]
+        product = {
+            "id": product_id,
+            "name": f"Product {product_id}",
+            "description": "A fresh product from the grocery catalog, picked and packed daily.",
+            "price": round(rng.uniform(0.5, 50), 2),
+            "category": rng.choice(CATEGORIES),
+            "image_url": f"/images/product_{product_id}.jpg",
+            "is_alcohol": rng.random() < 0.1,
+            "rating": {
+                "count": len(ratings),
+                "sum": float(sum(ratings)),
+                "mean": sum(ratings) / len(ratings),
+                "histogram": {str(star): ratings.count(star) for star in range(1, 6)},
+            },
+            "reviews": [
+                {"id": product_id * 10 + n, "product_id": product_id, "author": f"user{n}",
+                 "rating": float(rating), "comment": "Tasty and good value."}
+                for n, rating in enumerate(ratings)
+            ],
+        }
+        products.append({field: product[field] for field in PRODUCT_FIELDS})
+    return products
+
+
+def measure(provider, products: list, repeat: int) -> float:
+    """Returns the best wall time of `repeat` serializations, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        provider.dumps(products, separators=COMPACT_SEPARATORS)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {"stdlib": DefaultJSONProvider(app), "orjson": OrjsonProvider(app)}
+
+    print(f"{'products':>10} {'provider':>8} {'best (ms)':>10} {'MB/s':>8} {'products/s':>12}")
+    for size in args.sizes:
+        products = make_products(size)
+        body_size = len(providers["stdlib"].dumps(products, separators=COMPACT_SEPARATORS).encode())
+        for name, provider in providers.items():
+            seconds = measure(provider, products, args.repeat)
+            print(f"{size:>10} {name:>8} {seconds * 1000:>10.1f} {body_size / seconds / 1e6:>8.1f} "
+                  f"{size / seconds:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Build time of the "frequently bought together" index over synthetic purchase histories.
+
+Usage (from backend/):
+    python -m benchmarks.bench_related [--users 1000000] [--products 10000] [--history 8]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.recommendation_service import build_cooccurrence_index
+
+
+def make_histories(users: int, products: int, history: int, seed: int = 0) -> list:
+    """
+    Draws each user's purchases from a Zipf-like popularity curve, so a few products are
+    bought by many users, like a real catalog.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, products + 1)
+    popularity /= popularity.sum()
+    lengths = rng.integers(1, 2 * history, size=users)
+    purchases = rng.choice(np.arange(1, products + 1), size=int(lengths.sum()), p=popularity)
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    return [purchases[bounds[i]:bounds[i + 1]].tolist() for i in range(users)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--history", type=int, default=8, help="Mean products bought per user")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    histories = make_histories(args.users, args.products, args.history)
+    purchases = sum(len(history) for history in histories)
+    print(f"Generated {args.users} histories ({purchases} purchases) in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    index = build_cooccurrence_index(histories, args.top_k)
+    elapsed = time.perf_counter() - start
+    print(f"Built related products for {len(index)} of {args.products} products in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Latency of the in-memory product search index: full-text queries and prefix autocomplete.
+
+Usage (from backend/):
+    python -m benchmarks.bench_search [--products 100000] [--queries 2000]
+"""
+import argparse
+import random
+import time
+
+from app.utils.search_index import ProductSearchIndex
+
+CATEGORIES = ("Fruit", "Vegetables", "Bakery", "Dairy", "Drinks", "Snacks", "Frozen", "Pantry")
+WORDS = (
+    "apple banana orange mango grape lemon lime cherry peach pear plum berry melon kiwi carrot potato "
+    "tomato onion garlic pepper spinach lettuce bread bagel muffin croissant milk cheese butter yogurt "
+    "cream juice water soda coffee tea beer wine chips cookie cracker nut rice pasta flour sugar salt "
+    "organic fresh frozen sliced whole sweet spicy smoked roasted crunchy creamy light classic premium"
+).split()
+
+
+def make_products(count: int, seed: int = 0) -> list:
+    """Builds (id, name, description, category) rows with a vocabulary like the catalog's."""
+    rng = random.Random(seed)
+    rows = []
+    for product_id in range(1, count + 1):
+        name = " ".join(rng.choices(WORDS, k=3)).title()
+        description = " ".join(rng.choices(WORDS, k=15))
+        rows.append((product_id, f"{name} {product_id}", description, rng.choice(CATEGORIES)))
+    return rows
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000 for p in (50, 95, 99)}
+
+
+def run(index: ProductSearchIndex, queries: list, limit: int, prefix: bool) -> dict:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit, prefix=prefix)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    rows = make_products(args.products)
+    index = ProductSearchIndex()
+    start = time.perf_counter()
+    index.build(rows)
+    print(f"Built index over {args.products} products in {time.perf_counter() - start:.2f} s")
+
+    workloads = {
+        "one term": [rng.choice(WORDS) for _ in range(args.queries)],
+        "two terms": [" ".join(rng.sample(WORDS, 2)) for _ in range(args.queries)],
+        "autocomplete": [rng.choice(WORDS)[:rng.randint(1, 4)] for _ in range(args.queries)],
+    }
+    print(f"{'workload':>14} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for name, queries in workloads.items():
+        result = run(index, queries, args.limit if name != "autocomplete" else 10, prefix=name == "autocomplete")
+        print(f"{name:>14} {result[50]:>9.2f} {result[95]:>9.2f} {result[99]:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
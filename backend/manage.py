@@ -1,8 +1,13 @@
 import os
+import sys
 import time
 import psycopg2
 from flask_migrate import Migrate, upgrade, init, migrate
 from app import create_app, db, Config
+from app.schema import create_missing_schema as create_schema
+from app.services.product_service import rebuild_rating_aggregates
+from app.services.recommendation_service import rebuild_related_products
+from app.services.user_service import backfill_avatar_variants
 
 app = create_app()
 migration = Migrate(app, db)
@@ -48,6 +53,38 @@ def run_migrations():
         print("✅ Skipping migrations - Using AWS RDS")
 
 
+def create_missing_schema():
+    """Create tables, columns and indexes added to the models after the database was first migrated,
+    removing the rows that duplicate a new unique index's key first."""
+    with app.app_context():
+        removed = create_schema()
+    for table, count in removed.items():
+        if count:
+            print(f"🧹 Removed {count} duplicate rows from {table}.")
+    print("✅ All tables, columns and indexes are present.")
+
+
+def rebuild_ratings():
+    """Recompute the per-product rating aggregates from the reviews table."""
+    with app.app_context():
+        count = rebuild_rating_aggregates()
+    print(f"✅ Rebuilt rating aggregates for {count} products.")
+
+
+def build_related():
+    """Recompute the frequently-bought-together index from the users' purchase histories."""
+    with app.app_context():
+        count = rebuild_related_products()
+    print(f"✅ Built related products for {count} products.")
+
+
+def generate_avatar_variants():
+    """Generate the resized variants of the default avatar and of avatars uploaded before variants existed."""
+    with app.app_context():
+        count = backfill_avatar_variants()
+    print(f"✅ Checked the variants of {count} avatars.")
+
+
 def seed_database():
     """Seed the database, ensuring products are inserted before reviews."""
     if IS_LOCAL:
@@ -98,7 +135,22 @@ def seed_database():
             print("✅ Database seeding complete!")
 
 
+COMMANDS = {
+    "create-schema": create_missing_schema,
+    "rebuild-ratings": rebuild_ratings,
+    "build-related": build_related,
+    "avatar-variants": generate_avatar_variants,
+}
+
+
 if __name__ == "__main__":
     wait_for_db()
-    run_migrations()
-    seed_database()
+    if len(sys.argv) > 1:
+        if sys.argv[1] not in COMMANDS:
+            sys.exit(f"Unknown command '{sys.argv[1]}'. Available commands: {', '.join(COMMANDS)}")
+        COMMANDS[sys.argv[1]]()
+    else:
+        run_migrations()
+        create_missing_schema()
+        seed_database()
+        rebuild_ratings()
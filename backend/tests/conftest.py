@@ -0,0 +1,75 @@
+import os
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, text
+
+# Database tests run against a real PostgreSQL given by TEST_POSTGRES_URI; everything in it
+# is dropped and recreated. The app reads its configuration at import time.
+TEST_POSTGRES_URI = os.getenv("TEST_POSTGRES_URI")
+if TEST_POSTGRES_URI:
+    os.environ["POSTGRES_URI"] = TEST_POSTGRES_URI
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-that-is-long-enough-for-hs256")
+
+from app import create_app, db  # noqa: E402
+from app.utils.catalog_cache import catalog_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    if not TEST_POSTGRES_URI:
+        pytest.skip("TEST_POSTGRES_URI is not set")
+    app = create_app(with_frontend=False)
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def session(app):
+    """An app context whose tables are emptied, and the in-process caches reset, afterwards."""
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        table_names = ", ".join(table.name for table in db.metadata.sorted_tables)
+        db.session.execute(text(f"TRUNCATE {table_names} RESTART IDENTITY CASCADE"))
+        db.session.commit()
+    catalog_cache.bump_version()
+
+
+@pytest.fixture
+def client(app, session):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    from flask_jwt_extended import create_access_token
+
+    def make_headers(user_id):
+        with app.app_context():
+            return {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    return make_headers
+
+
+@pytest.fixture
+def count_queries(app):
+    """Returns a context manager collecting the SQL statements sent inside its block."""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return counter
@@ -0,0 +1,141 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from app.utils.avatar_cache import AvatarDiskCache
+from app.utils.circuit_breaker import CircuitBreaker
+
+BUCKET = "avatars"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+class CountingClient:
+    """Wraps an S3 client, counting get_object calls."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def get_object(self, **params):
+        self.calls += 1
+        return self.client.get_object(**params)
+
+
+def put(s3, key, body):
+    s3.put_object(Bucket=BUCKET, Key=key, Body=body, ContentType="image/png")
+
+
+def read(opened):
+    avatar, file = opened
+    with file:
+        return file.read()
+
+
+def test_cached_objects_are_served_without_calling_s3(s3, tmp_path):
+    put(s3, "avatars/a.png", b"a")
+    client = CountingClient(s3)
+    cache = AvatarDiskCache(str(tmp_path))
+
+    first = cache.open(client, BUCKET, "avatars/a.png")
+    second = cache.open(client, BUCKET, "avatars/a.png")
+
+    assert read(first) == read(second) == b"a"
+    assert first[0].content_type == "image/png"
+    assert client.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_missing_keys_are_remembered(s3, tmp_path):
+    client = CountingClient(s3)
+    cache = AvatarDiskCache(str(tmp_path))
+
+    assert cache.open(client, BUCKET, "avatars/missing.png") is None
+    assert cache.open(client, BUCKET, "avatars/missing.png") is None
+    assert client.calls == 1
+
+
+class ForbiddenClient:
+    """An S3 client without s3:ListBucket, which S3 answers 403 for missing keys."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_object(self, **params):
+        self.calls += 1
+        raise ClientError({"Error": {"Code": "AccessDenied"}, "ResponseMetadata": {"HTTPStatusCode": 403}},
+                          "GetObject")
+
+
+def test_access_denied_counts_as_missing_not_as_a_failure(tmp_path):
+    client = ForbiddenClient()
+    cache = AvatarDiskCache(str(tmp_path))
+    breaker = CircuitBreaker("test", failure_threshold=1)
+
+    assert cache.open(client, BUCKET, "avatars/missing.png", breaker) is None
+    assert cache.open(client, BUCKET, "avatars/missing.png", breaker) is None
+    assert client.calls == 1
+    assert breaker.allow()
+
+
+def test_unchanged_objects_are_revalidated_not_downloaded(s3, tmp_path):
+    put(s3, "avatars/a.png", b"a")
+    client = CountingClient(s3)
+    cache = AvatarDiskCache(str(tmp_path), revalidate_after=0)
+
+    first = cache.fetch(client, BUCKET, "avatars/a.png")
+    second = cache.fetch(client, BUCKET, "avatars/a.png")
+
+    assert second is first
+    assert client.calls == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_changed_objects_are_downloaded_again(s3, tmp_path):
+    put(s3, "avatars/a.png", b"a")
+    cache = AvatarDiskCache(str(tmp_path), revalidate_after=0)
+    cache.fetch(s3, BUCKET, "avatars/a.png")
+
+    put(s3, "avatars/a.png", b"changed")
+
+    assert read(cache.open(s3, BUCKET, "avatars/a.png")) == b"changed"
+    assert cache.stats()["objects_cached"] == 1
+
+
+def test_files_being_served_survive_eviction(s3, tmp_path):
+    put(s3, "avatars/a.png", b"a" * 10)
+    put(s3, "avatars/b.png", b"b" * 10)
+    cache = AvatarDiskCache(str(tmp_path), max_bytes=15)
+
+    serving = cache.open(s3, BUCKET, "avatars/a.png")
+    cache.open(s3, BUCKET, "avatars/b.png")[1].close()
+
+    assert cache.stats()["evictions"] == 1
+    assert read(serving) == b"a" * 10
+
+
+def test_objects_evicted_before_being_opened_are_downloaded_again(s3, tmp_path):
+    put(s3, "avatars/a.png", b"a" * 10)
+    put(s3, "avatars/b.png", b"b" * 10)
+    client = CountingClient(s3)
+    cache = AvatarDiskCache(str(tmp_path), max_bytes=15)
+    original_fetch = cache.fetch
+
+    def fetch_then_evict(*args, **kwargs):
+        # Another request stores b.png between this fetch and the open, evicting a.png.
+        entry = original_fetch(*args, **kwargs)
+        cache.fetch = original_fetch
+        original_fetch(client, BUCKET, "avatars/b.png")
+        return entry
+
+    cache.fetch = fetch_then_evict
+
+    assert read(cache.open(client, BUCKET, "avatars/a.png")) == b"a" * 10
+    assert client.calls == 3
@@ -0,0 +1,81 @@
+import os
+
+from app.utils.avatar_index import AvatarIndex
+
+
+def test_files_written_after_the_scan_are_found_and_indexed(tmp_path):
+    index = AvatarIndex()
+    index.load(str(tmp_path))
+
+    (tmp_path / "user_1.png").write_bytes(b"png")
+
+    assert index.exists("user_1.png")
+    assert index.stats()["files_indexed"] == 1
+
+
+def test_names_outside_the_folder_are_not_found(tmp_path):
+    (tmp_path / "avatars").mkdir()
+    (tmp_path / "secret.png").write_bytes(b"png")
+    index = AvatarIndex()
+    index.load(str(tmp_path / "avatars"))
+
+    assert not index.exists("../secret.png")
+
+
+def test_resolutions_are_evicted_least_recently_used_first(tmp_path):
+    index = AvatarIndex(max_resolved=2)
+    index.load(str(tmp_path))
+    index.set_resolved(1, "a.png", "a.png")
+    index.set_resolved(2, "b.png", "b.png")
+    assert index.get_resolved(1, "a.png") == "a.png"
+
+    index.set_resolved(3, "c.png", "c.png")
+
+    assert index.get_resolved(2, "b.png") is None
+    assert index.get_resolved(1, "a.png") == "a.png"
+    assert index.stats()["users_resolved"] == 2
+
+
+def test_discard_drops_the_resolutions_pointing_at_the_file(tmp_path):
+    index = AvatarIndex()
+    index.load(str(tmp_path))
+    index.set_resolved(1, "a.png", "a.png")
+    index.set_resolved(2, "b.png", "b.png")
+
+    index.discard("a.png")
+
+    assert index.get_resolved(1, "a.png") is None
+    assert index.get_resolved(2, "b.png") == "b.png"
+
+
+def test_missing_files_are_checked_on_disk_once_per_ttl(tmp_path, monkeypatch):
+    index = AvatarIndex(miss_ttl=60)
+    index.load(str(tmp_path))
+    stats = []
+    isfile = os.path.isfile
+    monkeypatch.setattr(os.path, "isfile", lambda path: stats.append(path) or isfile(path))
+
+    assert not index.exists("user_4_pendo.png")
+    assert not index.exists("user_4_pendo.png")
+
+    assert len(stats) == 1
+
+
+def test_missing_files_are_found_once_the_ttl_expires(tmp_path):
+    index = AvatarIndex(miss_ttl=0)
+    index.load(str(tmp_path))
+    assert not index.exists("user_1.png")
+
+    (tmp_path / "user_1.png").write_bytes(b"png")
+
+    assert index.exists("user_1.png")
+
+
+def test_added_files_are_no_longer_missing(tmp_path):
+    index = AvatarIndex(miss_ttl=60)
+    index.load(str(tmp_path))
+    assert not index.exists("user_1.png")
+
+    index.add("user_1.png")
+
+    assert index.exists("user_1.png")
@@ -0,0 +1,176 @@
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from flask import Flask
+from moto import mock_aws
+
+from app.controllers import user_controller
+from app.services import user_service
+from app.utils.avatar_cache import AvatarDiskCache
+from app.utils.circuit_breaker import CircuitBreaker
+
+BUCKET = "avatars"
+
+
+@pytest.fixture
+def client():
+    """A bare app serving avatars, so these tests need no database."""
+    app = Flask(__name__)
+    app.add_url_rule("/api/me/avatar/<filename>", view_func=user_controller.serve_avatar)
+    return app.test_client()
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    return AvatarDiskCache(str(tmp_path))
+
+
+@pytest.fixture
+def s3(monkeypatch, disk_cache):
+    """Serves avatars from a mocked S3 bucket, through a fresh disk cache and circuit breaker."""
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr(user_controller, "USE_S3_STORAGE", True)
+        monkeypatch.setattr(user_controller, "s3_client", client)
+        monkeypatch.setattr(user_service, "s3_client", client)
+        monkeypatch.setattr(user_service, "S3_BUCKET", BUCKET)
+        monkeypatch.setattr(user_service, "avatar_disk_cache", disk_cache)
+        monkeypatch.setattr(user_service, "s3_breaker", CircuitBreaker("s3-test"))
+        yield client
+
+
+def put(s3, name, body):
+    s3.put_object(Bucket=BUCKET, Key=f"avatars/{name}", Body=body, ContentType="image/png")
+
+
+def test_s3_avatars_are_served_from_the_disk_cache(client, s3, disk_cache):
+    put(s3, "user_1.png", b"avatar")
+
+    first = client.get("/api/me/avatar/user_1.png")
+    second = client.get("/api/me/avatar/user_1.png")
+
+    assert first.status_code == second.status_code == 200
+    assert first.get_data() == second.get_data() == b"avatar"
+    assert first.content_length == 6
+    assert first.mimetype == "image/png"
+    assert disk_cache.stats()["hits"] == 1
+
+
+def test_revalidating_clients_get_a_304(client, s3):
+    put(s3, "user_1.png", b"avatar")
+    etag = client.get("/api/me/avatar/user_1.png").headers["ETag"]
+
+    response = client.get("/api/me/avatar/user_1.png", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+
+def test_avatars_evicted_while_being_sent_are_still_served(client, s3, disk_cache):
+    put(s3, "user_1.png", b"1" * 10)
+    put(s3, "user_2.png", b"2" * 10)
+    disk_cache.max_bytes = 15
+
+    response = client.get("/api/me/avatar/user_1.png", buffered=False)
+    client.get("/api/me/avatar/user_2.png")
+
+    assert disk_cache.stats()["evictions"] == 1
+    assert response.get_data() == b"1" * 10
+
+
+class FailingClient:
+    """An S3 client whose every call fails like an S3 outage."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_object(self, **params):
+        self.calls += 1
+        raise ClientError({"Error": {"Code": "InternalError"}, "ResponseMetadata": {"HTTPStatusCode": 500}},
+                          "GetObject")
+
+
+def test_failing_s3_is_called_once_before_falling_back_to_the_local_avatar(client, s3, monkeypatch):
+    failing = FailingClient()
+    monkeypatch.setattr(user_service, "s3_client", failing)
+
+    for expected_calls in (1, 2):
+        response = client.get("/api/me/avatar/user_1.png?size=64")
+
+        assert response.status_code == 200
+        assert failing.calls == expected_calls
+
+
+class CountingClient:
+    """Wraps an S3 client, recording the keys asked for."""
+
+    def __init__(self, client):
+        self.client = client
+        self.keys = []
+
+    def get_object(self, **params):
+        self.keys.append(params["Key"])
+        return self.client.get_object(**params)
+
+
+@pytest.fixture
+def counting_s3(s3, monkeypatch):
+    counting = CountingClient(s3)
+    monkeypatch.setattr(user_service, "s3_client", counting)
+    return counting
+
+
+def test_exact_variants_are_cached_long(client, s3, counting_s3):
+    put(s3, "user_1_64.webp", b"variant")
+
+    response = client.get("/api/me/avatar/user_1.png?size=64")
+
+    assert response.get_data() == b"variant"
+    assert response.cache_control.max_age == user_service.AVATAR_MAX_AGE
+    assert counting_s3.keys == ["avatars/user_1_64.webp"]
+
+
+def test_originals_served_for_missing_variants_are_cached_briefly(client, s3, counting_s3):
+    put(s3, "user_1.png", b"original")
+
+    response = client.get("/api/me/avatar/user_1.png?size=64")
+
+    assert response.get_data() == b"original"
+    assert response.cache_control.max_age == user_service.AVATAR_FALLBACK_MAX_AGE
+    assert counting_s3.keys == ["avatars/user_1_64.webp", "avatars/user_1.png"]
+
+
+def test_missing_avatars_fall_back_to_the_local_default_after_two_lookups(client, s3, counting_s3):
+    response = client.get("/api/me/avatar/user_1.png?size=64")
+
+    assert response.status_code == 200
+    assert response.cache_control.max_age == user_service.AVATAR_FALLBACK_MAX_AGE
+    assert counting_s3.keys == ["avatars/user_1_64.webp", "avatars/user_1.png"]
+
+
+def test_variants_missing_behind_a_served_original_are_queued(client, s3, monkeypatch):
+    put(s3, "user_1.png", b"original")
+    queued = []
+    monkeypatch.setattr(user_controller, "queue_missing_variants", lambda name, in_s3: queued.append((name, in_s3)))
+
+    client.get("/api/me/avatar/user_1.png?size=64")
+    client.get("/api/me/avatar/user_1.png")
+
+    assert queued == [("user_1.png", True)]
+
+
+def test_names_no_upload_can_have_are_not_looked_up_in_s3(client, s3, counting_s3):
+    response = client.get("/api/me/avatar/user_1.txt")
+
+    assert response.status_code == 200
+    assert counting_s3.keys == []
+
+
+def test_variants_asked_for_by_name_have_no_variants_looked_up(client, s3, counting_s3):
+    put(s3, "user_1_64.webp", b"variant")
+
+    response = client.get("/api/me/avatar/user_1_64.webp?size=128")
+
+    assert response.get_data() == b"variant"
+    assert counting_s3.keys == ["avatars/user_1_64.webp"]
@@ -0,0 +1,69 @@
+import pytest
+
+from app import db
+from app.models.user_model import User
+from app.services import user_service
+from app.utils.avatar_uploads import avatar_uploads
+
+
+class StubS3:
+    """Accepts every upload without storing it."""
+
+    def upload_file(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def stub_s3(monkeypatch):
+    monkeypatch.setattr(user_service, "s3_client", StubS3())
+    monkeypatch.setattr(user_service, "S3_BUCKET", "avatars")
+    monkeypatch.setattr(user_service, "submit_avatar_task", lambda *args: None)
+
+
+def upload(app, user_id, filename, tmp_path):
+    spool_path = tmp_path / filename
+    spool_path.write_bytes(b"png")
+    avatar_uploads.begin(filename, user_id)
+    user_service.upload_avatar_to_s3(app, user_id, str(spool_path), filename, "image/png")
+    return avatar_uploads.get(filename)
+
+
+def test_uploads_finishing_out_of_order_keep_the_newest_avatar(app, session, stub_s3, tmp_path):
+    user = User(username="ann", email="ann@example.com", password="x", pending_avatar="user_1_2_new.png")
+    db.session.add(user)
+    db.session.commit()
+
+    newest = upload(app, user.id, "user_1_2_new.png", tmp_path)
+    older = upload(app, user.id, "user_1_1_old.png", tmp_path)
+
+    db.session.refresh(user)
+    assert user.avatar.endswith("/avatars/user_1_2_new.png")
+    assert user.pending_avatar is None
+    assert newest["status"] == "complete"
+    assert older["status"] == "failed"
+    assert not (tmp_path / "user_1_1_old.png").exists()
+
+
+def test_superseded_uploads_do_not_replace_the_avatar(app, session, stub_s3, tmp_path):
+    user = User(username="ann", email="ann@example.com", password="x", pending_avatar="user_1_2_new.png")
+    db.session.add(user)
+    db.session.commit()
+
+    older = upload(app, user.id, "user_1_1_old.png", tmp_path)
+
+    db.session.refresh(user)
+    assert user.avatar is None
+    assert user.pending_avatar == "user_1_2_new.png"
+    assert older["error"] == "Superseded by a newer avatar upload"
+
+
+def test_uploads_another_process_accepted_report_the_user_state(app, session):
+    user = User(username="ann", email="ann@example.com", password="x",
+                avatar="https://bucket/avatars/user_1_3_current.png", pending_avatar="user_1_4_elsewhere.png")
+    db.session.add(user)
+    db.session.commit()
+
+    assert user_service.get_avatar_upload_status(user.id, "user_1_4_elsewhere.png") == {
+        "upload_id": "user_1_4_elsewhere.png", "status": "pending"}
+    assert user_service.get_avatar_upload_status(user.id, "user_1_3_current.png")["status"] == "complete"
+    assert user_service.get_avatar_upload_status(user.id, "user_1_0_unknown.png") == {"error": "Upload not found"}
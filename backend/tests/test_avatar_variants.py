@@ -0,0 +1,128 @@
+import threading
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+from app.services import user_service
+from app.utils import avatar_variants
+from app.utils.avatar_index import AvatarIndex
+from app.utils.avatar_variants import AVATAR_VARIANT_SIZES, render_variants, variant_filename
+
+BUCKET = "avatars"
+
+
+def write_image(path, size=(300, 200)):
+    Image.new("RGB", size, "red").save(path, format="PNG")
+
+
+def test_variants_are_square_and_written_whole(tmp_path):
+    write_image(tmp_path / "user_1.png")
+
+    paths = render_variants(str(tmp_path / "user_1.png"), "user_1.png", str(tmp_path))
+
+    assert sorted(paths) == list(AVATAR_VARIANT_SIZES)
+    for size, path in paths.items():
+        with Image.open(path) as variant:
+            assert variant.size == (size, size)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_failed_renders_leave_no_files(tmp_path, monkeypatch):
+    write_image(tmp_path / "user_1.png")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Image.Image, "save", fail)
+    with pytest.raises(OSError):
+        render_variants(str(tmp_path / "user_1.png"), "user_1.png", str(tmp_path))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["user_1.png"]
+
+
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    index = AvatarIndex()
+    index.load(str(tmp_path))
+    monkeypatch.setattr(user_service, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(user_service, "avatar_index", index)
+    return tmp_path
+
+
+def test_local_variants_are_indexed(app, upload_folder):
+    write_image(upload_folder / "user_1.png")
+
+    user_service.generate_local_variants(app, "user_1.png")
+
+    for size in AVATAR_VARIANT_SIZES:
+        assert (upload_folder / variant_filename("user_1.png", size)).exists()
+        assert user_service.avatar_index.exists(variant_filename("user_1.png", size))
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr(user_service, "s3_client", client)
+        monkeypatch.setattr(user_service, "S3_BUCKET", BUCKET)
+        yield client
+
+
+def keys(s3):
+    return sorted(item["Key"] for item in s3.list_objects_v2(Bucket=BUCKET).get("Contents", []))
+
+
+def test_s3_variants_are_uploaded_and_the_spooled_file_removed(app, s3, tmp_path):
+    write_image(tmp_path / "spooled.png")
+
+    user_service.generate_s3_variants(app, str(tmp_path / "spooled.png"), "user_1.png")
+
+    assert keys(s3) == sorted(f"avatars/{variant_filename('user_1.png', size)}" for size in AVATAR_VARIANT_SIZES)
+    assert s3.head_object(Bucket=BUCKET, Key="avatars/user_1_64.webp")["ContentType"] == "image/webp"
+    assert not (tmp_path / "spooled.png").exists()
+
+
+def test_missing_s3_variants_are_backfilled_from_the_original(app, s3, tmp_path):
+    write_image(tmp_path / "user_1.png")
+    s3.upload_file(str(tmp_path / "user_1.png"), BUCKET, "avatars/user_1.png")
+
+    user_service.generate_missing_s3_variants(app, "user_1.png")
+
+    assert keys(s3) == sorted(["avatars/user_1.png"] + [
+        f"avatars/{variant_filename('user_1.png', size)}" for size in AVATAR_VARIANT_SIZES])
+
+
+def test_existing_s3_variants_are_not_rendered_again(app, s3, monkeypatch):
+    s3.put_object(Bucket=BUCKET, Key=f"avatars/{variant_filename('user_1.png', AVATAR_VARIANT_SIZES[-1])}", Body=b"")
+    rendered = []
+    monkeypatch.setattr(user_service, "generate_s3_variants", lambda *args: rendered.append(args))
+
+    user_service.generate_missing_s3_variants(app, "user_1.png")
+
+    assert rendered == []
+
+
+def test_the_processing_queue_is_bounded(monkeypatch):
+    monkeypatch.setattr(avatar_variants, "_slots", threading.BoundedSemaphore(1))
+    release = threading.Event()
+
+    running = avatar_variants.submit(release.wait)
+    dropped = avatar_variants.submit(release.wait)
+    release.set()
+    running.result()
+
+    assert dropped is None
+    assert avatar_variants.submit(lambda: None).result() is None
+
+
+def test_keyed_tasks_are_not_queued_twice(monkeypatch):
+    monkeypatch.setattr(avatar_variants, "_submitted_at", {})
+
+    first = avatar_variants.submit(lambda: None, key="local:user_1.png")
+    second = avatar_variants.submit(lambda: None, key="local:user_1.png")
+
+    assert first is not None
+    assert second is None
@@ -0,0 +1,61 @@
+from sqlalchemy import text
+
+from app import db
+from app.models.product_model import Product
+from app.services.product_service import PUBLISH_CATALOG_CHANGE_SQL
+from app.utils.catalog_cache import catalog_cache
+
+
+def add_product(name):
+    product = Product(name=name, description="", price=1.0, category="Fruit", image_url="")
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def write_on_another_instance(product_id, name):
+    """Renames a product and publishes the change the way another app instance would."""
+    with db.engine.begin() as connection:
+        connection.execute(text("UPDATE products SET name = :name WHERE id = :id"), {"name": name, "id": product_id})
+        connection.execute(PUBLISH_CATALOG_CHANGE_SQL, {"products": 1})
+
+
+def names(client):
+    # Requests share the test's session; a fresh one would not hold the loaded products.
+    db.session.expire_all()
+    return [product["name"] for product in client.get("/api/products/all_products").get_json()]
+
+
+def test_changes_published_by_other_instances_are_picked_up(client, monkeypatch):
+    product = add_product("Apple")
+    assert names(client) == ["Apple"]
+
+    write_on_another_instance(product.id, "Green apple")
+    monkeypatch.setattr(catalog_cache, "check_interval", 3600)
+    assert names(client) == ["Apple"]
+
+    monkeypatch.setattr(catalog_cache, "check_interval", 0)
+    assert names(client) == ["Green apple"]
+
+
+def test_the_cache_expires_without_published_changes(client, monkeypatch):
+    product = add_product("Apple")
+    assert names(client) == ["Apple"]
+
+    with db.engine.begin() as connection:
+        connection.execute(text("UPDATE products SET name = 'Green apple' WHERE id = :id"), {"id": product.id})
+    monkeypatch.setattr(catalog_cache, "check_interval", 0)
+    assert names(client) == ["Apple"]
+
+    monkeypatch.setattr(catalog_cache, "max_age", 0)
+    assert names(client) == ["Green apple"]
+
+
+def test_local_writes_move_the_shared_versions(session):
+    product = add_product("Apple")
+    product.name = "Green apple"
+    db.session.commit()
+
+    version, product_version = db.session.execute(text("SELECT version, product_version FROM catalog_versions")).one()
+    assert product_version == 2
+    assert catalog_cache.stats()["shared_versions"] == [version, product_version]
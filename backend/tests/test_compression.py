@@ -0,0 +1,89 @@
+import gzip
+
+import pytest
+from flask import Flask, jsonify
+
+from app.middleware import compression
+from app.middleware.compression import COMPRESSION_MIN_SIZE, init_compression, precompressed
+from app.utils.catalog_cache import catalog_cache
+
+brotli = pytest.importorskip("brotli")
+
+LARGE = {"items": ["product"] * COMPRESSION_MIN_SIZE}
+SMALL = {"items": []}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_compression(app)
+
+    @app.route("/large")
+    def large():
+        return jsonify(LARGE)
+
+    @app.route("/small")
+    def small():
+        return jsonify(SMALL)
+
+    @app.route("/document")
+    def document():
+        precompressed("document", catalog_cache.version)
+        return jsonify(LARGE)
+
+    yield app.test_client()
+    catalog_cache.bump_version()
+
+
+def test_brotli_is_preferred_when_accepted(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, deflate, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.get_data()) == client.get("/large").get_data()
+
+
+def test_client_preferences_are_honoured(client):
+    response = client.get("/large", headers={"Accept-Encoding": "br;q=0.5, gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()) == client.get("/large").get_data()
+
+
+@pytest.mark.parametrize("accept_encoding", [None, "identity", "deflate"])
+def test_bodies_are_sent_as_they_are_without_a_supported_encoding(client, accept_encoding):
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+    response = client.get("/large", headers=headers)
+
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json() == LARGE
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json() == SMALL
+
+
+@pytest.mark.parametrize("path", ["/large", "/small"])
+def test_compressible_responses_vary_on_accept_encoding(client, path):
+    for headers in ({}, {"Accept-Encoding": "gzip"}):
+        response = client.get(path, headers=headers)
+        assert "Accept-Encoding" in response.vary
+
+
+def test_precompressed_documents_are_compressed_once_per_version(client, monkeypatch):
+    calls = []
+    original_compress = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda data, encoding: calls.append(encoding)
+                        or original_compress(data, encoding))
+
+    bodies = [client.get("/document", headers={"Accept-Encoding": "gzip"}).get_data() for _ in range(3)]
+    client.get("/document", headers={"Accept-Encoding": "br"})
+    assert calls == ["gzip", "br"]
+    assert len(set(bodies)) == 1
+    assert gzip.decompress(bodies[0]) == client.get("/document").get_data()
+
+    catalog_cache.bump_version()
+    client.get("/document", headers={"Accept-Encoding": "gzip"})
+    assert calls == ["gzip", "br", "gzip"]
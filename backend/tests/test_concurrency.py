@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models.product_model import Product, ProductRating, Review
+from app.models.user_model import BasketItem, User
+from app.services.product_service import add_review_to_product
+from app.services.user_service import add_to_favorites, sync_basket_service
+
+WORKERS = 8
+
+
+def run_concurrently(app, task, arguments):
+    """Runs task(argument) for each argument on its own thread and app context, all at once."""
+    barrier = threading.Barrier(len(arguments))
+
+    def run(argument):
+        with app.app_context():
+            barrier.wait()
+            try:
+                return task(argument)
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=len(arguments)) as executor:
+        return list(executor.map(run, arguments))
+
+
+def add_products(count):
+    products = [Product(name=f"Product {i}", description="", price=1.0, category="Fruit", image_url="")
+                for i in range(count)]
+    db.session.add_all(products)
+    db.session.commit()
+    return [product.id for product in products]
+
+
+def add_user():
+    user = User(username="ann", email="ann@example.com", password="x", fav_products=[])
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def test_concurrent_reviews_by_one_author_add_one_review(app, session):
+    product_id, = add_products(1)
+
+    results = run_concurrently(app, lambda rating: add_review_to_product(
+        product_id, {"author": "ann", "rating": rating, "comment": ""}), [1, 2, 3, 4, 5, 1, 2, 3])
+
+    assert sum("message" in result for result in results) == 1
+    assert Review.query.filter_by(product_id=product_id).count() == 1
+    assert db.session.get(ProductRating, product_id).review_count == 1
+
+
+def test_concurrent_favorites_are_all_kept(app, session):
+    product_ids = add_products(WORKERS)
+    user_id = add_user()
+
+    run_concurrently(app, lambda product_id: add_to_favorites(user_id, product_id), product_ids * 2)
+
+    assert sorted(db.session.get(User, user_id).fav_products) == product_ids
+
+
+def test_concurrent_basket_syncs_keep_one_row_per_product(app, session):
+    product_ids = add_products(3)
+    user_id = add_user()
+    baskets = [[{"product_id": product_id, "quantity": quantity} for product_id in product_ids]
+               for quantity in range(1, WORKERS + 1)]
+
+    results = run_concurrently(app, lambda basket: sync_basket_service(user_id, basket), baskets)
+
+    assert all("message" in result for result in results)
+    items = BasketItem.query.filter_by(user_id=user_id).all()
+    assert sorted(item.product_id for item in items) == product_ids
+    assert len({item.quantity for item in items}) == 1
+
+
+def test_concurrent_basket_syncs_in_opposite_orders_do_not_deadlock(app, session):
+    product_ids = add_products(200)
+    user_id = add_user()
+    baskets = [[{"product_id": product_id, "quantity": quantity}
+                for product_id in (product_ids if quantity % 2 else product_ids[::-1])]
+               for quantity in range(1, WORKERS + 1)]
+
+    results = run_concurrently(app, lambda basket: sync_basket_service(user_id, basket), baskets)
+
+    assert all("message" in result for result in results)
+    assert BasketItem.query.filter_by(user_id=user_id).count() == len(product_ids)
@@ -0,0 +1,45 @@
+from app import db
+from app.models.product_model import Product
+from app.services.product_service import add_review_to_product, ensure_facet_index
+from app.utils.catalog_cache import catalog_cache
+from app.utils.facet_index import facet_index
+
+
+def add_product(name, category, price):
+    product = Product(name=name, description="", price=price, category=category, image_url="")
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def test_review_writes_keep_the_facet_index(session):
+    product = add_product("Apple", "Fruit", 1.5)
+    ensure_facet_index()
+
+    add_review_to_product(product.id, {"author": "ann", "rating": 5})
+
+    assert not facet_index.is_stale(catalog_cache.product_version)
+
+
+def test_product_edits_rebuild_the_facet_index(session):
+    product = add_product("Apple", "Fruit", 1.5)
+    ensure_facet_index()
+    assert facet_index.counts()["categories"] == {"Fruit": 1}
+
+    product.category = "Snacks"
+    db.session.commit()
+    assert facet_index.is_stale(catalog_cache.product_version)
+
+    ensure_facet_index()
+    assert facet_index.counts()["categories"] == {"Snacks": 1}
+
+
+def test_rolled_back_product_edits_keep_the_facet_index(session):
+    product = add_product("Apple", "Fruit", 1.5)
+    ensure_facet_index()
+
+    product.category = "Snacks"
+    db.session.flush()
+    db.session.rollback()
+
+    assert not facet_index.is_stale(catalog_cache.product_version)
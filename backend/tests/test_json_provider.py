@@ -0,0 +1,62 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.json_provider import OrjsonProvider
+
+DOCUMENTS = [
+    {"name": "Apple", "price": 1.5, "tags": ["fruit", "fresh"], "rating": None, "is_alcohol": False},
+    [{"b": 1, "a": 2}, {"nested": {"z": [1, 2.25, -3], "y": "text"}}],
+    {"name": "Crème brûlée", "emoji": "🍎"},
+    {1: "one", 2: "two"},
+    {"when": datetime.datetime(2024, 5, 1, 12, 30), "day": datetime.date(2024, 5, 1)},
+    {"id": uuid.UUID("12345678-1234-5678-1234-567812345678"), "price": decimal.Decimal("1.10")},
+    {"big": 2 ** 70, "small": -(2 ** 63)},
+    {"edges": [0.0001, 9999999999999998.0, -0.0, 123.25], "ratio": "1:1e5"},
+    "plain \"quoted\" \\ string\n",
+]
+LAYOUTS = [
+    {"separators": (",", ":")},
+    {"indent": 2},
+    {},
+    {"ensure_ascii": False, "separators": (",", ":")},
+    {"sort_keys": False, "separators": (",", ":")},
+]
+
+
+@pytest.fixture(scope="module")
+def flask_app():
+    return Flask(__name__)
+
+
+@pytest.fixture(scope="module")
+def providers(flask_app):
+    return DefaultJSONProvider(flask_app), OrjsonProvider(flask_app)
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_dumps_matches_the_stdlib_provider(providers, document, layout):
+    stdlib, fast = providers
+    assert fast.dumps(document, **layout) == stdlib.dumps(document, **layout)
+
+
+def test_responses_match_the_stdlib_provider(flask_app, providers):
+    stdlib, fast = providers
+    with flask_app.test_request_context():
+        for document in DOCUMENTS:
+            assert fast.response(document).get_data() == stdlib.response(document).get_data()
+
+
+@pytest.mark.parametrize("value, stdlib_text, orjson_text", [
+    (1e-7, "1e-07", "1e-7"), (1.5e-05, "1.5e-05", "0.000015"), (1e16, "1e+16", "1e16"), (2.5e300, "2.5e+300", "2.5e300"),
+])
+def test_exponent_floats_keep_orjson_notation(providers, value, stdlib_text, orjson_text):
+    stdlib, fast = providers
+    assert stdlib.dumps([value], separators=(",", ":")) == f"[{stdlib_text}]"
+    assert fast.dumps([value], separators=(",", ":")) == f"[{orjson_text}]"
+    assert fast.loads(fast.dumps([value])) == stdlib.loads(stdlib.dumps([value])) == [value]
@@ -0,0 +1,247 @@
+import pytest
+
+from app import db
+from app.models.order_model import Order, OrderItem
+from app.models.product_model import Product, Review
+from app.models.user_model import User
+from app.services.product_service import MAX_PAGE_SIZE, rebuild_rating_aggregates
+from app.services.recommendation_service import rebuild_related_products
+from app.utils.catalog_cache import catalog_cache
+
+
+def add_products(count, **fields):
+    products = [
+        Product(name=f"Product {i}", description="", price=1.0 + i, category="Fruit", image_url="", **fields)
+        for i in range(count)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+LIMITED_PATHS = [
+    "/api/products/all_products",
+    "/api/products/search?q=product",
+    "/api/products/filter",
+    "/api/products/leaderboards/top-rated",
+    "/api/products/leaderboards/most-reviewed",
+    "/api/products/1/reviews",
+    "/api/products/1/related",
+]
+
+
+@pytest.mark.parametrize("path", LIMITED_PATHS)
+@pytest.mark.parametrize("limit", ["0", "-1", "ten"])
+def test_limits_below_one_are_rejected(client, path, limit):
+    separator = "&" if "?" in path else "?"
+    response = client.get(f"{path}{separator}limit={limit}")
+
+    assert response.status_code == 400
+
+
+def test_limits_above_the_page_size_are_capped(client):
+    add_products(MAX_PAGE_SIZE + 1)
+
+    response = client.get(f"/api/products/all_products?limit={MAX_PAGE_SIZE * 10}")
+
+    assert response.status_code == 200
+    assert len(response.get_json()["products"]) == MAX_PAGE_SIZE
+
+
+def add_reviews(product, ratings, first_author=0):
+    reviews = [Review(product_id=product.id, author=f"author {n}", rating=rating, comment="")
+               for n, rating in enumerate(ratings, first_author)]
+    db.session.add_all(reviews)
+    db.session.commit()
+    return reviews
+
+
+def all_pages(client, path):
+    items, cursor = [], None
+    while True:
+        response = client.get(f"{path}&after={cursor}" if cursor else path)
+        assert response.status_code == 200
+        page = response.get_json()
+        items.extend(page["reviews"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize("order, key", [
+    ("id", lambda review: review["id"]),
+    ("rating", lambda review: (-review["rating"], -review["id"])),
+])
+def test_review_pages_follow_the_order(client, order, key):
+    product, = add_products(1)
+    add_reviews(product, [3, 5, 1, 4, 5, 2, 3])
+
+    reviews = all_pages(client, f"/api/products/{product.id}/reviews?order={order}&limit=2")
+
+    assert len(reviews) == 7
+    assert reviews == sorted(reviews, key=key)
+
+
+def test_reviews_of_a_product_without_reviews_are_empty(client):
+    product, = add_products(1)
+
+    response = client.get(f"/api/products/{product.id}/reviews")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"reviews": [], "next_cursor": None}
+
+
+def test_reviews_of_an_unknown_product_are_not_found(client):
+    response = client.get("/api/products/999/reviews")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("reviews, expected_count", [(None, 3), ("none", 0), ("2", 2), ("10", 3)])
+def test_product_detail_embeds_the_requested_reviews(client, reviews, expected_count):
+    product, = add_products(1)
+    add_reviews(product, [5, 4, 3])
+    query = f"?reviews={reviews}" if reviews else ""
+
+    response = client.get(f"/api/products/{product.id}{query}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["id"] == product.id
+    assert [review["rating"] for review in body.get("reviews", [])] == [5, 4, 3][:expected_count]
+
+
+def test_product_detail_rejects_an_invalid_review_count(client):
+    product, = add_products(1)
+
+    assert client.get(f"/api/products/{product.id}?reviews=some").status_code == 400
+    assert client.get("/api/products/999?reviews=2").status_code == 404
+
+
+def test_listing_pages_cover_every_product_once(client):
+    products = add_products(7)
+
+    ids, cursor = [], None
+    while True:
+        response = client.get(f"/api/products/all_products?limit=3{f'&after={cursor}' if cursor else ''}")
+        assert response.status_code == 200
+        page = response.get_json()
+        ids.extend(product["id"] for product in page["products"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert ids == [product.id for product in products]
+
+
+def test_listing_pages_hold_only_the_requested_fields(client):
+    add_products(2)
+
+    response = client.get("/api/products/all_products?fields=id,name,price")
+
+    assert [set(product) for product in response.get_json()["products"]] == [{"id", "name", "price"}] * 2
+    assert client.get("/api/products/all_products?fields=id,secret").status_code == 400
+
+
+def test_batch_keeps_the_requested_order_and_lists_missing_ids(client, count_queries):
+    first, second, third = add_products(3)
+    catalog_cache.bump_version()
+    ids = [third.id, 999, first.id, third.id]
+
+    with count_queries() as statements:
+        response = client.get(f"/api/products/batch?ids={','.join(map(str, ids))}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [product["id"] for product in body["products"]] == [third.id, first.id, third.id]
+    assert body["missing"] == [999]
+    # One query for the products, one for their reviews.
+    assert len(statements) == 2
+
+
+def test_batch_projects_the_requested_fields(client):
+    product, = add_products(1)
+
+    response = client.get(f"/api/products/batch?ids={product.id}&fields=id,price")
+
+    assert response.get_json()["products"] == [{"id": product.id, "price": product.price}]
+
+
+@pytest.mark.parametrize("ids", ["", "1,x", ","])
+def test_batch_rejects_missing_or_invalid_ids(client, ids):
+    assert client.get(f"/api/products/batch?ids={ids}").status_code == 400
+
+
+def add_rated_products():
+    """Adds a product with many 5-star reviews, one with a single 5-star review and a poorly rated one."""
+    popular, newcomer, poor = add_products(3)
+    poor.category = "Dairy"
+    add_reviews(popular, [5] * 20)
+    add_reviews(newcomer, [5])
+    add_reviews(poor, [2] * 10)
+    rebuild_rating_aggregates()
+    return popular, newcomer, poor
+
+
+def leaderboard(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.get_json()["products"]
+
+
+def test_top_rated_ranks_by_bayesian_average(client):
+    popular, newcomer, poor = add_rated_products()
+
+    products = leaderboard(client, "/api/products/leaderboards/top-rated")
+
+    assert [product["id"] for product in products] == [popular.id, newcomer.id, poor.id]
+    assert products[0]["score"] > products[1]["score"] > products[2]["score"]
+    assert "reviews" not in products[0]
+    assert [product["id"] for product in leaderboard(client, "/api/products/leaderboards/top-rated?category=Dairy")] \
+        == [poor.id]
+    assert [product["id"] for product in leaderboard(client, "/api/products/leaderboards/top-rated?limit=1")] \
+        == [popular.id]
+
+
+def test_most_reviewed_ranks_by_review_count(client):
+    popular, newcomer, poor = add_rated_products()
+
+    products = leaderboard(client, "/api/products/leaderboards/most-reviewed")
+
+    assert [(product["id"], product["score"]) for product in products] == [(popular.id, 20), (poor.id, 10),
+                                                                           (newcomer.id, 1)]
+
+
+def test_leaderboards_follow_new_reviews(client):
+    popular, newcomer, poor = add_rated_products()
+    leaderboard(client, "/api/products/leaderboards/most-reviewed")
+
+    add_reviews(newcomer, [5] * 30, first_author=1)
+    rebuild_rating_aggregates()
+
+    assert leaderboard(client, "/api/products/leaderboards/most-reviewed")[0]["id"] == newcomer.id
+
+
+def test_related_products_are_ranked_by_co_purchases(client):
+    first, second, third, fourth, unsold = add_products(5)
+    legacy_buyer = User(username="ann", email="ann@example.com", password="x",
+                        purchased_products=[first.id, second.id, third.id])
+    buyers = [User(username=name, email=f"{name}@example.com", password="x") for name in ("bob", "cid")]
+    db.session.add_all([legacy_buyer, *buyers])
+    db.session.commit()
+    for buyer, products in zip(buyers, [(first, second), (first, fourth)]):
+        order = Order(user_id=buyer.id)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all(OrderItem(order_id=order.id, product_id=product.id, quantity=1, unit_price=product.price)
+                           for product in products)
+    db.session.commit()
+    rebuild_related_products()
+
+    related = client.get(f"/api/products/{first.id}/related").get_json()["products"]
+    assert [product["id"] for product in related] == [second.id, third.id, fourth.id]
+    assert "reviews" not in related[0]
+    limited = client.get(f"/api/products/{first.id}/related?limit=1").get_json()["products"]
+    assert [product["id"] for product in limited] == [second.id]
+    assert client.get(f"/api/products/{unsold.id}/related").get_json() == {"products": []}
+    assert client.get("/api/products/abc/related").status_code == 400
@@ -0,0 +1,59 @@
+import pytest
+
+from app import db
+from app.models.product_model import Product, Review
+from app.models.user_model import User
+from app.utils.catalog_cache import catalog_cache
+
+
+def add_products(count, reviews_per_product=3):
+    products = [
+        Product(name=f"Product {i}", description="", price=1.0 + i, category="Fruit", image_url="")
+        for i in range(count)
+    ]
+    db.session.add_all(products)
+    db.session.flush()
+    db.session.add_all(
+        Review(product_id=product.id, author=f"author {n}", rating=4, comment="")
+        for product in products for n in range(reviews_per_product)
+    )
+    db.session.commit()
+    return products
+
+
+def catalog_query_count(client, count_queries):
+    catalog_cache.bump_version()
+    with count_queries() as statements:
+        response = client.get("/api/products/all_products")
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+def test_catalog_query_count_does_not_grow_with_products(client, session, count_queries):
+    add_products(3)
+    few_queries, products = catalog_query_count(client, count_queries)
+    assert len(products) == 3
+
+    add_products(30)
+    many_queries, products = catalog_query_count(client, count_queries)
+    assert len(products) == 33
+    assert all(len(product["reviews"]) == 3 for product in products)
+    assert many_queries == few_queries
+
+
+@pytest.mark.parametrize("favorite_count", [2, 20])
+def test_favorites_use_a_constant_number_of_queries(client, session, auth_headers, count_queries,
+                                                    favorite_count):
+    products = add_products(favorite_count)
+    user = User(username="shopper", email="shopper@example.com", password="x",
+                fav_products=[product.id for product in products])
+    db.session.add(user)
+    db.session.commit()
+    headers = auth_headers(user.id)
+
+    with count_queries() as statements:
+        response = client.get("/api/me/favorites", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == favorite_count
+    # One query for the products, one for all of their reviews.
+    assert len(statements) == 2
@@ -0,0 +1,51 @@
+from sqlalchemy import inspect, text
+
+from app import db
+from app.models.product_model import Product, ProductRating, Review
+from app.models.user_model import BasketItem, User
+from app.schema import create_missing_schema
+
+
+def index_names(table):
+    return {index["name"] for index in inspect(db.engine).get_indexes(table)}
+
+
+def test_duplicates_are_removed_before_the_unique_indexes_are_built(session):
+    product = Product(name="Apple", description="", price=1.0, category="Fruit", image_url="")
+    user = User(username="ann", email="ann@example.com", password="x")
+    db.session.add_all([product, user])
+    db.session.commit()
+    db.session.execute(text("DROP INDEX uq_reviews_product_id_author"))
+    db.session.execute(text("DROP INDEX uq_basket_items_user_id_product_id"))
+    db.session.add_all([
+        Review(product_id=product.id, author="ann", rating=5, comment="first"),
+        Review(product_id=product.id, author="ann", rating=1, comment="second"),
+        Review(product_id=product.id, author="bob", rating=3, comment=""),
+        BasketItem(user_id=user.id, product_id=product.id, quantity=1),
+        BasketItem(user_id=user.id, product_id=product.id, quantity=2),
+    ])
+    db.session.commit()
+
+    removed = create_missing_schema()
+
+    assert removed == {"reviews": 1, "basket_items": 1}
+    assert "uq_reviews_product_id_author" in index_names("reviews")
+    assert "uq_basket_items_user_id_product_id" in index_names("basket_items")
+    assert [review.comment for review in Review.query.filter_by(author="ann")] == ["first"]
+    assert [item.quantity for item in BasketItem.query.all()] == [1]
+    rating = db.session.get(ProductRating, product.id)
+    assert (rating.review_count, rating.rating_sum) == (2, 8)
+
+
+def test_existing_indexes_leave_the_rows_alone(session):
+    assert create_missing_schema() == {}
+
+
+def test_missing_columns_are_added(session):
+    db.session.execute(text("ALTER TABLE users DROP COLUMN pending_avatar"))
+    db.session.commit()
+
+    create_missing_schema()
+
+    columns = {column["name"] for column in inspect(db.engine).get_columns("users")}
+    assert "pending_avatar" in columns
@@ -0,0 +1,84 @@
+from app.utils.search_index import ProductSearchIndex, decode_cursor
+
+PRODUCTS = [
+    (1, "Red Apple", "Crisp apple", "Fruit"),
+    (2, "Green Apple", "Sour apple", "Fruit"),
+    (3, "Apple Juice", "Pressed apples", "Drinks"),
+    (4, "Banana", "Sweet banana", "Fruit"),
+    (5, "Apple Pie", "Baked with apple", "Bakery"),
+    (6, "Pineapple", "Tropical fruit", "Fruit"),
+]
+
+
+def build_index():
+    index = ProductSearchIndex()
+    index.build(PRODUCTS)
+    return index
+
+
+def test_pages_follow_the_full_ranking():
+    index = build_index()
+    full, cursor = index.search("apple", limit=10)
+    assert cursor is None
+    assert sorted(product_id for product_id, _ in full) == [1, 2, 3, 5]
+    assert full == sorted(full, key=lambda result: (-result[1], result[0]))
+
+    paged, cursor = [], None
+    while True:
+        page, cursor = index.search("apple", limit=1, after=decode_cursor(cursor) if cursor else None)
+        paged.extend(page)
+        if cursor is None:
+            break
+    assert paged == full
+
+
+def test_prefix_matches_the_last_term():
+    index = build_index()
+    results, _ = index.search("ban", limit=10, prefix=True)
+    assert [product_id for product_id, _ in results] == [4]
+
+
+def test_suggestions_match_full_scoring(monkeypatch):
+    import app.utils.search_index as search_module
+    monkeypatch.setattr(search_module, "MAX_SUGGESTIONS", 2)
+    products = [(i, f"apple{'x' * (i % 3)} item{i}", "apple " * (i % 4), "Fruit") for i in range(1, 40)]
+    index = ProductSearchIndex()
+    index.build(products)
+
+    suggested, cursor = index.search("app", limit=2, prefix=True)
+    scores = index._score(index._data, ["app"], prefix=True)
+    expected = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:2]
+    assert suggested == expected
+    assert cursor is not None
+
+
+def test_refresh_rebuilds_once_in_the_background_on_a_new_version():
+    import threading
+    index = ProductSearchIndex()
+    loads = []
+    index.refresh(1, lambda: loads.append(1) or PRODUCTS)
+    assert loads == [1]
+    assert not index.is_stale(1)
+    index.refresh(1, lambda: loads.append(1) or PRODUCTS)
+    assert loads == [1]
+
+    release = threading.Event()
+    rebuilt = threading.Event()
+
+    def load_new_products():
+        loads.append(2)
+        release.wait(5)
+        return PRODUCTS + [(7, "Apple Cider", None, "Drinks")]
+
+    original_build = index.build
+    index.build = lambda *args: (original_build(*args), rebuilt.set())
+    index.refresh(2, load_new_products)
+    index.refresh(2, load_new_products)
+    # The previous build keeps serving while the rebuild waits.
+    assert index.name(7) is None
+    assert index.is_stale(2)
+    release.set()
+    assert rebuilt.wait(5)
+    assert loads == [1, 2]
+    assert index.name(7) == "Apple Cider"
+    assert not index.is_stale(2)
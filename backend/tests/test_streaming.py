@@ -0,0 +1,41 @@
+from app import db
+from app.models.product_model import Product, Review
+from app.models.user_model import User
+from app.utils.catalog_cache import catalog_cache
+
+
+def add_catalog():
+    products = [Product(name=f"Product {i}", description="", price=1.0 + i, category="Fruit", image_url="")
+                for i in range(5)]
+    db.session.add_all(products)
+    db.session.flush()
+    db.session.add_all(Review(product_id=product.id, author="ann", rating=4, comment="") for product in products)
+    db.session.add_all(User(username=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(3))
+    db.session.commit()
+
+
+def test_all_users(client, auth_headers):
+    add_catalog()
+    headers = auth_headers(1)
+
+    listed = client.get("/api/me/all-users", headers=headers)
+    streamed = client.get("/api/me/all-users?stream=true", headers=headers)
+
+    assert listed.status_code == 200
+    assert streamed.status_code == 200
+    assert [user["username"] for user in listed.get_json()] == ["user0", "user1", "user2"]
+    assert streamed.get_data() == listed.get_data()
+
+
+def test_cold_streamed_catalog_matches_the_listing(client):
+    add_catalog()
+
+    catalog_cache.bump_version()
+    streamed = client.get("/api/products/all_products?stream=true")
+    catalog_cache.bump_version()
+    listed = client.get("/api/products/all_products")
+
+    assert streamed.status_code == 200
+    assert len(listed.get_json()) == 5
+    assert all(len(product["reviews"]) == 1 for product in listed.get_json())
+    assert streamed.get_data() == listed.get_data()
@@ -0,0 +1,181 @@
+from app import db
+from app.models.order_model import Order, OrderItem
+from app.models.product_model import Product
+from app.models.user_model import User
+
+
+def add_user(**fields):
+    user = User(username="shopper", email="shopper@example.com", password="x", **fields)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def add_products(count):
+    products = [
+        Product(name=f"Product {i}", description="", price=1.0 + i, category="Fruit", image_url="")
+        for i in range(count)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+
+def add_order(user, *products):
+    order = Order(user_id=user.id)
+    db.session.add(order)
+    db.session.flush()
+    db.session.add_all(
+        OrderItem(order_id=order.id, product_id=product.id, quantity=1, unit_price=product.price)
+        for product in products
+    )
+    db.session.commit()
+    return order
+
+
+def test_bootstrap_info_lists_the_products_from_orders(client, session, auth_headers):
+    first, second, third = add_products(3)
+    user = add_user(purchased_products=[first.id])
+    add_order(user, second, third)
+
+    response = client.get("/api/me/bootstrap", headers=auth_headers(user.id))
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["purchased_products"] == [first.id, second.id, third.id]
+    assert body["info"]["purchased_products"] == body["purchased_products"]
+
+
+def test_info_lists_the_products_from_orders(client, session, auth_headers):
+    first, second = add_products(2)
+    user = add_user()
+    add_order(user, first, second)
+
+    response = client.get("/api/me/info", headers=auth_headers(user.id))
+
+    assert response.get_json()["purchased_products"] == [first.id, second.id]
+
+
+def test_unchanged_bootstrap_is_revalidated_with_a_304(client, session, auth_headers):
+    product, = add_products(1)
+    user = add_user()
+    headers = auth_headers(user.id)
+
+    first = client.get("/api/me/bootstrap", headers=headers)
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    revalidated = client.get("/api/me/bootstrap", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b""
+
+    add_order(user, product)
+    changed = client.get("/api/me/bootstrap", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.get_json()["purchased_products"] == [product.id]
+
+
+def test_basket_is_read_with_its_product_details_in_one_query(client, session, auth_headers, count_queries):
+    apple, pear = add_products(2)
+    user = add_user()
+    headers = auth_headers(user.id)
+    basket = [{"product_id": pear.id, "quantity": 2}, {"product_id": 999, "quantity": 1},
+              {"product_id": apple.id, "quantity": 3}]
+    assert client.post("/api/me/basket", json=basket, headers=headers).status_code == 200
+
+    with count_queries() as statements:
+        response = client.get("/api/me/basket", headers=headers)
+
+    assert len(statements) == 1
+    # Items whose product no longer exists are left out.
+    assert response.get_json() == [
+        {"product_id": apple.id, "quantity": 3, "name": apple.name, "price": apple.price, "image_url": ""},
+        {"product_id": pear.id, "quantity": 2, "name": pear.name, "price": pear.price, "image_url": ""},
+    ]
+    summary = client.get("/api/me/basket?summary=true", headers=headers).get_json()
+    assert summary["item_count"] == 5
+    assert summary["total"] == round(2 * pear.price + 3 * apple.price, 2)
+
+
+def test_checkout_places_one_order_and_clears_the_basket(client, session, auth_headers):
+    apple, pear = add_products(2)
+    user = add_user()
+    headers = auth_headers(user.id)
+    client.post("/api/me/basket", json=[{"product_id": apple.id, "quantity": 3}], headers=headers)
+
+    response = client.post("/api/me/purchase", json={"purchased_products": [apple.id, pear.id, 999]},
+                           headers=headers)
+
+    assert response.status_code == 200
+    order, = client.get("/api/me/orders", headers=headers).get_json()["orders"]
+    assert order["id"] == response.get_json()["order_id"]
+    # Quantities come from the basket, 1 for products not in it; unknown products are skipped.
+    assert order["items"] == [
+        {"product_id": apple.id, "quantity": 3, "unit_price": apple.price},
+        {"product_id": pear.id, "quantity": 1, "unit_price": pear.price},
+    ]
+    assert order["total"] == round(3 * apple.price + pear.price, 2)
+    assert client.get("/api/me/basket", headers=headers).get_json() == []
+    assert client.get("/api/me/purchased-products", headers=headers).get_json() == [apple.id, pear.id]
+
+
+def test_checkout_of_unknown_products_keeps_the_basket(client, session, auth_headers):
+    apple, = add_products(1)
+    user = add_user()
+    headers = auth_headers(user.id)
+    client.post("/api/me/basket", json=[{"product_id": apple.id, "quantity": 1}], headers=headers)
+
+    assert client.post("/api/me/purchase", json={"purchased_products": [999]}, headers=headers).status_code == 400
+    assert client.post("/api/me/purchase", json={"purchased_products": "1"}, headers=headers).status_code == 400
+    assert len(client.get("/api/me/basket", headers=headers).get_json()) == 1
+    assert client.get("/api/me/orders", headers=headers).get_json() == {"orders": [], "next_cursor": None}
+
+
+def test_orders_are_paged_newest_first(client, session, auth_headers):
+    product, = add_products(1)
+    user = add_user()
+    headers = auth_headers(user.id)
+    order_ids = [add_order(user, product).id for _ in range(3)]
+
+    first_page = client.get("/api/me/orders?limit=2", headers=headers).get_json()
+    second_page = client.get(f"/api/me/orders?limit=2&before={first_page['next_cursor']}", headers=headers).get_json()
+
+    assert [order["id"] for order in first_page["orders"] + second_page["orders"]] == order_ids[::-1]
+    assert second_page["next_cursor"] is None
+
+
+def bootstrap(client, headers, count_queries):
+    with count_queries() as statements:
+        response = client.get("/api/me/bootstrap", headers=headers)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+def test_bootstrap_holds_every_section_in_a_constant_number_of_queries(client, session, auth_headers,
+                                                                       count_queries):
+    products = add_products(6)
+    user = add_user(fav_products=[products[0].id])
+    headers = auth_headers(user.id)
+    client.post("/api/me/basket", json=[{"product_id": products[1].id, "quantity": 2}], headers=headers)
+
+    few_queries, body = bootstrap(client, headers, count_queries)
+
+    assert set(body) == {"info", "basket", "favorites", "purchased_products", "config"}
+    assert body["info"]["username"] == "shopper"
+    assert [item["product_id"] for item in body["info"]["basket"]] == [products[1].id]
+    assert body["basket"] == [{"product_id": products[1].id, "quantity": 2, "name": products[1].name,
+                               "price": products[1].price, "image_url": ""}]
+    assert [product["id"] for product in body["favorites"]] == [products[0].id]
+    assert body["config"]["USE_S3_STORAGE"] is False
+
+    db.session.expire_all()
+    db.session.get(User, user.id).fav_products = [product.id for product in products]
+    db.session.commit()
+    client.post("/api/me/basket", json=[{"product_id": product.id, "quantity": 1} for product in products],
+                headers=headers)
+    many_queries, body = bootstrap(client, headers, count_queries)
+
+    assert len(body["basket"]) == len(body["favorites"]) == len(products)
+    assert many_queries == few_queries